@@ -1,234 +1,307 @@
+import os
+import sys
+import time
+
 import streamlit as st
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
-# ---------------------------
-# Set default values for all parameters
-# ---------------------------
-default_values = {
-    "CAPEX": 300.0,
-    "salvage": 40.0,
-    "op_cost": 12.0,
-    "debt_ratio": 0.6,
-    "interest_rate": 4.0,
-    "debt_term": 10,
-    "depr_years": 10,
-    "tax_rate": 25.0,
-    "lease_payment": 18.0,
-    "lease_escalation": 3.0,
-    "op_growth": 2.0,
-    "analysis_years": 20,
-    "wacc": 6.0,
+from lease_own.batch import periodic_rate, yearly_totals
+from lease_own.breakeven import BREAKEVEN_KEYS, break_even
+from lease_own.cache import LRUCache
+from lease_own.charts import (cumulative_cashflow_spec, heatmap_spec, histogram_spec,
+                              tornado_spec, yearly_cashflow_spec)
+from lease_own.depreciation import CUSTOM as CUSTOM_DEPRECIATION, rate_cache_info
+from lease_own.metrics import scenario_metrics
+from lease_own.model import (DEBT_SCHEDULES, DEPRECIATION_METHODS, LEASE_OPTIONS, PERIOD_OPTIONS,
+                             default_values, leasing_cashflows, ownership_cashflows, param_bounds,
+                             param_labels, to_working_units)
+from lease_own.montecarlo import Normal, Triangular, Uniform, simulate, simulate_until
+from lease_own.npv import YieldCurve, curve_cache_info, discount_cache_info, npv_batch
+from lease_own.options import lattice_cache_info
+from lease_own.portfolio import evaluate_portfolio, missing_param_columns, portfolio_totals
+from lease_own.sampling import cholesky_factor
+from lease_own.scenarios import lease_option_npvs
+from lease_own.sensitivity import MAX_GRID_STEPS, grid_axis, npv_delta_grid, tornado
+
+# Maximum number of distinct parameter sets kept in the shared model cache
+MODEL_CACHE_SIZE = 512
+# Maximum number of Vega-Lite chart specs kept in the shared chart cache
+CHART_CACHE_SIZE = 1024
+# Maximum number of sensitivity grids (with their chart specs) kept in memory
+HEATMAP_CACHE_SIZE = 16
+
+# Input modes: apply every edit immediately, apply once edits pause for
+# DEBOUNCE_SECONDS, or buffer edits in a form until "Apply" is pressed
+LIVE_MODE = "Live"
+DEBOUNCED_MODE = "Debounced live"
+FORM_MODE = "Apply button"
+DEBOUNCE_SECONDS = 0.5
+
+# Monte Carlo samplers offered in the UI, by display name
+MC_SAMPLERS = {
+    "Random": "random",
+    "Antithetic": "antithetic",
+    "Latin hypercube": "lhs",
+    "Sobol (quasi-random)": "sobol",
 }
 
+# Draws per batch when simulating until a target precision (a power of two suits Sobol)
+MC_BATCH_SIZE = 8192
+# Rate inputs that tend to move together; pairs of them are offered for correlation
+MC_RATE_KEYS = ("interest_rate", "lease_escalation", "op_growth", "wacc")
+
+# Starting points of the yield-curve editor: years and annual rates (%)
+DEFAULT_CURVE_POINTS = {"Year": [1.0, 5.0, 10.0, 30.0], "Rate (%)": [5.0, 5.5, 6.0, 6.5]}
+# Starting point of the custom depreciation editor: % of CAPEX deducted in years 1, 2, ...
+# (five-year double-declining balance)
+DEFAULT_DEPRECIATION_RATES = {"Rate (%)": [40.0, 24.0, 14.4, 10.8, 10.8]}
+
+# Rows per page of the portfolio result grid
+PORTFOLIO_PAGE_SIZES = [25, 100, 500]
+
 # Initialize st.session_state with default values if not present
 for key, val in default_values.items():
     if key not in st.session_state:
         st.session_state[key] = val
+if "pending_inputs" not in st.session_state:
+    st.session_state["pending_inputs"] = {}
 
 # ---------------------------
 # Helper function for dual inputs with on_change callbacks
 # ---------------------------
+def commit_input(key, value):
+    """Store a new value for key, either directly or in the debounce buffer."""
+    if st.session_state.get("input_mode") == DEBOUNCED_MODE:
+        st.session_state["pending_inputs"][key] = value
+        st.session_state["last_input_edit"] = time.monotonic()
+    else:
+        st.session_state[key] = value
+
 def dual_input(label, min_value, max_value, default, step, key, help_text=""):
     """
     Displays a slider and a number input side by side.
-    When either widget changes, its callback updates st.session_state[key].
-    Both widgets use st.session_state[key] so they remain in sync.
+    When either widget changes, its callback mirrors the value into the other
+    widget and commits it to st.session_state[key] (or buffers it in debounced
+    mode). Inside the "Apply button" form no callbacks are attached; the form's
+    submit callback commits all edits at once.
     """
+    for widget_key in (key + "_slider", key + "_input"):
+        if widget_key not in st.session_state:
+            st.session_state[widget_key] = st.session_state[key]
+
     def update_from_slider():
-        st.session_state[key] = st.session_state[key + "_slider"]
+        st.session_state[key + "_input"] = st.session_state[key + "_slider"]
+        commit_input(key, st.session_state[key + "_slider"])
 
     def update_from_input():
-        st.session_state[key] = st.session_state[key + "_input"]
+        st.session_state[key + "_slider"] = st.session_state[key + "_input"]
+        commit_input(key, st.session_state[key + "_input"])
 
+    in_form = st.session_state.get("input_mode") == FORM_MODE
     col1, col2 = st.columns(2)
     col1.slider(
         f"{label} (slider)",
         min_value, max_value,
-        value=st.session_state[key],
         step=step,
         help=help_text,
         key=key + "_slider",
-        on_change=update_from_slider
+        on_change=None if in_form else update_from_slider
     )
     col2.number_input(
         f"{label} (input)",
         min_value, max_value,
-        value=st.session_state[key],
         step=step,
         help=help_text,
         key=key + "_input",
-        on_change=update_from_input
+        on_change=None if in_form else update_from_input
     )
     return st.session_state[key]
 
-# ---------------------------
-# Financial Model Functions
-# ---------------------------
-def npv(cashflows, discount_rate):
-    """Calculate net present value (NPV) of cashflows."""
-    return sum(cf / ((1 + discount_rate) ** t) for t, cf in enumerate(cashflows))
+def apply_form_inputs():
+    """Form submit callback: commit every buffered edit in one go."""
+    # The selectboxes write their own keys; only dual inputs are mirrored here
+    for key in param_bounds:
+        slider_value = st.session_state[key + "_slider"]
+        input_value = st.session_state[key + "_input"]
+        # Whichever widget was edited differs from the committed value
+        value = input_value if input_value != st.session_state[key] else slider_value
+        st.session_state[key] = value
+        st.session_state[key + "_slider"] = value
+        st.session_state[key + "_input"] = value
 
-def ownership_cashflows(CAPEX, debt_ratio, interest_rate, debt_term, n_years, 
-                        operating_cost, op_cost_growth, depreciation_years, 
-                        tax_rate, salvage_value):
+def flush_pending_inputs():
+    """Commit debounced edits; returns True if anything changed."""
+    pending = st.session_state["pending_inputs"]
+    for key, value in pending.items():
+        st.session_state[key] = value
+    changed = bool(pending)
+    pending.clear()
+    return changed
+
+def start_debounce_polling(input_mode):
     """
-    Calculate yearly cash flows for owning a facility.
-    
-    Assumptions:
-      - A portion of CAPEX is financed by debt (repaid evenly over debt_term years).
-      - Interest on the financed portion is tax-deductible.
-      - Straight-line depreciation over depreciation_years creates a tax shield.
-      - Operating cost grows annually at a constant rate.
-      - Salvage value is received in the final year.
+    Start polling the debounce buffer once it holds edits. Every call of the
+    fragment adds another timer in the browser, so it is started once per
+    burst of edits; full reruns clear the timers and the flag.
     """
-    annual_depreciation = CAPEX / depreciation_years
-    debt_amount = CAPEX * debt_ratio
-    annual_principal_payment = debt_amount / debt_term if debt_term > 0 else 0
-    outstanding_debt = debt_amount
+    if input_mode != DEBOUNCED_MODE or not st.session_state["pending_inputs"]:
+        return
+    if not st.session_state["debounce_polling"]:
+        st.session_state["debounce_polling"] = True
+        debounce_inputs()
 
-    # Time 0: equity cash outflow
-    cashflows = [-CAPEX * (1 - debt_ratio)]
-    op_cost = operating_cost
+@st.fragment(run_every=DEBOUNCE_SECONDS)
+def debounce_inputs():
+    """
+    Polls the debounce buffer and reruns the page once edits have settled.
+    The full rerun that applies the edits also stops the polling.
+    """
+    pending = st.session_state["pending_inputs"]
+    if not pending:
+        return
+    if time.monotonic() - st.session_state["last_input_edit"] >= DEBOUNCE_SECONDS:
+        flush_pending_inputs()
+        st.rerun()
+    st.caption(f"{len(pending)} pending input change(s)...")
 
-    for t in range(1, n_years + 1):
-        interest_expense = outstanding_debt * interest_rate if outstanding_debt > 0 else 0
-        financing_cash = annual_principal_payment + interest_expense if t <= debt_term else interest_expense
-        depreciation = annual_depreciation if t <= depreciation_years else 0
-        tax_shield = (depreciation + interest_expense) * tax_rate
+# ---------------------------
+# Model computation (cached across reruns and sessions)
+# ---------------------------
+@st.cache_resource
+def model_cache():
+    """Process-wide LRU cache of model results, keyed by the normalized parameter tuple."""
+    return LRUCache(maxsize=MODEL_CACHE_SIZE)
 
-        net_cash = -op_cost - financing_cash + tax_shield
-        if t == n_years:
-            net_cash += salvage_value
+@st.cache_resource
+def chart_cache():
+    """Process-wide LRU cache of Vega-Lite specs, keyed by (chart name, parameter tuple)."""
+    return LRUCache(maxsize=CHART_CACHE_SIZE)
 
-        cashflows.append(net_cash)
+@st.cache_resource
+def heatmap_cache():
+    """Process-wide LRU cache of sensitivity grids, keyed by (parameter tuple, x axis, y axis)."""
+    return LRUCache(maxsize=HEATMAP_CACHE_SIZE)
 
-        if t <= debt_term:
-            outstanding_debt -= annual_principal_payment
+def current_model_key(curve=None, custom_depreciation=None):
+    """
+    Normalized tuple of the current inputs in default_values order, followed by the
+    yield curve (None when discounting at WACC) and the custom depreciation rates
+    (None unless the custom depreciation method is selected).
+    Float noise from slider steps is rounded away so equal inputs share one cache entry.
+    """
+    if st.session_state["depr_method"] != CUSTOM_DEPRECIATION:
+        custom_depreciation = None
+    return tuple(
+        int(st.session_state[key]) if isinstance(default_values[key], int)
+        else round(float(st.session_state[key]), 9)
+        for key in default_values
+    ) + (curve, custom_depreciation)
 
-        op_cost *= (1 + op_cost_growth)
+def key_curve(model_key):
+    """The yield curve of a model key, or None."""
+    return model_key[len(default_values)]
 
-    return cashflows
+def key_custom_depreciation(model_key):
+    """The custom depreciation rates (fractions of CAPEX per year) of a model key, or None."""
+    return model_key[len(default_values) + 1]
 
-def leasing_cashflows(initial_lease_payment, lease_escalation, n_years, tax_rate):
+def run_model(model_key):
     """
-    Calculate yearly cash flows for leasing a facility.
-    
-    Assumptions:
-      - Lease payments escalate annually at a fixed rate.
-      - Lease payments are fully tax-deductible.
+    Compute both cash-flow streams, their NPVs and the yearly cash flows data frame.
+    Quarterly or monthly cash flows are discounted per period and summed by year for display.
     """
-    cashflows = [0]  # No upfront cost for leasing
-    lease_payment = initial_lease_payment
-    for t in range(1, n_years + 1):
-        net_cash = -lease_payment + (lease_payment * tax_rate)
-        cashflows.append(net_cash)
-        lease_payment *= (1 + lease_escalation)
-    return cashflows
+    w = to_working_units(dict(zip(default_values, model_key)))
+    periods = w["periods_per_year"]
+    curve = key_curve(model_key)
+    own_cf = ownership_cashflows(w["CAPEX"], w["debt_ratio"], w["interest_rate"], w["debt_term"],
+                                 w["analysis_years"], w["operating_cost"], w["op_cost_growth"],
+                                 w["depreciation_years"], w["tax_rate"], w["salvage_value"], periods,
+                                 w["debt_schedule"], w["balloon_fraction"], w["interest_only_years"],
+                                 w["depreciation_method"], key_custom_depreciation(model_key))
+    lease_cf = leasing_cashflows(w["initial_lease_payment"], w["lease_escalation"],
+                                 w["analysis_years"], w["tax_rate"], periods)
+    # Both paths share one discount-factor table and one matrix-vector product
+    rate = periodic_rate(w["wacc"], periods) if curve is None else curve.per_period(periods)
+    own_npv, lease_npv = npv_batch([own_cf, lease_cf], rate).tolist()
+    params = dict(zip(default_values, model_key))
+    if params["lease_option"]:
+        # The purchase or renewal option is valued on its own lattice, not as cash flows
+        lease_npv += float(lease_option_npvs(params, curve)[0])
 
-# ---------------------------
-# Convert session_state values to working units
-# ---------------------------
-capex_m = st.session_state["CAPEX"]
-salvage_m = st.session_state["salvage"]
-op_cost_m = st.session_state["op_cost"]
-debt_ratio = st.session_state["debt_ratio"]
-interest_rate_pct = st.session_state["interest_rate"]
-debt_term = st.session_state["debt_term"]
-depreciation_years = st.session_state["depr_years"]
-tax_rate_pct = st.session_state["tax_rate"]
-lease_payment_m = st.session_state["lease_payment"]
-lease_escalation_pct = st.session_state["lease_escalation"]
-op_growth_pct = st.session_state["op_growth"]
-analysis_years = st.session_state["analysis_years"]
-wacc_pct = st.session_state["wacc"]
-
-CAPEX = capex_m * 1e6
-salvage_value = salvage_m * 1e6
-operating_cost = op_cost_m * 1e6
-initial_lease_payment = lease_payment_m * 1e6
-interest_rate = interest_rate_pct / 100.0
-tax_rate = tax_rate_pct / 100.0
-op_cost_growth = op_growth_pct / 100.0
-lease_escalation = lease_escalation_pct / 100.0
-wacc = wacc_pct / 100.0
+    yearly_own, yearly_lease = yearly_totals([own_cf, lease_cf], periods)
+    df = pd.DataFrame({
+        "Year": list(range(0, w["analysis_years"] + 1)),
+        "Owning Cash Flow": yearly_own,
+        "Leasing Cash Flow": yearly_lease
+    })
+    df["Cumulative Owning"] = df["Owning Cash Flow"].cumsum()
+    df["Cumulative Leasing"] = df["Leasing Cash Flow"].cumsum()
+    return own_npv, lease_npv, df
 
-# ---------------------------
-# Compute outputs
-# ---------------------------
-own_cf = ownership_cashflows(CAPEX, debt_ratio, interest_rate, debt_term, analysis_years,
-                             operating_cost, op_cost_growth, depreciation_years,
-                             tax_rate, salvage_value)
-lease_cf = leasing_cashflows(initial_lease_payment, lease_escalation, analysis_years, tax_rate)
-own_npv = npv(own_cf, wacc)
-lease_npv = npv(lease_cf, wacc)
-
-# Prepare a summary table for parameters and yearly cash flows data frame
-param_data = {
-    "Parameter": [
-        "CAPEX ($M)", "Salvage Value ($M)", "Operating Cost ($M)", "Debt Ratio", 
-        "Interest Rate (%)", "Debt Term (years)", "Depreciation Years", "Tax Rate (%)",
-        "Initial Lease Payment ($M)", "Lease Escalation (%)", "Operating Cost Growth (%)",
-        "Analysis Period (years)", "WACC (%)"
-    ],
-    "Value": [
-        capex_m, salvage_m, op_cost_m, debt_ratio,
-        interest_rate_pct, debt_term, depreciation_years, tax_rate_pct,
-        lease_payment_m, lease_escalation_pct, op_growth_pct,
-        analysis_years, wacc_pct
-    ]
-}
-params_df = pd.DataFrame(param_data)
-
-years_range = list(range(0, analysis_years + 1))
-df = pd.DataFrame({
-    "Year": years_range,
-    "Owning Cash Flow": own_cf,
-    "Leasing Cash Flow": lease_cf
-})
-df["Cumulative Owning"] = df["Owning Cash Flow"].cumsum()
-df["Cumulative Leasing"] = df["Leasing Cash Flow"].cumsum()
+def model_results(model_key):
+    """
+    Cached (own_npv, lease_npv, df) of a model key, computed on first use.
+    The data frame is shared between sessions and must not be modified.
+    """
+    return model_cache().get_or_compute(model_key, lambda: run_model(model_key))
 
 # ---------------------------
-# Display Outputs (Tabs) at the Top
+# Output Views
 # ---------------------------
-st.title("Leasing vs. Owning Cost Analysis")
-st.markdown(
-    "This tool compares the financial impact of owning a facility versus leasing it. "
-    "For each parameter, you can adjust the value using the slider or by entering a number directly."
-)
-st.header("Output Results")
-tab0, tab1, tab2, tab3, tab4 = st.tabs([
-    "Approach & Assumptions", 
-    "Parameter Summary", 
-    "NPV Comparison", 
-    "Yearly Cash Flows", 
-    "Cumulative Cash Flows"
-])
-
-with tab0:
+# Each view is its own fragment that takes only what it reads and fetches model
+# results through the caches, so a tab that does not need the model never computes it.
+@st.fragment
+def approach_view():
     st.subheader("Approach & Assumptions")
     st.markdown(
         """
         **Approach:**
         - The model calculates Net Present Value (NPV) by discounting projected cash flows using a constant discount rate (WACC).
-        - For ownership, a portion of CAPEX is financed with debt (repaid evenly), with tax shields from interest and straight‑line depreciation.
+        - Alternatively (Discounting), cash flows can be discounted along a yield curve of spot or one-year forward rates, interpolated linearly between the given years; WACC is then not used.
+        - For ownership, a portion of CAPEX is financed with debt, with tax shields from interest and depreciation (straight‑line, MACRS, double‑declining balance or a custom schedule of yearly rates). The debt is repaid in even principal instalments, in level (annuity) payments, in level payments with a balloon at maturity, or interest-only for some years and then in level payments.
         - For leasing, the model uses fixed annual lease payments (with escalation) and applies a tax benefit to those payments.
+        - A lease may carry an option to buy the facility at a fixed price at any quarter end until the end of the analysis period, or to renew the lease at a fixed rent when it ends. The option is valued on a binomial lattice of the facility value (starting at CAPEX, with the chosen volatility) and added to the leasing NPV.
+        - Cash flows fall at the end of each year, quarter or month (Cash-Flow Timing). Rates are converted to the equivalent rate per period, and each year's payments add up to the same total whatever the timing; the tables and charts show yearly sums.
         
         **Assumptions:**
         - Operating costs grow at a constant rate.
-        - Debt is repaid evenly and depreciation is linear.
+        - Debt is repaid on the chosen schedule. MACRS uses the shortest IRS recovery class of at least the depreciation years (at most 20 years); quarterly or monthly cash flows spread each year's depreciation evenly over its periods.
         - This is a high‑level analysis; more detailed evaluations might separate operating and financing cash flows.
+        - The facility's market rent is the initial lease payment as a yield on CAPEX; it is what owning the facility earns, and it sets the market rent a renewal is compared with. Lease options are valued before tax on the purchase and do not enter the IRR, payback and crossover metrics.
+        - The Monte Carlo tab redraws selected inputs from a distribution around their current value; all other inputs stay fixed.
+        - The Portfolio tab evaluates every facility in an uploaded table with the same model, independently of the inputs below.
         """
     )
 
-with tab1:
+@st.fragment
+def summary_view(model_key):
     st.subheader("Input Parameters Summary")
+    values = dict(zip(default_values, model_key))
+    values["debt_schedule"] = DEBT_SCHEDULES[values["debt_schedule"]]
+    values["depr_method"] = DEPRECIATION_METHODS[values["depr_method"]]
+    values["lease_option"] = LEASE_OPTIONS[values["lease_option"]]
+    param_data = {
+        "Parameter": list(param_labels.values()),
+        "Value": [str(value) for value in values.values()]
+    }
+    params_df = pd.DataFrame(param_data)
     st.table(params_df)
+    curve = key_curve(model_key)
+    if curve is not None:
+        points = ", ".join(f"{rate:.2%} at {tenor:g}y" for tenor, rate in zip(curve.tenors, curve.rates))
+        kind = "forward" if curve.forward else "spot"
+        st.caption(f"Discounted along a {kind} yield curve ({points}); WACC is not used.")
+    custom_depreciation = key_custom_depreciation(model_key)
+    if custom_depreciation is not None:
+        rates = ", ".join(f"{rate:.2%}" for rate in custom_depreciation)
+        st.caption(f"Custom depreciation of CAPEX by year: {rates}.")
 
-with tab2:
+@st.fragment
+def npv_view(model_key):
     st.subheader("NPV Comparison")
+    own_npv, lease_npv, _ = model_results(model_key)
     npv_data = {
         "Option": ["Owning", "Leasing"],
         "NPV ($M)": [own_npv / 1e6, lease_npv / 1e6]
@@ -236,8 +309,74 @@ with tab2:
     npv_df = pd.DataFrame(npv_data)
     st.table(npv_df)
 
-with tab3:
+    params = dict(zip(default_values, model_key))
+    curve = key_curve(model_key)
+    if params["lease_option"]:
+        option_value = model_cache().get_or_compute(
+            ("lease_option", model_key), lambda: float(lease_option_npvs(params, curve)[0])
+        )
+        st.caption(f"Leasing NPV includes {option_value / 1e6:,.2f} $M for the "
+                   f"{LEASE_OPTIONS[params['lease_option']].lower()}.")
+    custom_depreciation = key_custom_depreciation(model_key)
+    metrics = model_cache().get_or_compute(
+        ("metrics", model_key),
+        lambda: {name: float(values[0])
+                 for name, values in scenario_metrics(params, curve=curve,
+                                                      custom_depreciation=custom_depreciation).items()}
+    )
+
+    def year_text(year):
+        if np.isnan(year):
+            return "never"
+        # Quarterly and monthly cash flows can pay back part-way through a year
+        return f"year {year:.0f}" if year == int(year) else f"year {year:.2f}"
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric(
+        "IRR of owning vs. leasing", "n/a" if np.isnan(metrics["irr"]) else f"{metrics['irr']:.2f}%",
+        help="Discount rate at which the extra cash flows of owning instead of leasing have zero NPV."
+    )
+    col2.metric(
+        "Discounted payback", year_text(metrics["payback_year"]),
+        help="Year from which on the extra cash flows of owning, discounted at WACC (or along the "
+             "yield curve), stay paid back."
+    )
+    col3.metric(
+        "Cumulative crossover", year_text(metrics["crossover_year"]),
+        help="Year from which on cumulative owning cash flow stays level with or above cumulative "
+             "leasing cash flow."
+    )
+
+    st.subheader("Break-even Values")
+    st.markdown(
+        "The value each input would need, with all other inputs unchanged, for owning and "
+        "leasing to have the same NPV. Each value is searched for within the input's slider range."
+    )
+    # WACC has no break-even when discounting along a yield curve
+    keys = [key for key in BREAKEVEN_KEYS if curve is None or key != "wacc"]
+    break_evens = model_cache().get_or_compute(
+        ("break_even", model_key),
+        lambda: {key: float(break_even(params, key, curve=curve,
+                                       custom_depreciation=custom_depreciation)[0])
+                 for key in keys}
+    )
+    st.table(pd.DataFrame({
+        "Parameter": [param_labels[key] for key in keys],
+        "Current Value": [f"{params[key]:,.2f}" for key in keys],
+        "Break-even Value": [
+            f"{value:,.2f}" if not np.isnan(value)
+            else "none between {:,.2f} and {:,.2f}".format(*param_bounds[key])
+            for key, value in break_evens.items()
+        ]
+    }))
+
+@st.fragment
+def yearly_view(model_key, chart_backend):
     st.subheader("Yearly Cash Flows")
+    df = model_results(model_key)[2]
+    periods = dict(zip(default_values, model_key))["periods_per_year"]
+    if periods > 1:
+        st.caption(f"{PERIOD_OPTIONS.get(periods, 'Periodic')} cash flows, summed by year.")
     st.dataframe(
         df[["Year", "Owning Cash Flow", "Leasing Cash Flow"]].style.format({
             "Owning Cash Flow": "${:,.0f}",
@@ -245,17 +384,26 @@ with tab3:
         }),
         width=1200
     )
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.bar(np.array(df["Year"]) - 0.15, df["Owning Cash Flow"] / 1e6, width=0.3, label="Owning")
-    ax.bar(np.array(df["Year"]) + 0.15, df["Leasing Cash Flow"] / 1e6, width=0.3, label="Leasing")
-    ax.set_xlabel("Year")
-    ax.set_ylabel("Cash Flow (Millions $)")
-    ax.set_title("Yearly Cash Flows: Owning vs. Leasing")
-    ax.legend()
-    st.pyplot(fig)
-
-with tab4:
+    if chart_backend == "Vega-Lite":
+        st.vega_lite_chart(chart_cache().get_or_compute(
+            ("yearly", model_key),
+            lambda: yearly_cashflow_spec(df["Year"], df["Owning Cash Flow"], df["Leasing Cash Flow"])
+        ), width="stretch")
+    else:
+        fig, ax = plt.subplots(figsize=(10, 5))
+        ax.bar(np.array(df["Year"]) - 0.15, df["Owning Cash Flow"] / 1e6, width=0.3, label="Owning")
+        ax.bar(np.array(df["Year"]) + 0.15, df["Leasing Cash Flow"] / 1e6, width=0.3, label="Leasing")
+        ax.set_xlabel("Year")
+        ax.set_ylabel("Cash Flow (Millions $)")
+        ax.set_title("Yearly Cash Flows: Owning vs. Leasing")
+        ax.legend()
+        st.pyplot(fig)
+        plt.close(fig)
+
+@st.fragment
+def cumulative_view(model_key, chart_backend):
     st.subheader("Cumulative Cash Flows")
+    df = model_results(model_key)[2]
     st.dataframe(
         df[["Year", "Cumulative Owning", "Cumulative Leasing"]].style.format({
             "Cumulative Owning": "${:,.0f}",
@@ -263,70 +411,693 @@ with tab4:
         }),
         width=1200
     )
-    fig2, ax2 = plt.subplots(figsize=(10, 5))
-    ax2.plot(df["Year"], df["Cumulative Owning"] / 1e6, label="Owning", marker="o")
-    ax2.plot(df["Year"], df["Cumulative Leasing"] / 1e6, label="Leasing", marker="o")
-    ax2.set_xlabel("Year")
-    ax2.set_ylabel("Cumulative Cash Flow (Millions $)")
-    ax2.set_title("Cumulative Cash Flows: Owning vs. Leasing")
-    ax2.legend()
-    st.pyplot(fig2)
+    if chart_backend == "Vega-Lite":
+        st.vega_lite_chart(chart_cache().get_or_compute(
+            ("cumulative", model_key),
+            lambda: cumulative_cashflow_spec(df["Year"], df["Cumulative Owning"], df["Cumulative Leasing"])
+        ), width="stretch")
+    else:
+        fig2, ax2 = plt.subplots(figsize=(10, 5))
+        ax2.plot(df["Year"], df["Cumulative Owning"] / 1e6, label="Owning", marker="o")
+        ax2.plot(df["Year"], df["Cumulative Leasing"] / 1e6, label="Leasing", marker="o")
+        ax2.set_xlabel("Year")
+        ax2.set_ylabel("Cumulative Cash Flow (Millions $)")
+        ax2.set_title("Cumulative Cash Flows: Owning vs. Leasing")
+        ax2.legend()
+        st.pyplot(fig2)
+        plt.close(fig2)
 
-# ---------------------------
-# Display Input Controls in an Expander Below
-# ---------------------------
+@st.fragment
+def monte_carlo_view(chart_backend, curve, custom_depreciation):
+    """Own fragment: editing the simulation settings reruns only this tab."""
+    st.subheader("Monte Carlo Simulation")
+    st.markdown(
+        "Give selected inputs a Low/High range around their current value and simulate the "
+        "NPV difference (owning minus leasing). A positive difference means owning is cheaper. "
+        "Normal draws use the range as their 5th-95th percentile band."
+    )
+    base_params = {key: st.session_state[key] for key in default_values}
+
+    def default_range(key):
+        value = float(base_params[key])
+        if key in MC_RATE_KEYS:
+            return max(value - 1.0, 0.0), value + 1.0
+        return value * 0.75, value * 1.25
 
-st.header("Input Parameters")
-with st.expander("Show/Modify Inputs", expanded=True):
-    capex_m = dual_input(
-        "New-build CAPEX ($M)", 50.0, 3000.0, default_values["CAPEX"], 1.0, key="CAPEX",
-        help_text="The total cost (in millions) to build the facility. This is the upfront capital expenditure for ownership."
+    mc_keys = st.multiselect(
+        "Uncertain inputs",
+        options=list(param_bounds),
+        default=["interest_rate", "op_growth", "lease_escalation", "wacc", "salvage"],
+        format_func=param_labels.get,
+        key="mc_keys"
     )
-    salvage_m = dual_input(
-        "Salvage Value ($M)", 0.0, 500.0, default_values["salvage"], 1.0, key="salvage",
-        help_text="The estimated residual value (in millions) recoverable at the end of the analysis period."
+    mc_spec = st.data_editor(
+        pd.DataFrame({
+            "Parameter": [param_labels[k] for k in mc_keys],
+            "Distribution": ["Normal"] * len(mc_keys),
+            "Low": [default_range(k)[0] for k in mc_keys],
+            "High": [default_range(k)[1] for k in mc_keys],
+        }, index=mc_keys),
+        column_config={
+            "Distribution": st.column_config.SelectboxColumn(
+                options=["Normal", "Uniform", "Triangular"], required=True
+            ),
+        },
+        disabled=["Parameter"],
+        hide_index=True,
+        key="mc_spec"
     )
-    op_cost_m = dual_input(
-        "Initial Operating Cost ($M)", 1.0, 500.0, default_values["op_cost"], 1.0, key="op_cost",
-        help_text="The first-year operating cost (in millions) covering maintenance, utilities, etc."
+    with st.expander("Correlations between inputs"):
+        st.markdown(
+            "Interest rates, WACC, operating cost growth and lease escalation tend to move "
+            "together. Enter correlations between -1 and 1 for any pair of uncertain inputs; "
+            "pairs left at 0 or not listed are drawn independently."
+        )
+        rate_keys = [k for k in MC_RATE_KEYS if k in mc_keys]
+        rate_pairs = [(a, b) for i, a in enumerate(rate_keys) for b in rate_keys[i + 1:]]
+        mc_labels = [param_labels[k] for k in mc_keys]
+        mc_corr = st.data_editor(
+            pd.DataFrame({
+                "Input": [param_labels[a] for a, _ in rate_pairs],
+                "Correlated with": [param_labels[b] for _, b in rate_pairs],
+                "Correlation": [0.0] * len(rate_pairs),
+            }),
+            column_config={
+                "Input": st.column_config.SelectboxColumn(options=mc_labels, required=True),
+                "Correlated with": st.column_config.SelectboxColumn(options=mc_labels, required=True),
+                "Correlation": st.column_config.NumberColumn(
+                    min_value=-1.0, max_value=1.0, step=0.05, required=True
+                ),
+            },
+            num_rows="dynamic",
+            hide_index=True,
+            key="mc_corr"
+        )
+    col1, col2, col3 = st.columns(3)
+    mc_draws = col1.select_slider(
+        "Number of draws", options=[1_000, 10_000, 100_000, 1_000_000], value=10_000, key="mc_draws"
     )
-    debt_ratio = dual_input(
-        "Debt Ratio", 0.0, 1.0, default_values["debt_ratio"], 0.01, key="debt_ratio",
-        help_text="The fraction of CAPEX financed by debt (e.g., 0.6 means 60% debt, 40% equity)."
+    mc_sampler = col2.selectbox(
+        "Sampler", list(MC_SAMPLERS), key="mc_sampler",
+        help="Antithetic, Latin hypercube and Sobol sampling spread the draws more evenly than "
+             "random sampling and reach the same standard error with fewer draws."
     )
-    interest_rate_pct = dual_input(
-        "Interest Rate (%)", 0.0, 20.0, default_values["interest_rate"], 0.1, key="interest_rate",
-        help_text="The annual interest rate (in percent) on the financed portion."
+    mc_seed = col3.number_input("Random seed", 0, 2**31 - 1, 0, 1, key="mc_seed")
+    mc_adaptive = st.toggle(
+        "Stop once precise enough", key="mc_adaptive",
+        help="Simulate in batches and stop as soon as the 95% confidence intervals are narrower "
+             "than the tolerances below. The number of draws above becomes the upper limit."
     )
-    debt_term = int(dual_input(
-        "Debt Term (years)", 1, 30, default_values["debt_term"], 1, key="debt_term",
-        help_text="The number of years over which the debt is repaid."
-    ))
-    depreciation_years = int(dual_input(
-        "Depreciation Years", 1, 30, default_values["depr_years"], 1, key="depr_years",
-        help_text="The period over which the facility is depreciated (straight-line)."
-    ))
-    tax_rate_pct = dual_input(
-        "Tax Rate (%)", 0.0, 50.0, default_values["tax_rate"], 0.1, key="tax_rate",
-        help_text="The corporate tax rate (in percent) used to calculate tax shields."
+    if mc_adaptive:
+        col1, col2 = st.columns(2)
+        mc_mean_tol = col1.number_input(
+            "Mean NPV difference tolerance (± $M)", 0.001, 1000.0, 0.5, 0.1, key="mc_mean_tol"
+        )
+        mc_p_tol = col2.number_input(
+            "P(owning wins) tolerance (± percentage points)", 0.01, 50.0, 0.5, 0.1, key="mc_p_tol"
+        )
+
+    if st.button("Run simulation", key="mc_run"):
+        distributions = {}
+        for key, row in mc_spec.iterrows():
+            low, high = sorted((float(row["Low"]), float(row["High"])))
+            if row["Distribution"] == "Uniform":
+                distributions[key] = Uniform(low, high)
+            elif row["Distribution"] == "Triangular":
+                mode = min(max(float(base_params[key]), low), high)
+                distributions[key] = Triangular(low, mode, high)
+            else:
+                distributions[key] = Normal((low + high) / 2, (high - low) / (2 * 1.645), low=0.0)
+        keys_by_label = {param_labels[k]: k for k in default_values}
+        correlations = {}
+        for _, row in mc_corr.dropna().iterrows():
+            if row["Correlation"]:
+                pair = keys_by_label[row["Input"]], keys_by_label[row["Correlated with"]]
+                correlations[pair] = float(row["Correlation"])
+        try:
+            cholesky_factor([k for k in default_values if k in distributions], correlations)
+        except ValueError as error:
+            st.error(f"Cannot use these correlations: {error}")
+            return
+        if mc_adaptive:
+            progress_bar = st.progress(0.0, text="Simulating...")
+
+            def report(state):
+                interval = (
+                    f": mean {state.delta_mean / 1e6:,.2f} ± {state.delta_mean_half_width / 1e6:,.2f} $M, "
+                    f"P(owning wins) {state.p_own_wins:.1%} ± {state.p_own_wins_half_width:.2%}"
+                    if state.n_batches > 1 else ""
+                )
+                progress_bar.progress(min(state.n_draws / mc_draws, 1.0),
+                                      text=f"{state.n_draws:,} draws{interval}")
+
+            try:
+                mc_result = simulate_until(
+                    base_params, distributions, mean_tolerance=mc_mean_tol * 1e6,
+                    p_tolerance=mc_p_tol / 100, batch_size=MC_BATCH_SIZE, max_draws=mc_draws,
+                    seed=int(mc_seed), sampler=MC_SAMPLERS[mc_sampler], progress=report,
+                    correlations=correlations, curve=curve, custom_depreciation=custom_depreciation
+                )
+            except ValueError as error:
+                st.error(f"Cannot simulate these ranges: {error}")
+                return
+            finally:
+                progress_bar.empty()
+        else:
+            try:
+                with st.spinner("Simulating..."):
+                    mc_result = simulate(base_params, distributions, n_draws=mc_draws, seed=int(mc_seed),
+                                         sampler=MC_SAMPLERS[mc_sampler], correlations=correlations,
+                                         curve=curve, custom_depreciation=custom_depreciation)
+            except ValueError as error:
+                st.error(f"Cannot simulate these ranges: {error}")
+                return
+        st.session_state["mc_result"] = mc_result
+
+    mc_result = st.session_state.get("mc_result")
+    if mc_result is not None:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("P(owning wins)", f"{mc_result.p_own_wins:.1%} ± {mc_result.p_own_wins_se:.2%}")
+        col2.metric("Mean NPV difference ($M)",
+                    f"{mc_result.delta_mean / 1e6:,.1f} ± {mc_result.delta_mean_se / 1e6:,.2f}")
+        col3.metric("Std. deviation ($M)", f"{mc_result.delta_std / 1e6:,.1f}")
+        st.caption(
+            f"± values are standard errors from {mc_result.n_replicates} independently randomized "
+            f"replicates ({mc_result.sampler} sampler)."
+        )
+        if not mc_result.converged:
+            st.warning(
+                f"Stopped at the {mc_result.n_draws:,}-draw limit before reaching the tolerances; "
+                "raise the number of draws or loosen the tolerances."
+            )
+        st.table(pd.DataFrame({
+            "Percentile": [f"P{p}" for p in mc_result.percentiles],
+            "NPV Difference ($M)": [v / 1e6 for v in mc_result.percentiles.values()],
+            "Std. Error ($M)": [se / 1e6 for se in mc_result.percentile_se.values()]
+        }))
+        # Binned while streaming; the draws themselves are never kept
+        histogram = mc_result.sketch.histogram
+        counts, edges = histogram.counts, histogram.edges / 1e6
+        hist_title = f"Distribution of NPV Difference ({mc_result.n_draws:,} draws)"
+        if chart_backend == "Vega-Lite":
+            st.vega_lite_chart(
+                histogram_spec(edges, counts, "Owning NPV - Leasing NPV (Millions $)", hist_title),
+                width="stretch"
+            )
+        else:
+            fig3, ax3 = plt.subplots(figsize=(10, 4))
+            ax3.bar(edges[:-1], counts, width=np.diff(edges), align="edge")
+            ax3.axvline(0.0, color="black", linewidth=1)
+            ax3.set_xlabel("Owning NPV - Leasing NPV (Millions $)")
+            ax3.set_ylabel("Draws")
+            ax3.set_title(hist_title)
+            st.pyplot(fig3)
+            plt.close(fig3)
+
+@st.fragment
+def sensitivity_view(model_key, chart_backend):
+    """Own fragment: changing the grid reruns only this tab."""
+    st.subheader("Sensitivity Heatmap")
+    st.markdown(
+        "Vary two inputs over a range while all other inputs keep their current values, and see "
+        "the NPV difference (owning minus leasing) for every combination. Blue cells favour "
+        "owning, red cells favour leasing."
     )
-    lease_payment_m = dual_input(
-        "Initial Lease Payment ($M)", 1.0, 500.0, default_values["lease_payment"], 1.0, key="lease_payment",
-        help_text="The annual lease payment (in millions) if the facility is leased."
+    axes = []
+    for axis, default_key in (("x", "wacc"), ("y", "lease_payment")):
+        col1, col2, col3 = st.columns([2, 3, 1])
+        key = col1.selectbox(
+            f"{axis.upper()} axis", list(param_bounds), index=list(param_bounds).index(default_key),
+            format_func=param_labels.get, key=f"heatmap_{axis}_key"
+        )
+        # One range widget per input, so switching inputs back restores its range
+        low, high = col2.slider(
+            f"{param_labels[key]} range", *param_bounds[key], value=param_bounds[key],
+            key=f"heatmap_{axis}_range_{key}"
+        )
+        steps = col3.number_input("Steps", 2, MAX_GRID_STEPS, 100, 1, key=f"heatmap_{axis}_steps")
+        axes.append((key, float(low), float(high), int(steps)))
+    x_key, y_key = axes[0][0], axes[1][0]
+    if x_key == y_key:
+        st.warning("Pick two different inputs for the axes.")
+        return
+
+    def compute_grid():
+        x_values, y_values = grid_axis(*axes[0]), grid_axis(*axes[1])
+        grid = npv_delta_grid(dict(zip(default_values, model_key)), x_key, x_values, y_key, y_values,
+                              key_curve(model_key), key_custom_depreciation(model_key))
+        return {"x": x_values, "y": y_values, "grid": grid, "spec": None}
+
+    cached = heatmap_cache().get_or_compute((model_key, *axes), compute_grid)
+    x_values, y_values, grid = cached["x"], cached["y"], cached["grid"]
+    st.caption(f"{grid.size:,} combinations; owning is cheaper in {(grid > 0).mean():.1%} of them.")
+    title = "NPV Difference: Owning minus Leasing (Millions $)"
+    if chart_backend == "Vega-Lite":
+        if cached["spec"] is None:
+            cached["spec"] = heatmap_spec(x_values, y_values, grid,
+                                          param_labels[x_key], param_labels[y_key], title)
+        st.vega_lite_chart(cached["spec"], width="stretch")
+    else:
+        fig4, ax4 = plt.subplots(figsize=(10, 6))
+        limit = max(float(np.abs(grid).max()) / 1e6, 1e-9)
+        mesh = ax4.pcolormesh(x_values, y_values, grid / 1e6, shading="nearest",
+                              cmap="RdBu", vmin=-limit, vmax=limit)
+        if grid.min() < 0 < grid.max() and min(grid.shape) > 1:
+            ax4.contour(x_values, y_values, grid, levels=[0.0], colors="black", linewidths=1)
+        fig4.colorbar(mesh, ax=ax4, label="Millions $")
+        ax4.set_xlabel(param_labels[x_key])
+        ax4.set_ylabel(param_labels[y_key])
+        ax4.set_title(title)
+        st.pyplot(fig4)
+        plt.close(fig4)
+
+@st.fragment
+def tornado_view(model_key, chart_backend):
+    """Own fragment: switching the measure reruns only this tab."""
+    st.subheader("Tornado Chart")
+    st.markdown(
+        "Each input is moved, one at a time, to the lowest and highest value its input widget "
+        "allows while all other inputs keep their current values. Bars show how far the chosen "
+        "NPV moves from its current value; the widest swing is on top."
     )
-    lease_escalation_pct = dual_input(
-        "Lease Escalation (%)", 0.0, 10.0, default_values["lease_escalation"], 0.1, key="lease_escalation",
-        help_text="The annual percentage increase in the lease payment."
+    # One batched evaluation per base scenario, shared with the model cache
+    curve = key_curve(model_key)
+    # WACC has no effect when discounting along a yield curve
+    bounds = param_bounds if curve is None else {k: v for k, v in param_bounds.items() if k != "wacc"}
+    result = model_cache().get_or_compute(
+        ("tornado", model_key),
+        lambda: tornado(dict(zip(default_values, model_key)), bounds, curve,
+                        key_custom_depreciation(model_key))
     )
-    op_growth_pct = dual_input(
-        "Operating Cost Growth (%)", 0.0, 10.0, default_values["op_growth"], 0.1, key="op_growth",
-        help_text="The expected annual growth rate (in percent) in operating costs."
+    measures = {
+        "NPV difference (owning - leasing)": (result.base_delta, result.delta),
+        "Owning NPV": (result.base_own_npv, result.own_npv),
+        "Leasing NPV": (result.base_lease_npv, result.lease_npv),
+    }
+    measure = st.radio("Measure", list(measures), horizontal=True, key="tornado_measure")
+    base, values = measures[measure]
+    labels = [param_labels[key] for key in result.keys]
+    x_title = f"{measure} (Millions $)"
+
+    if chart_backend == "Vega-Lite":
+        st.vega_lite_chart(chart_cache().get_or_compute(
+            ("tornado", measure, model_key),
+            lambda: tornado_spec(labels, base, values[:, 0], values[:, 1], x_title,
+                                 f"Sensitivity of {measure} to Each Input")
+        ), width="stretch")
+    else:
+        order = np.argsort(np.abs(values[:, 1] - values[:, 0]), kind="stable")
+        fig5, ax5 = plt.subplots(figsize=(10, 6))
+        positions = np.arange(len(order))
+        ax5.barh(positions + 0.2, (values[order, 0] - base) / 1e6, left=base / 1e6, height=0.4,
+                 color="#d62728", label="Input at low bound")
+        ax5.barh(positions - 0.2, (values[order, 1] - base) / 1e6, left=base / 1e6, height=0.4,
+                 color="#2ca02c", label="Input at high bound")
+        ax5.axvline(base / 1e6, color="black", linewidth=1)
+        ax5.set_yticks(positions, [labels[i] for i in order])
+        ax5.set_xlabel(x_title)
+        ax5.set_title(f"Sensitivity of {measure} to Each Input")
+        ax5.legend()
+        st.pyplot(fig5)
+        plt.close(fig5)
+
+    st.dataframe(pd.DataFrame({
+        "Parameter": labels,
+        "Low Bound": result.low_values,
+        "High Bound": result.high_values,
+        "At Low ($M)": values[:, 0] / 1e6,
+        "At High ($M)": values[:, 1] / 1e6,
+        "Swing ($M)": np.abs(values[:, 1] - values[:, 0]) / 1e6,
+    }).sort_values("Swing ($M)", ascending=False).style.format({
+        "Low Bound": "{:,.2f}", "High Bound": "{:,.2f}",
+        "At Low ($M)": "{:,.1f}", "At High ($M)": "{:,.1f}", "Swing ($M)": "{:,.1f}"
+    }), hide_index=True, width="stretch")
+
+def read_portfolio(uploaded):
+    if uploaded.name.lower().endswith((".parquet", ".pq")):
+        return pd.read_parquet(uploaded)
+    return pd.read_csv(uploaded)
+
+@st.fragment
+def portfolio_view(curve, custom_depreciation):
+    """Own fragment: uploading, sorting and paging rerun only this tab."""
+    st.subheader("Portfolio")
+    st.markdown(
+        "Upload a CSV or Parquet table with one facility per row. Name the columns after the "
+        "input parameters, by label (e.g. `CAPEX ($M)`) or by key (e.g. `CAPEX`), in the same "
+        "units as the inputs. Missing parameters use their default value; other columns, such "
+        "as a site name, are kept."
+    )
+    uploaded = st.file_uploader("Facility table", type=["csv", "parquet"], key="portfolio_file")
+    if uploaded is None:
+        st.session_state.pop("portfolio", None)
+        return
+
+    # Evaluate once per uploaded file, curve and depreciation schedule; sorting and paging
+    # reuse the stored results
+    portfolio = st.session_state.get("portfolio")
+    options = (curve, custom_depreciation)
+    if portfolio is None or portfolio["file_id"] != uploaded.file_id or portfolio["options"] != options:
+        try:
+            with st.spinner("Evaluating portfolio..."):
+                frame = read_portfolio(uploaded)
+                eval_start = time.perf_counter()
+                results = evaluate_portfolio(frame, metrics=True, curve=curve,
+                                             custom_depreciation=custom_depreciation)
+                eval_ms = (time.perf_counter() - eval_start) * 1e3
+        except (ValueError, ImportError) as exc:
+            st.error(f"Could not evaluate {uploaded.name}: {exc}")
+            return
+        portfolio = {"file_id": uploaded.file_id, "options": options, "results": results, "eval_ms": eval_ms,
+                     "totals": portfolio_totals(results), "order": {}}
+        st.session_state["portfolio"] = portfolio
+    results = portfolio["results"]
+    totals = portfolio["totals"]
+
+    missing = missing_param_columns(results)
+    st.caption(
+        f"Evaluated {totals['facilities']:,} facilities in {portfolio['eval_ms']:,.0f} ms."
+        + (f" Defaults used for: {', '.join(param_labels[k] for k in missing)}." if missing else "")
+    )
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Owning cheaper", f"{totals['own_count']:,} / {totals['facilities']:,}")
+    col2.metric("Total owning NPV ($M)", f"{totals['own_npv_m']:,.1f}")
+    col3.metric("Total leasing NPV ($M)", f"{totals['lease_npv_m']:,.1f}")
+    col4.metric("NPV with cheaper option ($M)", f"{totals['best_npv_m']:,.1f}")
+
+    col1, col2, col3, col4 = st.columns(4)
+    sort_column = col1.selectbox(
+        "Sort by", list(results.columns), index=results.columns.get_loc("npv_delta_m"),
+        key="portfolio_sort"
     )
-    analysis_years = int(dual_input(
-        "Analysis Period (years)", 5, 40, default_values["analysis_years"], 1, key="analysis_years",
-        help_text="The time horizon (in years) for the cash flow and NPV analysis."
-    ))
-    wacc_pct = dual_input(
-        "Discount Rate / WACC (%)", 0.0, 20.0, default_values["wacc"], 0.1, key="wacc",
-        help_text="The discount rate (in percent) used to discount future cash flows."
+    descending = col2.toggle("Descending", value=True, key="portfolio_descending")
+    page_size = col3.selectbox("Rows per page", PORTFOLIO_PAGE_SIZES, index=1, key="portfolio_page_size")
+    n_pages = max(1, -(-len(results) // page_size))
+    page = col4.number_input(f"Page (of {n_pages:,})", 1, n_pages, 1, 1, key="portfolio_page")
+
+    # Sort order is kept per column and direction, so paging does not re-sort
+    order = portfolio["order"].get((sort_column, descending))
+    if order is None:
+        order = results[sort_column].sort_values(ascending=not descending, kind="stable").index
+        order = results.index.get_indexer(order)
+        portfolio["order"][(sort_column, descending)] = order
+    start = (min(page, n_pages) - 1) * page_size
+    st.dataframe(
+        results.iloc[order[start:start + page_size]].style.format({
+            "own_npv_m": "{:,.1f}", "lease_npv_m": "{:,.1f}", "npv_delta_m": "{:,.1f}",
+            "irr_pct": "{:.2f}", "payback_year": "{:g}", "crossover_year": "{:g}"
+        }, na_rep="-"),
+        hide_index=True,
+        width="stretch"
     )
+
+def input_controls(input_mode):
+    st.header("Input Parameters")
+    with st.expander("Show/Modify Inputs", expanded=True), \
+            (st.form("input_form", border=False) if input_mode == FORM_MODE else st.container()):
+        dual_input(
+            "New-build CAPEX ($M)", *param_bounds["CAPEX"], default_values["CAPEX"], 1.0, key="CAPEX",
+            help_text="The total cost (in millions) to build the facility. This is the upfront capital expenditure for ownership."
+        )
+        dual_input(
+            "Salvage Value ($M)", *param_bounds["salvage"], default_values["salvage"], 1.0, key="salvage",
+            help_text="The estimated residual value (in millions) recoverable at the end of the analysis period."
+        )
+        dual_input(
+            "Initial Operating Cost ($M)", *param_bounds["op_cost"], default_values["op_cost"], 1.0, key="op_cost",
+            help_text="The first-year operating cost (in millions) covering maintenance, utilities, etc."
+        )
+        dual_input(
+            "Debt Ratio", *param_bounds["debt_ratio"], default_values["debt_ratio"], 0.01, key="debt_ratio",
+            help_text="The fraction of CAPEX financed by debt (e.g., 0.6 means 60% debt, 40% equity)."
+        )
+        dual_input(
+            "Interest Rate (%)", *param_bounds["interest_rate"], default_values["interest_rate"], 0.1, key="interest_rate",
+            help_text="The annual interest rate (in percent) on the financed portion."
+        )
+        dual_input(
+            "Debt Term (years)", *param_bounds["debt_term"], default_values["debt_term"], 1, key="debt_term",
+            help_text="The number of years over which the debt is repaid."
+        )
+        st.selectbox(
+            "Debt Schedule", list(DEBT_SCHEDULES), format_func=DEBT_SCHEDULES.get, key="debt_schedule",
+            help="How the debt is repaid: the same principal every year, level payments of principal "
+                 "plus interest, level payments that leave a balloon for the final payment, or "
+                 "interest only for the first years and level payments after that."
+        )
+        dual_input(
+            "Balloon (% of Debt)", *param_bounds["balloon_pct"], default_values["balloon_pct"], 1.0, key="balloon_pct",
+            help_text="Share of the debt repaid in one lump with the final payment. Used by the Balloon schedule only."
+        )
+        dual_input(
+            "Interest-Only Years", *param_bounds["io_years"], default_values["io_years"], 1, key="io_years",
+            help_text="Years of interest-only payments at the start of the debt term. Used by the "
+                      "Interest-only schedule only; the rest of the term is repaid in level payments."
+        )
+        dual_input(
+            "Depreciation Years", *param_bounds["depr_years"], default_values["depr_years"], 1, key="depr_years",
+            help_text="The period over which the facility is depreciated. MACRS uses the shortest "
+                      "recovery class (3, 5, 7, 10, 15 or 20 years) of at least this many years."
+        )
+        st.selectbox(
+            "Depreciation Method", list(DEPRECIATION_METHODS), format_func=DEPRECIATION_METHODS.get,
+            key="depr_method",
+            help="How CAPEX is depreciated for tax: evenly, by the IRS MACRS percentages, at twice "
+                 "the straight-line rate on the remaining book value, or by the yearly rates "
+                 "entered under Custom Depreciation."
+        )
+        dual_input(
+            "Tax Rate (%)", *param_bounds["tax_rate"], default_values["tax_rate"], 0.1, key="tax_rate",
+            help_text="The corporate tax rate (in percent) used to calculate tax shields."
+        )
+        dual_input(
+            "Initial Lease Payment ($M)", *param_bounds["lease_payment"], default_values["lease_payment"], 1.0, key="lease_payment",
+            help_text="The annual lease payment (in millions) if the facility is leased."
+        )
+        dual_input(
+            "Lease Escalation (%)", *param_bounds["lease_escalation"], default_values["lease_escalation"], 0.1, key="lease_escalation",
+            help_text="The annual percentage increase in the lease payment."
+        )
+        st.selectbox(
+            "Lease Option", list(LEASE_OPTIONS), format_func=LEASE_OPTIONS.get, key="lease_option",
+            help="An option the lease carries: buying the facility at the purchase price at any "
+                 "quarter end of the analysis period, or renewing the lease at the renewal rent "
+                 "when it ends. Its value is added to the leasing NPV."
+        )
+        dual_input(
+            "Purchase Price ($M)", *param_bounds["purchase_price"], default_values["purchase_price"], 1.0, key="purchase_price",
+            help_text="The price (in millions) at which the lessee may buy the facility. Used by the purchase option only."
+        )
+        dual_input(
+            "Renewal Rent ($M)", *param_bounds["renewal_rent"], default_values["renewal_rent"], 1.0, key="renewal_rent",
+            help_text="The fixed annual rent (in millions) of a renewed lease. Used by the renewal option only."
+        )
+        dual_input(
+            "Renewal Term (years)", *param_bounds["renewal_years"], default_values["renewal_years"], 1, key="renewal_years",
+            help_text="The number of years a renewal extends the lease by. Used by the renewal option only."
+        )
+        dual_input(
+            "Facility Value Volatility (%)", *param_bounds["asset_vol"], default_values["asset_vol"], 0.5, key="asset_vol",
+            help_text="The annual volatility of the facility's market value, which drives the value of a lease option."
+        )
+        dual_input(
+            "Operating Cost Growth (%)", *param_bounds["op_growth"], default_values["op_growth"], 0.1, key="op_growth",
+            help_text="The expected annual growth rate (in percent) in operating costs."
+        )
+        dual_input(
+            "Analysis Period (years)", *param_bounds["analysis_years"], default_values["analysis_years"], 1, key="analysis_years",
+            help_text="The time horizon (in years) for the cash flow and NPV analysis."
+        )
+        dual_input(
+            "Discount Rate / WACC (%)", *param_bounds["wacc"], default_values["wacc"], 0.1, key="wacc",
+            help_text="The discount rate (in percent) used to discount future cash flows. Not used "
+                      "when discounting along a yield curve (see Discounting)."
+        )
+        st.selectbox(
+            "Cash-Flow Timing", list(PERIOD_OPTIONS), format_func=PERIOD_OPTIONS.get,
+            key="periods_per_year",
+            help="Whether payments, costs and debt service fall at the end of each year, quarter or "
+                 "month. Annual rates are converted to the equivalent rate per period."
+        )
+        if input_mode == FORM_MODE:
+            st.form_submit_button("Apply", type="primary", on_click=apply_form_inputs)
+
+# ---------------------------
+# Debug Panel
+# ---------------------------
+def current_rss_mb():
+    """Resident set size of the server process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+@st.fragment
+def debug_panel(render_ms, chart_backend):
+    with st.expander("Debug: model cache", expanded=False):
+        cache_stats = model_cache().stats()
+        lookups = cache_stats["hits"] + cache_stats["misses"]
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Hits", cache_stats["hits"])
+        col2.metric("Misses", cache_stats["misses"])
+        col3.metric("Hit rate", f"{cache_stats['hits'] / lookups:.0%}" if lookups else "n/a")
+        col4.metric("Entries", f"{cache_stats['size']} / {cache_stats['maxsize']}")
+        st.caption(
+            f"Evictions: {cache_stats['evictions']}. "
+            f"Discount-factor tables: {discount_cache_info().currsize} cached, "
+            f"{discount_cache_info().hits} hits, {discount_cache_info().misses} misses. "
+            f"Yield-curve tables: {curve_cache_info().currsize} cached, "
+            f"{curve_cache_info().hits} hits, {curve_cache_info().misses} misses. "
+            f"Depreciation-rate tables: {rate_cache_info().currsize} cached, "
+            f"{rate_cache_info().hits} hits, {rate_cache_info().misses} misses. "
+            f"Option lattices: {lattice_cache_info().currsize} cached, "
+            f"{lattice_cache_info().hits} hits, {lattice_cache_info().misses} misses."
+        )
+        if st.button("Clear model cache", key="clear_model_cache"):
+            model_cache().clear()
+            chart_cache().clear()
+            heatmap_cache().clear()
+
+        chart_stats = chart_cache().stats()
+        st.caption(
+            f"Output render time this rerun: {render_ms:.1f} ms ({chart_backend}). "
+            f"Chart specs: {chart_stats['size']} cached, {chart_stats['hits']} hits, "
+            f"{chart_stats['misses']} misses. Open matplotlib figures: {len(plt.get_fignums())}. "
+            f"Server RSS: {current_rss_mb():,.0f} MB."
+        )
+
+# ---------------------------
+# Page Layout
+# ---------------------------
+@st.fragment
+def analysis(chart_backend, input_mode, curve, custom_depreciation):
+    """
+    The output tabs and the input controls.
+    Editing an input or switching tabs reruns only this fragment; only the open tab is
+    rendered, and it computes only what it reads. The controls inside a tab rerun only
+    that tab's fragment.
+    """
+    render_start = time.perf_counter()
+    model_key = current_model_key(curve, custom_depreciation)
+
+    st.header("Output Results")
+    tab0, tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs([
+        "Approach & Assumptions", 
+        "Parameter Summary", 
+        "NPV Comparison", 
+        "Yearly Cash Flows", 
+        "Cumulative Cash Flows",
+        "Monte Carlo",
+        "Portfolio",
+        "Sensitivity Heatmap",
+        "Tornado Chart"
+    ], key="output_tab", on_change="rerun")
+
+    with tab0:
+        if tab0.open:
+            approach_view()
+    with tab1:
+        if tab1.open:
+            summary_view(model_key)
+    with tab2:
+        if tab2.open:
+            npv_view(model_key)
+    with tab3:
+        if tab3.open:
+            yearly_view(model_key, chart_backend)
+    with tab4:
+        if tab4.open:
+            cumulative_view(model_key, chart_backend)
+    with tab5:
+        if tab5.open:
+            monte_carlo_view(chart_backend, curve, custom_depreciation)
+    with tab6:
+        if tab6.open:
+            portfolio_view(curve, custom_depreciation)
+    with tab7:
+        if tab7.open:
+            sensitivity_view(model_key, chart_backend)
+    with tab8:
+        if tab8.open:
+            tornado_view(model_key, chart_backend)
+    render_ms = (time.perf_counter() - render_start) * 1e3
+
+    input_controls(input_mode)
+    start_debounce_polling(input_mode)
+    debug_panel(render_ms, chart_backend)
+
+def discount_curve_controls():
+    """Optional yield curve used instead of WACC; returns a YieldCurve or None."""
+    with st.expander("Discounting", expanded=False):
+        use_curve = st.toggle(
+            "Discount along a yield curve instead of WACC", key="use_curve",
+            help="Each cash flow is discounted at the rate the curve gives for its date."
+        )
+        curve_kind = st.radio(
+            "Curve rates", ["Spot", "Forward"], horizontal=True, key="curve_kind",
+            help="Spot: zero-coupon rate from today to each year. Forward: one-year rate for the "
+                 "year ending at each point. Rates are interpolated linearly between points and "
+                 "held flat beyond the first and last."
+        )
+        points = st.data_editor(
+            pd.DataFrame(DEFAULT_CURVE_POINTS), num_rows="dynamic", hide_index=True, key="curve_points",
+            column_config={
+                "Year": st.column_config.NumberColumn(min_value=0.0, step=0.5),
+                "Rate (%)": st.column_config.NumberColumn(min_value=-99.0, step=0.05),
+            }
+        )
+        if not use_curve:
+            return None
+        points = points.dropna().sort_values("Year")
+        try:
+            return YieldCurve(points["Year"].to_numpy(), points["Rate (%)"].to_numpy() / 100.0,
+                              forward=curve_kind == "Forward")
+        except ValueError as error:
+            st.error(f"Cannot use this curve ({error}); discounting at WACC instead.")
+            return None
+
+def custom_depreciation_controls():
+    """Yearly rates of the custom depreciation method, as a tuple of fractions of CAPEX."""
+    with st.expander("Custom Depreciation", expanded=False):
+        st.caption(
+            "Percent of CAPEX deducted in year 1, 2, ... (one row per year). Used when the "
+            "Depreciation Method is Custom schedule, and by portfolio rows that select it."
+        )
+        rates = st.data_editor(
+            pd.DataFrame(DEFAULT_DEPRECIATION_RATES), num_rows="dynamic", hide_index=True,
+            key="custom_depreciation",
+            column_config={"Rate (%)": st.column_config.NumberColumn(min_value=0.0, max_value=100.0, step=0.1)}
+        )["Rate (%)"].dropna()
+        if rates.empty:
+            st.error("The custom schedule has no rates; using the default schedule instead.")
+            rates = pd.Series(DEFAULT_DEPRECIATION_RATES["Rate (%)"])
+        total = float(rates.sum())
+        if abs(total - 100.0) > 1e-6:
+            st.warning(f"The schedule deducts {total:,.2f}% of CAPEX in total, not 100%.")
+        return tuple(float(rate) / 100.0 for rate in rates)
+
+st.title("Leasing vs. Owning Cost Analysis")
+st.markdown(
+    "This tool compares the financial impact of owning a facility versus leasing it. "
+    "For each parameter, you can adjust the value using the slider or by entering a number directly."
+)
+chart_backend = st.radio(
+    "Chart backend", ["Vega-Lite", "Matplotlib"], horizontal=True, key="chart_backend",
+    help="Vega-Lite charts are interactive and cached; Matplotlib renders static images on every rerun."
+)
+input_mode = st.radio(
+    "Input mode", [LIVE_MODE, DEBOUNCED_MODE, FORM_MODE], horizontal=True, key="input_mode",
+    help="Live recomputes on every edit. Debounced live waits until edits pause. "
+         "Apply button buffers edits until you press Apply."
+)
+if input_mode != DEBOUNCED_MODE:
+    # Do not lose edits still waiting in the debounce buffer
+    flush_pending_inputs()
+discount_curve = discount_curve_controls()
+custom_depreciation = custom_depreciation_controls()
+# A full rerun stops any debounce polling in the browser
+st.session_state["debounce_polling"] = False
+analysis(chart_backend, input_mode, discount_curve, custom_depreciation)
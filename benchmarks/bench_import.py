@@ -0,0 +1,66 @@
+"""
+Cold-start benchmark for the headless model.
+
+Imports lease_own.model in fresh interpreters and fails (exit status 1) when the
+median import time exceeds the budget or when the import drags in a heavy
+dependency. Run from the repository root:
+
+    python benchmarks/bench_import.py [--budget-ms 30] [--runs 7]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the headless model must not import at load time
+HEAVY_MODULES = ("numpy", "pandas", "matplotlib", "streamlit")
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import lease_own.model
+elapsed = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed * 1e3, ",".join(loaded))
+"""
+
+
+def measure(module_probe, runs):
+    timings, loaded = [], set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", module_probe], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.split()
+        timings.append(float(out[0]))
+        if len(out) > 1:
+            loaded.update(out[1].split(","))
+    return timings, sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=30.0,
+                        help="maximum median import time in milliseconds")
+    parser.add_argument("--runs", type=int, default=7, help="number of fresh interpreters")
+    args = parser.parse_args(argv)
+
+    timings, loaded = measure(PROBE.format(heavy=HEAVY_MODULES), args.runs)
+    median = statistics.median(timings)
+    print(f"import lease_own.model: median {median:.1f} ms, "
+          f"min {min(timings):.1f} ms, max {max(timings):.1f} ms over {args.runs} runs "
+          f"(budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: heavy modules imported at load time: {', '.join(loaded)}")
+        failed = True
+    if median > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
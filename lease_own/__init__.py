@@ -0,0 +1,69 @@
+"""
+Financial model for the leasing vs. owning analysis, usable outside the Streamlit page.
+
+Public names are resolved lazily: ``import lease_own`` does not import NumPy or
+any submodule until one of the names below is first accessed.
+"""
+import importlib
+
+_EXPORTS = {
+    "INTEGER_KEYS": "model",
+    "PERIOD_OPTIONS": "model",
+    "DEBT_SCHEDULES": "model",
+    "DEPRECIATION_METHODS": "model",
+    "LEASE_OPTIONS": "model",
+    "PARAM_KEYS": "model",
+    "default_values": "model",
+    "leasing_cashflows": "model",
+    "ownership_cashflows": "model",
+    "param_bounds": "model",
+    "param_labels": "model",
+    "to_working_units": "model",
+    "leasing_cashflows_batch": "batch",
+    "ownership_cashflows_batch": "batch",
+    "periodic_rate": "batch",
+    "yearly_totals": "batch",
+    "debt_schedule_batch": "debt",
+    "depreciation_rates": "depreciation",
+    "lease_option_values": "options",
+    "discount_factors": "npv",
+    "npv_batch": "npv",
+    "YieldCurve": "npv",
+    "curve_discount_factors": "npv",
+    "evaluate_npvs": "scenarios",
+    "lease_option_npvs": "scenarios",
+    "break_even": "breakeven",
+    "irr_batch": "metrics",
+    "scenario_metrics": "metrics",
+    "ConvergenceState": "montecarlo",
+    "MonteCarloResult": "montecarlo",
+    "Normal": "montecarlo",
+    "Triangular": "montecarlo",
+    "Uniform": "montecarlo",
+    "simulate": "montecarlo",
+    "simulate_until": "montecarlo",
+    "SAMPLERS": "sampling",
+    "NpvSketch": "sketch",
+    "QuantileSketch": "sketch",
+    "run_sweep": "parallel",
+    "evaluate_portfolio": "portfolio",
+    "portfolio_totals": "portfolio",
+    "TornadoResult": "sensitivity",
+    "npv_delta_grid": "sensitivity",
+    "tornado": "sensitivity",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,194 @@
+"""
+Vectorized cash-flow kernels.
+
+Every argument may be a scalar or a 1-D array; arrays are broadcast against each
+other so each row of the result is one scenario. The kernels reproduce the
+year-by-year rules of the scalar functions in lease_own.model without a Python
+loop over years.
+
+Cash flows can also be laid out per quarter or per month (periods_per_year 4
+or 12, one value per batch). Annual rates are converted to the equivalent
+periodic rate, (1 + r) ** (1 / m) - 1, amounts are spread over the periods,
+and payments that escalate or grow do so every period. The first period's
+amount is scaled so each year's total equals the annual model's, so nominal
+annual amounts (lease payments, operating costs, CAPEX) are preserved. Debt
+interest is not: it compounds and amortizes every period, which changes the
+yearly interest and its tax shield, so the NPVs differ with the granularity.
+"""
+import numpy as np
+
+from .debt import debt_schedule_batch
+from .depreciation import depreciation_rates
+
+
+def _as_columns(*args):
+    """Broadcast scalars / 1-D arrays to a common length and return (n, 1) float columns."""
+    arrays = [np.atleast_1d(np.asarray(a, dtype=float)) for a in args]
+    for a in arrays:
+        if a.ndim != 1:
+            raise ValueError("batch arguments must be scalars or 1-D arrays")
+    return [a.reshape(-1, 1) for a in np.broadcast_arrays(*arrays)]
+
+
+def periodic_rate(annual_rate, periods_per_year):
+    """Rate per period equivalent to an annual rate, compounded periods_per_year times."""
+    if periods_per_year == 1:
+        return annual_rate
+    return np.expm1(np.log1p(annual_rate) / periods_per_year)
+
+
+def _first_period_amount(annual_amount, annual_rate, rate, periods_per_year):
+    """First-period amount of a stream growing at rate per period whose first-year total is annual_amount."""
+    if periods_per_year == 1:
+        return annual_amount
+    # Sum over the first year of a geometric series: first * ((1 + rate) ** m - 1) / rate
+    no_growth = annual_rate == 0
+    safe_rate = np.where(no_growth, 1.0, annual_rate)
+    return np.where(no_growth, annual_amount / periods_per_year, annual_amount * rate / safe_rate)
+
+
+def yearly_totals(cashflows, periods_per_year):
+    """
+    Sum period cash flows into years: column 0 (time 0) is kept and every
+    following block of periods_per_year columns becomes one year.
+    """
+    cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    periods_per_year = int(periods_per_year)
+    if periods_per_year == 1:
+        return cashflows
+    n_rows, n_columns = cashflows.shape
+    years = (n_columns - 1) // periods_per_year
+    totals = np.empty((n_rows, years + 1))
+    totals[:, 0] = cashflows[:, 0]
+    totals[:, 1:] = cashflows[:, 1:].reshape(n_rows, years, periods_per_year).sum(axis=2)
+    return totals
+
+
+def ownership_cashflows_batch(CAPEX, debt_ratio, interest_rate, debt_term, n_years,
+                              operating_cost, op_cost_growth, depreciation_years,
+                              tax_rate, salvage_value, periods_per_year=1, debt_schedule=0,
+                              balloon_fraction=0.0, interest_only_years=0.0, depreciation_method=0,
+                              custom_depreciation=None):
+    """
+    Calculate ownership cash flows per period for a batch of scenarios.
+
+    Returns an array of shape (n_scenarios, max(n_years) * periods_per_year + 1).
+    Column 0 is the equity outflow at time 0; rows with a shorter analysis
+    period are padded with zeros after their final period.
+
+    Assumptions (identical to the scalar model):
+      - A portion of CAPEX is financed by debt, repaid over debt_term years on
+        the debt_schedule (a debt.SCHEDULE_CODES value; even principal by default).
+      - Interest on the financed portion is tax-deductible.
+      - Depreciation over depreciation_years creates a tax shield; straight
+        line unless depreciation_method (a depreciation.METHOD_CODES value)
+        says otherwise, with custom_depreciation the yearly rates of CUSTOM rows.
+      - Operating cost grows annually at a constant rate.
+      - Salvage value is received in the final year.
+    With periods_per_year > 1 the terms, rates and amounts above apply per period.
+    """
+    (CAPEX, debt_ratio, interest_rate, debt_term, n_years, operating_cost,
+     op_cost_growth, depreciation_years, tax_rate, salvage_value, debt_schedule,
+     balloon_fraction, interest_only_years, depreciation_method) = _as_columns(
+        CAPEX, debt_ratio, interest_rate, debt_term, n_years, operating_cost,
+        op_cost_growth, depreciation_years, tax_rate, salvage_value, debt_schedule,
+        balloon_fraction, interest_only_years, depreciation_method)
+    depreciation_life = depreciation_years[:, 0]
+    m = periods_per_year
+    if m != 1:
+        # Terms in periods; the rates below are per period
+        debt_term, depreciation_years, n_years = debt_term * m, depreciation_years * m, n_years * m
+        interest_only_years = interest_only_years * m
+        period_growth = periodic_rate(op_cost_growth, m)
+        operating_cost = _first_period_amount(operating_cost, op_cost_growth, period_growth, m)
+        op_cost_growth = period_growth
+        interest_rate = periodic_rate(interest_rate, m)
+
+    horizon = int(n_years.max())
+    t = np.arange(1, horizon + 1, dtype=float)
+
+    debt_amount = CAPEX * debt_ratio
+    if debt_schedule.any():
+        # Interest and principal of every period from the schedule matrix
+        interest_expense, principal_repaid = debt_schedule_batch(
+            debt_amount, interest_rate[:, 0], debt_term[:, 0], debt_schedule[:, 0],
+            balloon_fraction[:, 0], interest_only_years[:, 0], horizon)
+    else:
+        # Even principal everywhere: closed form without building the schedule
+        principal_payment = np.divide(debt_amount, debt_term,
+                                      out=np.zeros_like(debt_amount),
+                                      where=debt_term > 0)
+
+        # Debt outstanding at the start of period t: one instalment has been
+        # repaid for every earlier period that fell inside the debt term.
+        repaid_periods = np.minimum(t - 1, np.floor(debt_term))
+        outstanding_debt = debt_amount - principal_payment * repaid_periods
+        interest_expense = np.maximum(outstanding_debt, 0.0)
+        interest_expense *= interest_rate
+        principal_repaid = np.where(t <= debt_term, principal_payment, 0.0)
+
+    cashflows = np.empty((interest_expense.shape[0], horizon + 1))
+    cashflows[:, 0] = (-CAPEX * (1 - debt_ratio))[:, 0]
+
+    # net_cash = -op_cost - financing_cash + tax_shield, where
+    #   financing_cash = principal + interest
+    #   tax_shield     = (depreciation + interest) * tax_rate
+    # Terms are accumulated in place so each one touches the matrix only once.
+    net_cash = cashflows[:, 1:]
+    np.multiply(operating_cost, (1 + op_cost_growth) ** (t - 1), out=net_cash)
+    np.negative(net_cash, out=net_cash)
+    net_cash -= interest_expense * (1 - tax_rate)
+    net_cash -= principal_repaid
+    if depreciation_method.any():
+        # Yearly rates from the cached tables, each year's spread over its periods
+        rates = depreciation_rates(depreciation_method[:, 0], depreciation_life, -(-horizon // m),
+                                   custom_depreciation)
+        if m != 1:
+            rates = np.repeat(rates / m, m, axis=1)
+        net_cash += rates[:, :horizon] * (CAPEX * tax_rate)
+    else:
+        depreciation_charge = CAPEX / depreciation_years
+        net_cash += np.where(t <= depreciation_years, depreciation_charge * tax_rate, 0.0)
+
+    # Salvage in each row's final period, then zero the padding after it.
+    last_year = n_years[:, 0].astype(int)
+    rows = np.flatnonzero(last_year >= 1)
+    net_cash[rows, last_year[rows] - 1] += salvage_value[rows, 0]
+    if (last_year != horizon).any():
+        net_cash[t > n_years] = 0.0
+    return cashflows
+
+
+def leasing_cashflows_batch(initial_lease_payment, lease_escalation, n_years, tax_rate,
+                            periods_per_year=1):
+    """
+    Calculate leasing cash flows per period for a batch of scenarios.
+
+    The escalation schedule is built as a power matrix (1 + escalation) ** (t - 1)
+    in one step instead of compounding period by period. Returns an array of
+    shape (n_scenarios, max(n_years) * periods_per_year + 1) with a zero time-0
+    column and zero padding after each row's final period.
+
+    Assumptions (identical to the scalar model):
+      - Lease payments escalate annually at a fixed rate.
+      - Lease payments are fully tax-deductible.
+    With periods_per_year > 1 payments are made and escalated every period.
+    """
+    initial_lease_payment, lease_escalation, n_years, tax_rate = _as_columns(
+        initial_lease_payment, lease_escalation, n_years, tax_rate)
+    m = periods_per_year
+    if m != 1:
+        period_escalation = periodic_rate(lease_escalation, m)
+        initial_lease_payment = _first_period_amount(initial_lease_payment, lease_escalation,
+                                                     period_escalation, m)
+        lease_escalation, n_years = period_escalation, n_years * m
+
+    horizon = int(n_years.max())
+    t = np.arange(1, horizon + 1, dtype=float)
+
+    lease_payment = initial_lease_payment * (1 + lease_escalation) ** (t - 1)
+    net_cash = -lease_payment + (lease_payment * tax_rate)
+
+    cashflows = np.zeros((net_cash.shape[0], horizon + 1))  # No upfront cost for leasing
+    cashflows[:, 1:] = np.where(t <= n_years, net_cash, 0.0)
+    return cashflows
@@ -0,0 +1,105 @@
+"""
+Break-even values: the input value at which owning and leasing have equal NPV.
+
+The root of own_npv - lease_npv is found with the Illinois variant of
+regula falsi inside a [low, high] bracket. Every scenario of a batch is
+solved at once; each iteration evaluates only the rows that have not yet
+converged, in one batched call.
+"""
+import numpy as np
+
+from .model import INTEGER_KEYS, PARAM_KEYS, param_bounds
+from .scenarios import (evaluate_npvs, has_lease_options, leasing_npvs, ownership_npvs,
+                        scenario_count)
+
+# Inputs offered for break-even analysis in the app and the CLI
+BREAKEVEN_KEYS = ("lease_payment", "CAPEX", "wacc", "interest_rate", "salvage")
+
+# Inputs that enter only one of the two cash-flow streams
+_LEASING_ONLY_KEYS = ("lease_payment", "lease_escalation", "lease_option", "purchase_price",
+                      "renewal_rent", "renewal_years", "asset_vol")
+_OWNERSHIP_ONLY_KEYS = ("CAPEX", "salvage", "op_cost", "debt_ratio", "interest_rate",
+                        "debt_term", "debt_schedule", "balloon_pct", "io_years", "depr_years",
+                        "depr_method", "op_growth")
+# CAPEX is also the facility value that lease options are written on
+_OPTION_KEYS = ("CAPEX",)
+
+
+def _delta_function(params, key, n, curve=None, custom_depreciation=None):
+    """
+    Return f(values, rows): own_npv - lease_npv for the given rows with key set
+    to values. A stream that key does not enter is evaluated once up front.
+    """
+    # Every column is broadcast to one value per scenario, so length-1 arrays
+    # are indexed like the full-length ones
+    columns = {name: np.broadcast_to(np.asarray(params[name], dtype=float), (n,))
+               for name in PARAM_KEYS}
+
+    def subset(values, rows):
+        rows_params = {name: column[rows] for name, column in columns.items()}
+        rows_params[key] = values
+        return rows_params
+
+    if key in _LEASING_ONLY_KEYS:
+        own_npv = np.broadcast_to(ownership_npvs(params, curve, custom_depreciation), (n,))
+        return lambda values, rows: own_npv[rows] - leasing_npvs(subset(values, rows), curve)
+    if key in _OWNERSHIP_ONLY_KEYS and not (key in _OPTION_KEYS and has_lease_options(params)):
+        lease_npv = np.broadcast_to(leasing_npvs(params, curve), (n,))
+        return lambda values, rows: (ownership_npvs(subset(values, rows), curve, custom_depreciation)
+                                     - lease_npv[rows])
+
+    def delta(values, rows):
+        own_npv, lease_npv = evaluate_npvs(subset(values, rows), curve, custom_depreciation)
+        return own_npv - lease_npv
+    return delta
+
+
+def break_even(params, key, low=None, high=None, xtol=1e-9, max_iter=100, curve=None,
+               custom_depreciation=None):
+    """
+    Value of key (app units) at which own_npv equals lease_npv, per scenario.
+
+    params holds every input as a scalar or a 1-D array; key's own value is
+    ignored. The root is searched in [low, high], which default to the widget
+    bounds of key and may be scalars or per-scenario arrays. Scenarios whose
+    NPV difference does not change sign over the bracket get NaN. NPVs are
+    discounted along curve when one is given, and custom_depreciation is as
+    for scenarios.evaluate_npvs. Returns a 1-D array with one entry per scenario.
+    """
+    if key not in PARAM_KEYS:
+        raise KeyError(f"unknown parameter: {key}")
+    if key in INTEGER_KEYS:
+        raise ValueError(f"{key} counts whole years and has no continuous break-even")
+    n = scenario_count(params)
+    default_low, default_high = param_bounds[key]
+    a = np.broadcast_to(np.asarray(default_low if low is None else low, dtype=float), (n,)).copy()
+    b = np.broadcast_to(np.asarray(default_high if high is None else high, dtype=float), (n,)).copy()
+    npv_delta = _delta_function(params, key, n, curve, custom_depreciation)
+    everything = np.arange(n)
+    fa = npv_delta(a, everything)
+    fb = npv_delta(b, everything)
+
+    root = np.full(n, np.nan)
+    root[fa == 0] = a[fa == 0]
+    root[fb == 0] = b[fb == 0]
+    active = np.flatnonzero((np.sign(fa) * np.sign(fb) < 0))
+    a, b, fa, fb = a[active], b[active], fa[active], fb[active]
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        c = b - fb * (b - a) / (fb - fa)
+        fc = npv_delta(c, active)
+        # Keep the root bracketed between b and a; halve the stale end's value
+        # so that end cannot stay fixed for many iterations.
+        crossed = np.sign(fc) * np.sign(fb) < 0
+        a, fa = np.where(crossed, b, a), np.where(crossed, fb, fa / 2)
+        step = np.abs(c - b)
+        b, fb = c, fc
+        tol = xtol * (1 + np.abs(b))
+        done = (fc == 0) | (np.abs(b - a) <= tol) | (step <= tol)
+        root[active[done]] = b[done]
+        keep = ~done
+        active, a, b, fa, fb = active[keep], a[keep], b[keep], fa[keep], fb[keep]
+    # Rows still open after max_iter return their best estimate
+    root[active] = b
+    return root
@@ -0,0 +1,55 @@
+"""
+Bounded LRU cache with hit/miss counters, shared safely between threads.
+
+Streamlit serves every session from a thread in the same process, so one
+instance can be shared by all analysts on a deployment.
+"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Least-recently-used mapping holding at most maxsize entries."""
+
+    def __init__(self, maxsize=256):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, calling compute() and storing its result on a miss."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        # Compute outside the lock so a slow miss does not block other sessions.
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
@@ -0,0 +1,175 @@
+"""
+Vega-Lite chart specifications for the app's cash-flow charts.
+
+Specs are plain dictionaries with their data inlined, so they can be cached
+and handed to st.vega_lite_chart without creating any matplotlib figures.
+Amounts are plotted in millions of dollars.
+"""
+import numpy as np
+
+OPTION_COLORS = {"domain": ["Owning", "Leasing"], "range": ["#1f77b4", "#ff7f0e"]}
+
+
+def _long_records(years, series, value_name):
+    """Flatten {option: values} into Vega-Lite records, converting dollars to millions."""
+    years = np.asarray(years).tolist()
+    records = []
+    for option, values in series.items():
+        for year, value in zip(years, (np.asarray(values, dtype=float) / 1e6).tolist()):
+            records.append({"Year": year, "Option": option, value_name: value})
+    return records
+
+
+def yearly_cashflow_spec(years, own_cf, lease_cf):
+    """Grouped bar chart of yearly owning vs. leasing cash flows."""
+    value_name = "Cash Flow (Millions $)"
+    return {
+        "title": "Yearly Cash Flows: Owning vs. Leasing",
+        "data": {"values": _long_records(years, {"Owning": own_cf, "Leasing": lease_cf}, value_name)},
+        "mark": {"type": "bar", "tooltip": True},
+        "encoding": {
+            "x": {"field": "Year", "type": "ordinal", "axis": {"labelAngle": 0}},
+            "xOffset": {"field": "Option", "sort": OPTION_COLORS["domain"]},
+            "y": {"field": value_name, "type": "quantitative"},
+            "color": {"field": "Option", "type": "nominal", "scale": OPTION_COLORS},
+        },
+    }
+
+
+def cumulative_cashflow_spec(years, own_cumulative, lease_cumulative):
+    """Line chart of cumulative owning vs. leasing cash flows."""
+    value_name = "Cumulative Cash Flow (Millions $)"
+    return {
+        "title": "Cumulative Cash Flows: Owning vs. Leasing",
+        "data": {"values": _long_records(
+            years, {"Owning": own_cumulative, "Leasing": lease_cumulative}, value_name)},
+        "mark": {"type": "line", "point": True, "tooltip": True},
+        "encoding": {
+            "x": {"field": "Year", "type": "quantitative", "axis": {"tickMinStep": 1}},
+            "y": {"field": value_name, "type": "quantitative"},
+            "color": {"field": "Option", "type": "nominal", "scale": OPTION_COLORS},
+        },
+    }
+
+
+def histogram_spec(edges, counts, x_title, title):
+    """Histogram from precomputed bin edges and counts, with a rule at zero."""
+    values = [{"bin_start": lo, "bin_end": hi, "count": c}
+              for lo, hi, c in zip(np.asarray(edges[:-1], dtype=float).tolist(),
+                                   np.asarray(edges[1:], dtype=float).tolist(),
+                                   np.asarray(counts).tolist())]
+    return {
+        "title": title,
+        "layer": [
+            {
+                "data": {"values": values},
+                "mark": {"type": "bar", "tooltip": True},
+                "encoding": {
+                    "x": {"field": "bin_start", "type": "quantitative", "title": x_title},
+                    "x2": {"field": "bin_end"},
+                    "y": {"field": "count", "type": "quantitative", "title": "Draws"},
+                },
+            },
+            {
+                "data": {"values": [{"zero": 0.0}]},
+                "mark": {"type": "rule", "color": "black"},
+                "encoding": {"x": {"field": "zero", "type": "quantitative"}},
+            },
+        ],
+    }
+
+
+def _cell_edges(centers):
+    """Cell boundaries halfway between centers, extended half a step at both ends."""
+    centers = np.asarray(centers, dtype=float)
+    if centers.size == 1:
+        return np.array([centers[0] - 0.5, centers[0] + 0.5])
+    mid = (centers[1:] + centers[:-1]) / 2
+    return np.concatenate([[2 * centers[0] - mid[0]], mid, [2 * centers[-1] - mid[-1]]])
+
+
+def heatmap_spec(x_values, y_values, grid, x_title, y_title, title):
+    """
+    Heatmap of grid[i, j] (dollars) at (x_values[j], y_values[i]), diverging around zero.
+
+    The grid is shipped as one flat array that Vega-Lite unpacks with a flatten
+    transform, which keeps a 500x500 spec to a few MB instead of one record per cell.
+    """
+    x_edges, y_edges = _cell_edges(x_values), _cell_edges(y_values)
+    value_name = "NPV Difference (Millions $)"
+    return {
+        "title": title,
+        "data": {"values": [{
+            "delta": np.round(np.asarray(grid, dtype=float) / 1e6, 4).ravel().tolist(),
+            "xe": x_edges.tolist(),
+            "ye": y_edges.tolist(),
+        }]},
+        "transform": [
+            {"flatten": ["delta"]},
+            {"window": [{"op": "row_number", "as": "cell"}]},
+            {"calculate": "(datum.cell - 1) % (length(datum.xe) - 1)", "as": "col"},
+            {"calculate": "floor((datum.cell - 1) / (length(datum.xe) - 1))", "as": "row"},
+            {"calculate": "datum.xe[datum.col]", "as": "x"},
+            {"calculate": "datum.xe[datum.col + 1]", "as": "x2"},
+            {"calculate": "datum.ye[datum.row]", "as": "y"},
+            {"calculate": "datum.ye[datum.row + 1]", "as": "y2"},
+            {"calculate": "(datum.x + datum.x2) / 2", "as": x_title},
+            {"calculate": "(datum.y + datum.y2) / 2", "as": y_title},
+            {"calculate": "datum.delta", "as": value_name},
+        ],
+        "mark": "rect",
+        "encoding": {
+            "x": {"field": "x", "type": "quantitative", "title": x_title,
+                  "scale": {"domain": [x_edges[0], x_edges[-1]], "nice": False, "zero": False}},
+            "x2": {"field": "x2"},
+            "y": {"field": "y", "type": "quantitative", "title": y_title,
+                  "scale": {"domain": [y_edges[0], y_edges[-1]], "nice": False, "zero": False}},
+            "y2": {"field": "y2"},
+            "color": {"field": value_name, "type": "quantitative",
+                      "scale": {"scheme": "redblue", "domainMid": 0}},
+            "tooltip": [
+                {"field": x_title, "type": "quantitative", "format": ",.2f"},
+                {"field": y_title, "type": "quantitative", "format": ",.2f"},
+                {"field": value_name, "type": "quantitative", "format": ",.1f"},
+            ],
+        },
+    }
+
+
+def tornado_spec(labels, base, low, high, x_title, title):
+    """
+    Tornado chart: one bar per input from the base value to its value with the
+    input at its low and at its high bound (dollars). Widest swing on top.
+    """
+    base = float(base) / 1e6
+    low = np.asarray(low, dtype=float) / 1e6
+    high = np.asarray(high, dtype=float) / 1e6
+    order = np.argsort(-np.abs(high - low), kind="stable")
+    records = []
+    for i in order.tolist():
+        for bound, value in (("Low", low[i]), ("High", high[i])):
+            records.append({"Parameter": labels[i], "Bound": f"Input at {bound.lower()} bound",
+                            "start": base, x_title: float(value)})
+    return {
+        "title": title,
+        "layer": [
+            {
+                "data": {"values": records},
+                "mark": {"type": "bar", "tooltip": True},
+                "encoding": {
+                    "y": {"field": "Parameter", "type": "nominal",
+                          "sort": [labels[i] for i in order.tolist()], "title": None},
+                    "x": {"field": "start", "type": "quantitative", "title": x_title},
+                    "x2": {"field": x_title},
+                    "color": {"field": "Bound", "type": "nominal", "title": None,
+                              "scale": {"range": ["#d62728", "#2ca02c"]}},
+                    "yOffset": {"field": "Bound"},
+                },
+            },
+            {
+                "data": {"values": [{"base": base}]},
+                "mark": {"type": "rule", "color": "black"},
+                "encoding": {"x": {"field": "base", "type": "quantitative"}},
+            },
+        ],
+    }
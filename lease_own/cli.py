@@ -0,0 +1,343 @@
+"""
+Command-line batch evaluator for scenario files.
+
+Reads a CSV or Parquet table with one scenario per row and columns named after
+the default_values keys (app units: $M, percent, years), evaluates the
+ownership / leasing / NPV model in chunks and streams the results to a CSV or
+Parquet file. Headers may also be the display labels ("CAPEX ($M)").
+Parameter columns missing from the input take their default value; any other
+columns (site ids, names) are copied to the output.
+
+    python -m lease_own scenarios.csv results.csv --chunk-size 100000 --workers 4
+
+--break-even KEY adds the value of KEY at which both options have equal NPV
+(NaN where there is none within KEY's input range).
+
+    python -m lease_own simulate --vary wacc=normal:6,1 --mean-tolerance 0.1
+
+runs a Monte Carlo simulation in batches until the requested precision is
+reached, printing progress to stderr.
+
+Both modes accept --curve YEARS:RATE,... (rates in percent, e.g.
+--curve 1:4.5,5:5,10:5.5) to discount along a yield curve instead of at each
+scenario's WACC; add --forward-curve if the rates are one-year forwards.
+Scenarios with depr_method 3 (custom) take their yearly depreciation from
+--custom-depreciation PCT,PCT,... (percent of CAPEX per year).
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .breakeven import BREAKEVEN_KEYS, break_even
+from .model import default_values
+from .npv import YieldCurve
+from .parallel import run_sweep
+from .portfolio import (missing_param_columns, rename_param_columns, scenario_table,
+                        with_metrics, with_results)
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in (".parquet", ".pq")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise SystemExit("Parquet input/output requires pyarrow (pip install pyarrow)")
+
+
+def read_chunks(path, chunk_size):
+    """Yield the input table as pandas DataFrames of at most chunk_size rows."""
+    import pandas as pd
+
+    if _is_parquet(path):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class ResultWriter:
+    """Appends result chunks to a CSV or Parquet file without holding earlier chunks."""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet_writer = None
+        self._wrote_header = False
+        if _is_parquet(path):
+            _require_pyarrow()
+
+    def write(self, frame):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode="a" if self._wrote_header else "w",
+                         header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def evaluate_chunk(frame, workers=1, shard_size=DEFAULT_CHUNK_SIZE, executor=None,
+                   break_even_keys=(), metrics=False, curve=None, custom_depreciation=None):
+    """
+    Return frame's columns followed by NPVs ($M), their difference and the
+    decision, the IRR / payback / crossover columns if metrics is true, and a
+    breakeven_<key> column for each of break_even_keys. NPVs are discounted
+    along curve if given; custom_depreciation holds the custom method's rates.
+    """
+    frame = rename_param_columns(frame)
+    table = scenario_table(frame)
+    own_npv, lease_npv = run_sweep(table, workers=workers, chunk_size=shard_size, executor=executor,
+                                   curve=curve, custom_depreciation=custom_depreciation)
+    result = with_results(frame, own_npv, lease_npv)
+    if metrics:
+        with_metrics(result, table, curve, custom_depreciation)
+    for key in break_even_keys:
+        result[f"breakeven_{key}"] = break_even(table, key, curve=curve,
+                                                custom_depreciation=custom_depreciation)
+    return result
+
+
+def parse_distribution(text):
+    """Parse KEY=KIND:a,b[,c,d] (normal:mean,std[,low,high], uniform:low,high, triangular:low,mode,high)."""
+    from .montecarlo import Normal, Triangular, Uniform
+
+    kinds = {"normal": (Normal, (2, 4)), "uniform": (Uniform, (2,)), "triangular": (Triangular, (3,))}
+    try:
+        key, spec = text.split("=", 1)
+        kind, numbers = spec.split(":", 1)
+        cls, arities = kinds[kind.strip().lower()]
+        values = [float(v) for v in numbers.split(",")]
+    except (ValueError, KeyError):
+        raise argparse.ArgumentTypeError(f"expected KEY=normal|uniform|triangular:a,b[,...], got {text!r}")
+    key = key.strip()
+    if key not in default_values:
+        raise argparse.ArgumentTypeError(f"unknown parameter {key!r}")
+    if len(values) not in arities:
+        raise argparse.ArgumentTypeError(f"{kind} takes {' or '.join(map(str, arities))} numbers")
+    return key, cls(*values)
+
+
+def parse_setting(text):
+    """Parse KEY=VALUE into (key, float)."""
+    key, _, value = text.partition("=")
+    if key.strip() not in default_values:
+        raise argparse.ArgumentTypeError(f"unknown parameter {key.strip()!r}")
+    try:
+        return key.strip(), float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got {text!r}")
+
+
+def parse_correlation(text):
+    """Parse KEY,KEY=RHO into ((key, key), float)."""
+    pair, _, value = text.partition("=")
+    keys = tuple(key.strip() for key in pair.split(","))
+    if len(keys) != 2:
+        raise argparse.ArgumentTypeError(f"expected KEY,KEY=RHO, got {text!r}")
+    for key in keys:
+        if key not in default_values:
+            raise argparse.ArgumentTypeError(f"unknown parameter {key!r}")
+    try:
+        return keys, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected KEY,KEY=RHO, got {text!r}")
+
+
+def parse_curve(text):
+    """Parse YEARS:RATE,... (rates in percent) into (tenors, rates as fractions)."""
+    try:
+        points = [point.split(":") for point in text.split(",")]
+        tenors, rates = zip(*((float(years), float(rate) / 100.0) for years, rate in points))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YEARS:RATE,..., got {text!r}")
+    return tenors, rates
+
+
+def parse_percentages(text):
+    """Parse PCT,PCT,... into a tuple of fractions."""
+    try:
+        return tuple(float(value) / 100.0 for value in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected PCT,PCT,..., got {text!r}")
+
+
+def _add_model_options(parser):
+    parser.add_argument("--curve", type=parse_curve, metavar="YEARS:RATE,...",
+                        help="discount along this yield curve (rates in percent, e.g. "
+                             "1:4.5,5:5,10:5.5) instead of at each scenario's WACC")
+    parser.add_argument("--forward-curve", action="store_true",
+                        help="--curve rates are one-year forward rates, not spot rates")
+    parser.add_argument("--custom-depreciation", type=parse_percentages, metavar="PCT,PCT,...",
+                        help="yearly depreciation, in percent of CAPEX, of scenarios whose "
+                             "depr_method is 3 (custom), e.g. 40,30,20,10")
+
+
+def _curve_from_args(parser, args):
+    if args.curve is None:
+        if args.forward_curve:
+            parser.error("--forward-curve needs --curve")
+        return None
+    try:
+        return YieldCurve(*args.curve, forward=args.forward_curve)
+    except ValueError as error:
+        parser.error(str(error))
+
+
+def simulate_main(argv):
+    """python -m lease_own simulate: adaptive Monte Carlo run with progress on stderr."""
+    from .montecarlo import DEFAULT_PERCENTILES, simulate_until
+    from .sampling import SAMPLERS, cholesky_factor
+
+    parser = argparse.ArgumentParser(
+        prog="python -m lease_own simulate",
+        description="Simulate the NPV difference (owning minus leasing) in batches until the "
+                    "estimates reach the requested precision.",
+    )
+    parser.add_argument("--vary", action="append", type=parse_distribution, default=[],
+                        metavar="KEY=DIST:ARGS",
+                        help="uncertain input, e.g. wacc=normal:6,1 or salvage=uniform:20,60 or "
+                             "lease_escalation=triangular:2,3,5; may be repeated")
+    parser.add_argument("--set", action="append", type=parse_setting, default=[],
+                        metavar="KEY=VALUE", help="base value of an input (default: app defaults)")
+    parser.add_argument("--correlate", action="append", type=parse_correlation, default=[],
+                        metavar="KEY,KEY=RHO",
+                        help="correlation between two --vary inputs, e.g. interest_rate,wacc=0.7; "
+                             "may be repeated")
+    parser.add_argument("--mean-tolerance", type=float,
+                        help="target half-width of the mean NPV difference interval, $M")
+    parser.add_argument("--p-tolerance", type=float,
+                        help="target half-width of the P(owning wins) interval, percentage points")
+    parser.add_argument("--confidence", type=float, default=0.95,
+                        help="confidence level of the intervals (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=8192,
+                        help="draws per batch (default: %(default)s)")
+    parser.add_argument("--max-draws", type=int, default=10_000_000,
+                        help="stop here even if not converged (default: %(default)s)")
+    parser.add_argument("--sampler", choices=SAMPLERS, default="random")
+    parser.add_argument("--seed", type=int)
+    _add_model_options(parser)
+    args = parser.parse_args(argv)
+    if not args.vary:
+        parser.error("give at least one --vary")
+    if args.mean_tolerance is None and args.p_tolerance is None:
+        parser.error("give --mean-tolerance, --p-tolerance or both")
+    curve = _curve_from_args(parser, args)
+
+    base = dict(default_values)
+    base.update(args.set)
+
+    def report(state):
+        # Intervals need at least two batches
+        mean_hw, p_hw = state.delta_mean_half_width / 1e6, state.p_own_wins_half_width
+        mean_hw = "n/a" if math.isnan(mean_hw) else f"{mean_hw:,.3f}"
+        p_hw = "n/a" if math.isnan(p_hw) else f"{p_hw:.3%}"
+        print(f"{state.n_draws:>12,} draws  mean {state.delta_mean / 1e6:,.3f} ± {mean_hw} $M  "
+              f"P(own wins) {state.p_own_wins:.3%} ± {p_hw}", file=sys.stderr)
+
+    distributions, correlations = dict(args.vary), dict(args.correlate)
+    try:
+        cholesky_factor([key for key in default_values if key in distributions], correlations)
+    except ValueError as error:
+        parser.error(str(error))
+
+    start = time.perf_counter()
+    try:
+        result = simulate_until(
+            base, distributions,
+            mean_tolerance=None if args.mean_tolerance is None else args.mean_tolerance * 1e6,
+            p_tolerance=None if args.p_tolerance is None else args.p_tolerance / 100,
+            confidence=args.confidence, batch_size=args.batch_size, max_draws=args.max_draws,
+            seed=args.seed, sampler=args.sampler, progress=report, correlations=correlations,
+            curve=curve, custom_depreciation=args.custom_depreciation,
+        )
+    except ValueError as error:
+        raise SystemExit(f"error: {error}")
+    elapsed = time.perf_counter() - start
+    status = "converged" if result.converged else "stopped at --max-draws before converging"
+    print(f"{status} after {result.n_draws:,} draws in {elapsed:.2f} s", file=sys.stderr)
+    print(f"mean NPV difference ($M): {result.delta_mean / 1e6:,.3f} "
+          f"(standard error {result.delta_mean_se / 1e6:,.3f})")
+    print(f"P(owning wins): {result.p_own_wins:.3%} (standard error {result.p_own_wins_se:.3%})")
+    for p in DEFAULT_PERCENTILES:
+        print(f"P{p} ($M): {result.percentiles[p] / 1e6:,.3f} "
+              f"(standard error {result.percentile_se[p] / 1e6:,.3f})")
+    return 0 if result.converged else 1
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["simulate"]:
+        return simulate_main(argv[1:])
+    parser = argparse.ArgumentParser(
+        prog="python -m lease_own",
+        description="Evaluate lease-vs-own NPVs for every row of a CSV or Parquet scenario table. "
+                    "Run 'python -m lease_own simulate --help' for Monte Carlo runs.",
+    )
+    parser.add_argument("input", help="scenario table (.csv or .parquet)")
+    parser.add_argument("output", help="result file (.csv or .parquet)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="rows read, evaluated and written at a time (default: %(default)s)")
+    parser.add_argument("--break-even", action="append", default=[], choices=BREAKEVEN_KEYS,
+                        metavar="KEY", dest="break_even",
+                        help="also solve for the value of KEY at which owning and leasing break "
+                             f"even; may be repeated ({', '.join(BREAKEVEN_KEYS)})")
+    parser.add_argument("--metrics", action="store_true",
+                        help="also report the IRR of owning over leasing, the discounted payback "
+                             "year and the cumulative crossover year")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes shared by all chunks (default: %(default)s)")
+    _add_model_options(parser)
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    curve = _curve_from_args(parser, args)
+
+    start = time.perf_counter()
+    n_rows = 0
+    missing_reported = False
+    shard_size = max(1, -(-args.chunk_size // max(args.workers, 1)))
+    writer = ResultWriter(args.output)
+    # One pool for the whole run instead of one per chunk
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    try:
+        for frame in read_chunks(args.input, args.chunk_size):
+            if not missing_reported:
+                missing = missing_param_columns(rename_param_columns(frame))
+                if missing:
+                    print(f"Using default values for missing columns: {', '.join(missing)}",
+                          file=sys.stderr)
+                missing_reported = True
+            writer.write(evaluate_chunk(frame, workers=args.workers, shard_size=shard_size,
+                                        executor=executor, break_even_keys=args.break_even,
+                                        metrics=args.metrics, curve=curve,
+                                        custom_depreciation=args.custom_depreciation))
+            n_rows += len(frame)
+    except ValueError as error:
+        # Bad cells, unknown codes or a missing custom schedule: one line, not a traceback
+        raise SystemExit(f"error: {args.input}: {error}")
+    finally:
+        writer.close()
+        if executor is not None:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - start
+    rate = n_rows / elapsed if elapsed > 0 else float("inf")
+    print(f"Evaluated {n_rows:,} scenarios in {elapsed:.2f} s ({rate:,.0f} rows/s)", file=sys.stderr)
+    return 0
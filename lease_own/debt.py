@@ -0,0 +1,156 @@
+"""
+Debt schedules of the ownership model, computed for whole batches of scenarios.
+
+A schedule is described by f[t], the fraction of the original debt D still
+outstanding at the end of period t (f[0] = 1). Principal and interest follow
+from it for every period t >= 1:
+
+    principal[t] = D * (f[t - 1] - f[t])        interest[t] = rate * D * f[t - 1]
+
+Schedules (the debt_schedule codes; display names are model.DEBT_SCHEDULES):
+
+  - EVEN_PRINCIPAL: the same principal every period of the term.
+  - LEVEL_PAYMENT: an annuity; principal plus interest is constant.
+  - BALLOON: level payments amortize all but balloon_fraction of the debt,
+    which is repaid together with the last payment.
+  - INTEREST_ONLY: interest only for the first interest_only periods, then
+    level payments over the rest of the term.
+
+f depends only on (schedule, rate, term, balloon_fraction, interest_only),
+which few rows of a batch usually differ in. Fraction tables are therefore
+built once per distinct combination, kept in an LRU cache like the discount
+tables in npv, and gathered per row.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+EVEN_PRINCIPAL, LEVEL_PAYMENT, BALLOON, INTEREST_ONLY = 0, 1, 2, 3
+SCHEDULE_CODES = (EVEN_PRINCIPAL, LEVEL_PAYMENT, BALLOON, INTEREST_ONLY)
+
+# Number of (schedule set, horizon) tables kept alive.
+SCHEDULE_TABLE_CACHE_SIZE = 64
+# Batches with more distinct schedules than this (e.g. Monte Carlo draws of the
+# interest rate) are computed row by row without caching.
+MAX_CACHED_SCHEDULES = 4096
+
+
+def _build_fractions(schedules, horizon):
+    """
+    Outstanding fractions, shape (n, horizon + 1), for an (n, 5) array of
+    (schedule, rate, term, balloon_fraction, interest_only) rows; terms in periods.
+    """
+    schedule, rate, term, balloon, interest_only = (schedules[:, [i]] for i in range(5))
+    t = np.arange(horizon + 1, dtype=float)
+    fractions = np.empty((schedules.shape[0], horizon + 1))
+
+    # Even principal: one instalment of term-th of the debt per whole period
+    even = schedule[:, 0] == EVEN_PRINCIPAL
+    if even.any():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fractions[even] = 1.0 - np.minimum(t, np.floor(term[even])) / term[even]
+
+    # Annuity over the n periods after the interest-only ones: the share of the
+    # amortizing part repaid after s of them is
+    # ((1 + r) ** s - 1) / ((1 + r) ** n - 1), or s / n at a zero rate.
+    level = ~even
+    if level.any():
+        kind, rate, level_term = schedule[level], rate[level], term[level]
+        interest_only = np.where(kind == INTEREST_ONLY,
+                                 np.clip(interest_only[level], 0.0, level_term), 0.0)
+        n = level_term - interest_only
+        s = np.clip(t - interest_only, 0.0, n)
+        growth = np.log1p(rate)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            repaid = np.expm1(s * growth)
+            repaid /= np.expm1(n * growth)
+            flat = rate[:, 0] == 0
+            repaid[flat] = s[flat] / n[flat]
+        repaid[n[:, 0] <= 0] = 0.0
+        retained = np.where(kind == BALLOON, balloon[level], 0.0)
+        repaid *= 1.0 - retained
+        np.subtract(1.0, repaid, out=repaid)
+        # Whatever is left (the balloon, or everything after interest only) is due at the end of the term
+        repaid[t >= level_term] = 0.0
+        fractions[level] = repaid
+
+    # A zero term repays nothing, as in the even-principal model
+    fractions[term[:, 0] <= 0] = 1.0
+    return fractions
+
+
+def distinct_rows(rows, limit):
+    """
+    (distinct rows, row index into them) of a 2-D array, like
+    np.unique(axis=0); None as soon as there are more than limit distinct rows.
+    """
+    # One 1-D np.unique per varying column, combined into a single code per row
+    # and renumbered after each column so the codes stay below the row count.
+    codes = np.zeros(rows.shape[0], dtype=np.int64)
+    for column in rows.T:
+        if column.min() == column.max():
+            continue
+        values, index = np.unique(column, return_inverse=True)
+        if values.size > limit:
+            return None
+        codes = np.unique(codes * values.size + index.ravel(), return_inverse=True)[1].ravel()
+    _, first, row_index = np.unique(codes, return_index=True, return_inverse=True)
+    return rows[first], row_index.ravel()
+
+
+@lru_cache(maxsize=SCHEDULE_TABLE_CACHE_SIZE)
+def _fraction_table(schedule_bytes, horizon):
+    table = _build_fractions(np.frombuffer(schedule_bytes, dtype=float).reshape(-1, 5), horizon)
+    table.flags.writeable = False
+    return table
+
+
+def schedule_cache_info():
+    """Hit/miss statistics of the schedule-table cache."""
+    return _fraction_table.cache_info()
+
+
+def outstanding_fractions(schedule, rate, term, balloon_fraction, interest_only, horizon):
+    """
+    Fraction of the debt outstanding at the end of periods 0..horizon, per row.
+
+    Arguments are scalars or 1-D arrays broadcast against each other: schedule
+    codes, the interest rate per period, and the term and interest-only span
+    in periods. Returns an array of shape (n_rows, horizon + 1).
+    """
+    columns = np.broadcast_arrays(*(np.atleast_1d(np.asarray(a, dtype=float))
+                                    for a in (schedule, rate, term, balloon_fraction, interest_only)))
+    schedules = np.stack(columns, axis=1)
+    if schedules.ndim != 2:
+        raise ValueError("schedule arguments must be scalars or 1-D arrays")
+    unknown = ~np.isin(schedules[:, 0], SCHEDULE_CODES)
+    if unknown.any():
+        raise ValueError(f"unknown debt schedule {schedules[unknown, 0][0]:g}; "
+                         f"expected one of {', '.join(map(str, SCHEDULE_CODES))}")
+    if schedules[:, 3].min() < 0.0 or schedules[:, 3].max() > 1.0:
+        raise ValueError("balloon_fraction must be between 0 and 1")
+    distinct = distinct_rows(schedules, MAX_CACHED_SCHEDULES)
+    if distinct is None or distinct[0].shape[0] > MAX_CACHED_SCHEDULES:
+        return _build_fractions(schedules, int(horizon))
+    unique_schedules, row_index = distinct
+    table = _fraction_table(np.ascontiguousarray(unique_schedules).tobytes(), int(horizon))
+    return table[row_index]
+
+
+def debt_schedule_batch(debt_amount, rate, term, schedule=EVEN_PRINCIPAL, balloon_fraction=0.0,
+                        interest_only=0.0, horizon=None):
+    """
+    Interest and principal payments per period for a batch of loans.
+
+    rate is per period and term and interest_only are in periods; all
+    arguments broadcast as in outstanding_fractions. Returns (interest,
+    principal), each of shape (n_rows, horizon) for periods 1..horizon
+    (horizon defaults to the longest term).
+    """
+    debt_amount = np.atleast_1d(np.asarray(debt_amount, dtype=float)).reshape(-1, 1)
+    if horizon is None:
+        horizon = int(np.ceil(np.max(term)))
+    outstanding = debt_amount * outstanding_fractions(schedule, rate, term, balloon_fraction,
+                                                      interest_only, horizon)
+    rate = np.atleast_1d(np.asarray(rate, dtype=float)).reshape(-1, 1)
+    return rate * outstanding[:, :-1], outstanding[:, :-1] - outstanding[:, 1:]
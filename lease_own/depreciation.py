@@ -0,0 +1,135 @@
+"""
+Depreciation methods of the ownership model, as per-year rate tables.
+
+A method is described by the fraction of CAPEX deducted in each year of the
+analysis; the tax shield of a period is CAPEX * rate * tax_rate. Methods (the
+depr_method codes; display names are model.DEPRECIATION_METHODS):
+
+  - STRAIGHT_LINE: 1 / life every year of the life.
+  - MACRS: the IRS MACRS (GDS, half-year convention) percentages of the
+    shortest recovery class of at least life years, or of the 20-year class
+    for longer lives.
+  - DOUBLE_DECLINING: twice the straight-line rate on the remaining book
+    value, switching to straight line over the rest of the life once that
+    deducts more.
+  - CUSTOM: a schedule of yearly fractions given with the batch.
+
+Rates depend only on (method, life) and the custom schedule, so tables are
+built once per distinct combination, kept in an LRU cache like the debt
+schedules in debt, and gathered per row. With quarterly or monthly cash flows
+each year's deduction is spread evenly over its periods.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from .debt import distinct_rows
+
+STRAIGHT_LINE, MACRS, DOUBLE_DECLINING, CUSTOM = 0, 1, 2, 3
+METHOD_CODES = (STRAIGHT_LINE, MACRS, DOUBLE_DECLINING, CUSTOM)
+
+# MACRS percentages by recovery class (IRS Publication 946, Table A-1: GDS,
+# 200% declining balance for 3 to 10 years, 150% for 15 and 20, half-year convention)
+MACRS_PERCENTAGES = {
+    3: (33.33, 44.45, 14.81, 7.41),
+    5: (20.00, 32.00, 19.20, 11.52, 11.52, 5.76),
+    7: (14.29, 24.49, 17.49, 12.49, 8.93, 8.92, 8.93, 4.46),
+    10: (10.00, 18.00, 14.40, 11.52, 9.22, 7.37, 6.55, 6.55, 6.56, 6.55, 3.28),
+    15: (5.00, 9.50, 8.55, 7.70, 6.93, 6.23, 5.90, 5.90, 5.91, 5.90, 5.91, 5.90, 5.91, 5.90,
+         5.91, 2.95),
+    20: (3.750, 7.219, 6.677, 6.177, 5.713, 5.285, 4.888, 4.522, 4.462, 4.461, 4.462, 4.461,
+         4.462, 4.461, 4.462, 4.461, 4.462, 4.461, 4.462, 4.461, 2.231),
+}
+MACRS_CLASSES = tuple(MACRS_PERCENTAGES)
+
+# Number of (method set, horizon, custom schedule) tables kept alive.
+RATE_TABLE_CACHE_SIZE = 64
+# Batches with more distinct (method, life) pairs than this are computed without caching.
+MAX_CACHED_METHODS = 4096
+
+
+def _macrs_matrix(years):
+    """(len(MACRS_CLASSES), years) MACRS rates as fractions, zero-padded or truncated."""
+    matrix = np.zeros((len(MACRS_CLASSES), max(years, MACRS_CLASSES[-1] + 1)))
+    for i, percentages in enumerate(MACRS_PERCENTAGES.values()):
+        matrix[i, :len(percentages)] = percentages
+    return matrix[:, :years] / 100.0
+
+
+def _build_rates(methods, years, custom):
+    """Yearly rates, shape (n, years), for an (n, 2) array of (method, life) rows."""
+    method, life = methods[:, 0], methods[:, [1]]
+    t = np.arange(1, years + 1, dtype=float)
+    rates = np.zeros((methods.shape[0], years))
+
+    rows = method == STRAIGHT_LINE
+    if rows.any():
+        rates[rows] = np.where(t <= life[rows], 1.0 / life[rows], 0.0)
+
+    rows = method == MACRS
+    if rows.any():
+        recovery_class = np.searchsorted(MACRS_CLASSES, life[rows, 0])
+        rates[rows] = _macrs_matrix(years)[np.minimum(recovery_class, len(MACRS_CLASSES) - 1)]
+
+    rows = method == DOUBLE_DECLINING
+    if rows.any():
+        # Declining balance at d = 2 / life until year s = ceil(life / 2 + 1), from
+        # which straight line over the remaining life deducts at least as much.
+        row_life = life[rows]
+        d = np.minimum(2.0 / row_life, 1.0)
+        switch = np.ceil(row_life / 2.0 + 1.0)
+        declining = d * (1.0 - d) ** (t - 1.0)
+        remaining = np.maximum(row_life - switch + 1.0, 1.0)
+        straight = (1.0 - d) ** (switch - 1.0) / remaining
+        rates[rows] = np.where(t < switch, declining, np.where(t <= row_life, straight, 0.0))
+
+    rows = method == CUSTOM
+    if rows.any():
+        schedule = np.zeros(years)
+        values = np.asarray(custom, dtype=float)[:years]
+        schedule[:values.size] = values
+        rates[rows] = schedule
+    return rates
+
+
+@lru_cache(maxsize=RATE_TABLE_CACHE_SIZE)
+def _rate_table(method_bytes, years, custom):
+    table = _build_rates(np.frombuffer(method_bytes, dtype=float).reshape(-1, 2), years, custom)
+    table.flags.writeable = False
+    return table
+
+
+def rate_cache_info():
+    """Hit/miss statistics of the depreciation-rate cache."""
+    return _rate_table.cache_info()
+
+
+def depreciation_rates(method, life, years, custom=None):
+    """
+    Fraction of CAPEX deducted in years 1..years, per row.
+
+    method (depr_method codes) and life (years) are scalars or 1-D arrays
+    broadcast against each other; custom is the sequence of yearly fractions
+    used by CUSTOM rows. Returns an array of shape (n_rows, years).
+    """
+    columns = np.broadcast_arrays(*(np.atleast_1d(np.asarray(a, dtype=float)) for a in (method, life)))
+    methods = np.stack(columns, axis=1)
+    if methods.ndim != 2:
+        raise ValueError("depreciation arguments must be scalars or 1-D arrays")
+    unknown = ~np.isin(methods[:, 0], METHOD_CODES)
+    if unknown.any():
+        raise ValueError(f"unknown depreciation method {methods[unknown, 0][0]:g}; "
+                         f"expected one of {', '.join(map(str, METHOD_CODES))}")
+    if custom is not None:
+        custom = tuple(float(rate) for rate in custom)
+    if not (methods[:, 0] == CUSTOM).any():
+        # Unused schedules must not split the cache
+        custom = None
+    elif not custom:
+        raise ValueError("the custom depreciation method needs a schedule of yearly rates")
+    distinct = distinct_rows(methods, MAX_CACHED_METHODS)
+    if distinct is None or distinct[0].shape[0] > MAX_CACHED_METHODS:
+        return _build_rates(methods, int(years), custom)
+    unique_methods, row_index = distinct
+    table = _rate_table(np.ascontiguousarray(unique_methods).tobytes(), int(years), custom)
+    return table[row_index]
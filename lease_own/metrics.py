@@ -0,0 +1,159 @@
+"""
+Decision metrics beyond NPV, computed for whole batches of scenarios.
+
+All metrics look at the incremental stream own_cf - lease_cf, i.e. the extra
+cash of owning instead of leasing (usually an equity outlay at time 0 followed
+by savings):
+
+  - IRR: the discount rate at which the incremental stream has zero NPV.
+  - Discounted payback year: the year from which on the incremental stream,
+    discounted at WACC (or along a yield curve) and accumulated, stays
+    non-negative, i.e. the year after its last negative cumulative value.
+  - Crossover year: the year from which on cumulative owning cash flow stays
+    at or above cumulative leasing cash flow (undiscounted).
+
+A stream that starts at zero and dips below it (e.g. a fully debt-financed
+purchase) therefore pays back when it recovers, not at year 0. Years with no
+payback or crossover (the stream ends negative), and IRRs outside the search
+bracket, are NaN.
+With quarterly or monthly cash flows the IRR is annualized and the payback and
+crossover times are in (fractional) years, e.g. 2.25 for the end of month 27.
+"""
+import numpy as np
+
+from .batch import periodic_rate
+from .model import PARAM_KEYS
+from .npv import row_discount_factors
+from .scenarios import (discount_rate, grouped_by_periods, periods_per_year, rows_per_block,
+                        scenario_cashflows, scenario_count)
+
+# Default IRR search bracket, as fractions
+IRR_LOW = -0.99
+IRR_HIGH = 10.0
+# Scenarios evaluated per batch by scenario_metrics
+METRICS_CHUNK_SIZE = 100_000
+
+
+def _recovery_year(cumulative):
+    """
+    Column after the last negative one per row: 0 for rows never negative,
+    NaN for rows still negative in their last column.
+    """
+    negative = cumulative < 0
+    last_negative = negative.shape[1] - 1 - negative[:, ::-1].argmax(axis=1)
+    year = np.where(negative.any(axis=1), last_negative + 1.0, 0.0)
+    return np.where(negative[:, -1], np.nan, year)
+
+
+def irr_batch(cashflows, low=IRR_LOW, high=IRR_HIGH, tol=1e-10, max_iter=100):
+    """
+    Internal rate of return of every row of a cash-flow matrix.
+
+    Safeguarded Newton iteration: each row keeps a [low, high] bracket around
+    its root and falls back to bisection whenever a Newton step would leave it
+    or converges too slowly. Only unconverged rows are updated. Rows whose NPV has the same sign at both
+    ends of the bracket get NaN. Returns rates as fractions, shape (n_rows,).
+    """
+    cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    n_rows, n_periods = cashflows.shape
+    # One contiguous array per year, so active rows are gathered column by column
+    by_year = np.ascontiguousarray(cashflows.T)
+
+    def npv_and_slope(rows, rate):
+        # Horner's scheme in v = 1 / (1 + rate): no power table per iteration
+        v = 1.0 / (1.0 + rate)
+        value = by_year[-1, rows]
+        d_value = np.zeros_like(value)
+        for year in range(n_periods - 2, -1, -1):
+            d_value = d_value * v + value
+            value = value * v + by_year[year, rows]
+        # d(npv)/d(rate) = d(npv)/dv * dv/d(rate), with dv/d(rate) = -v ** 2
+        return value, -d_value * v * v
+
+    everything = np.arange(n_rows)
+    lo = np.full(n_rows, float(low))
+    hi = np.full(n_rows, float(high))
+    f_lo, _ = npv_and_slope(everything, lo)
+    f_hi, _ = npv_and_slope(everything, hi)
+
+    result = np.full(n_rows, np.nan)
+    active = np.flatnonzero(np.sign(f_lo) * np.sign(f_hi) < 0)
+    lo, hi, f_lo = lo[active], hi[active], f_lo[active]
+    # A rate counts as a root once the NPV is negligible next to the flows themselves
+    scale = np.abs(cashflows[active]).sum(axis=1)
+    rate = np.clip(np.full(active.size, 0.1), lo, hi)
+    step = previous_step = hi - lo
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        value, slope = npv_and_slope(active, rate)
+        # Shrink the bracket to the side that still contains the sign change
+        same_side = np.sign(value) == np.sign(f_lo)
+        lo = np.where(same_side, rate, lo)
+        f_lo = np.where(same_side, value, f_lo)
+        hi = np.where(same_side, hi, rate)
+        # Bisect where the Newton step would leave the bracket or is not at
+        # least halving the step before last, so every row keeps converging.
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            newton_step = value / slope
+            newton = rate - newton_step
+            bisect = (~np.isfinite(newton) | (newton <= lo) | (newton >= hi)
+                      | (np.abs(2 * value) > np.abs(previous_step * slope)))
+        previous_step = step
+        step = np.where(bisect, rate - (lo + hi) / 2, newton_step)
+        at_root = np.abs(value) <= tol * scale
+        new_rate = np.where(at_root, rate, rate - step)
+        done = at_root | (np.abs(step) <= tol * (1 + np.abs(rate)))
+        result[active[done]] = new_rate[done]
+        keep = ~done
+        active, rate, lo, hi, f_lo, scale, step, previous_step = (
+            active[keep], new_rate[keep], lo[keep], hi[keep], f_lo[keep], scale[keep],
+            step[keep], previous_step[keep])
+    result[active] = rate
+    return result
+
+
+def discounted_payback_batch(cashflows, rate):
+    """
+    Year from which on the cumulative discounted cash flow of each row stays
+    >= 0; rate is anything npv.row_discount_factors accepts.
+    """
+    cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    factors = row_discount_factors(rate, cashflows.shape[1] - 1)
+    return _recovery_year(np.cumsum(cashflows * factors, axis=1))
+
+
+def crossover_year_batch(own_cf, lease_cf):
+    """Year from which on cumulative owning cash flow stays >= cumulative leasing cash flow."""
+    own_cf = np.atleast_2d(np.asarray(own_cf, dtype=float))
+    lease_cf = np.atleast_2d(np.asarray(lease_cf, dtype=float))
+    return _recovery_year(np.cumsum(own_cf - lease_cf, axis=1))
+
+
+@grouped_by_periods
+def scenario_metrics(params, chunk_size=METRICS_CHUNK_SIZE, curve=None, custom_depreciation=None):
+    """
+    IRR (percent), discounted payback year and crossover year of app-unit
+    scenarios, evaluated chunk_size scenarios (fewer for monthly cash flows)
+    at a time. Payback is discounted at WACC, or along curve if given;
+    custom_depreciation is as for scenarios.evaluate_npvs.
+    Returns a dict of arrays keyed "irr", "payback_year" and "crossover_year".
+    """
+    n = scenario_count(params)
+    m = periods_per_year(params)
+    chunk_size = min(chunk_size, rows_per_block(params))
+    # The bracket is given as annual rates; the search runs on periodic ones
+    low, high = periodic_rate(np.array([IRR_LOW, IRR_HIGH]), m)
+    columns = {key: np.broadcast_to(np.asarray(params[key], dtype=float), (n,)) for key in PARAM_KEYS}
+    metrics = {name: np.empty(n) for name in ("irr", "payback_year", "crossover_year")}
+    for start in range(0, n, chunk_size):
+        rows = slice(start, min(start + chunk_size, n))
+        chunk = {key: column[rows] for key, column in columns.items()}
+        own_cf, lease_cf = scenario_cashflows(chunk, custom_depreciation)
+        incremental = own_cf - lease_cf
+        irr = irr_batch(incremental, low, high)
+        metrics["irr"][rows] = (irr if m == 1 else np.expm1(m * np.log1p(irr))) * 100.0
+        payback = discounted_payback_batch(incremental, discount_rate(chunk, curve))
+        metrics["payback_year"][rows] = payback / m
+        metrics["crossover_year"][rows] = crossover_year_batch(own_cf, lease_cf) / m
+    return metrics
@@ -0,0 +1,219 @@
+"""
+Core leasing vs. owning model: default inputs, unit conversion and the scalar
+cash-flow and NPV functions.
+
+Importing this module pulls in nothing beyond the standard library; NumPy is
+loaded on the first call to a function that needs the batch kernels. Batch jobs
+and worker processes can therefore import it without paying for Streamlit,
+pandas or matplotlib.
+"""
+
+# ---------------------------
+# Default values for all parameters (app units)
+# ---------------------------
+default_values = {
+    "CAPEX": 300.0,
+    "salvage": 40.0,
+    "op_cost": 12.0,
+    "debt_ratio": 0.6,
+    "interest_rate": 4.0,
+    "debt_term": 10,
+    "debt_schedule": 0,
+    "balloon_pct": 0.0,
+    "io_years": 0,
+    "depr_years": 10,
+    "depr_method": 0,
+    "tax_rate": 25.0,
+    "lease_payment": 18.0,
+    "lease_escalation": 3.0,
+    "lease_option": 0,
+    "purchase_price": 250.0,
+    "renewal_rent": 18.0,
+    "renewal_years": 10,
+    "asset_vol": 15.0,
+    "op_growth": 2.0,
+    "analysis_years": 20,
+    "wacc": 6.0,
+    "periods_per_year": 1,
+}
+
+# Display labels, in default_values order
+param_labels = dict(zip(default_values, [
+    "CAPEX ($M)", "Salvage Value ($M)", "Operating Cost ($M)", "Debt Ratio",
+    "Interest Rate (%)", "Debt Term (years)", "Debt Schedule", "Balloon (% of Debt)",
+    "Interest-Only Years", "Depreciation Years", "Depreciation Method", "Tax Rate (%)",
+    "Initial Lease Payment ($M)", "Lease Escalation (%)", "Lease Option", "Purchase Price ($M)",
+    "Renewal Rent ($M)", "Renewal Term (years)", "Facility Value Volatility (%)",
+    "Operating Cost Growth (%)",
+    "Analysis Period (years)", "WACC (%)", "Cash-Flow Periods per Year"
+]))
+
+# Cash-flow granularities offered for periods_per_year, with display names
+PERIOD_OPTIONS = {1: "Annual", 4: "Quarterly", 12: "Monthly"}
+
+# Debt repayment schedules offered for debt_schedule (codes as in debt.py).
+# balloon_pct applies to the balloon schedule and io_years to interest-only.
+DEBT_SCHEDULES = {
+    0: "Even principal",
+    1: "Level payment (annuity)",
+    2: "Balloon",
+    3: "Interest-only, then level payment",
+}
+
+# Depreciation methods offered for depr_method (codes as in depreciation.py).
+# MACRS uses the shortest recovery class of at least depr_years years; the
+# custom method takes its yearly rates from a schedule given with the batch.
+DEPRECIATION_METHODS = {
+    0: "Straight-line",
+    1: "MACRS (half-year convention)",
+    2: "Double-declining balance",
+    3: "Custom schedule",
+}
+
+# Options a lease may carry, offered for lease_option (codes as in options.py).
+# purchase_price applies to the purchase option, renewal_rent and
+# renewal_years to renewal; both are valued with asset_vol.
+LEASE_OPTIONS = {
+    0: "None",
+    1: "Purchase option",
+    2: "Renewal option",
+}
+
+# (min, max) of each numeric input widget, in app units. periods_per_year,
+# debt_schedule, depr_method and lease_option are chosen from PERIOD_OPTIONS,
+# DEBT_SCHEDULES, DEPRECIATION_METHODS and LEASE_OPTIONS instead and are not
+# varied by the sensitivity tools.
+param_bounds = {
+    "CAPEX": (50.0, 3000.0),
+    "salvage": (0.0, 500.0),
+    "op_cost": (1.0, 500.0),
+    "debt_ratio": (0.0, 1.0),
+    "interest_rate": (0.0, 20.0),
+    "debt_term": (1, 30),
+    "balloon_pct": (0.0, 100.0),
+    "io_years": (0, 30),
+    "depr_years": (1, 30),
+    "tax_rate": (0.0, 50.0),
+    "lease_payment": (1.0, 500.0),
+    "lease_escalation": (0.0, 10.0),
+    "purchase_price": (0.0, 3000.0),
+    "renewal_rent": (0.0, 500.0),
+    "renewal_years": (1, 30),
+    "asset_vol": (0.0, 100.0),
+    "op_growth": (0.0, 10.0),
+    "analysis_years": (5, 40),
+    "wacc": (0.0, 20.0),
+}
+
+# Input keys in the order the app defines them.
+PARAM_KEYS = tuple(default_values)
+# Inputs that take whole numbers (years, or periods per year).
+INTEGER_KEYS = ("debt_term", "debt_schedule", "io_years", "depr_years", "depr_method",
+                "lease_option", "renewal_years", "analysis_years", "periods_per_year")
+
+_MILLIONS = ("CAPEX", "salvage", "op_cost", "lease_payment", "purchase_price", "renewal_rent")
+_PERCENT = ("interest_rate", "balloon_pct", "tax_rate", "lease_escalation", "asset_vol",
+            "op_growth", "wacc")
+
+
+def to_working_units(params):
+    """
+    Convert app-unit parameters ($M, percent) to dollars and fractions.
+
+    Values may be scalars or arrays. The result is keyed by the argument names
+    of ownership_cashflows / leasing_cashflows, plus the lease option inputs,
+    analysis_years, wacc and periods_per_year.
+    """
+    missing = [key for key in PARAM_KEYS if key not in params]
+    if missing:
+        raise KeyError(f"missing scenario parameters: {', '.join(missing)}")
+    p = {}
+    for key in PARAM_KEYS:
+        value = params[key]
+        if key in _MILLIONS:
+            value = value * 1e6
+        elif key in _PERCENT:
+            value = value / 100.0
+        p[key] = value
+    return {
+        "CAPEX": p["CAPEX"],
+        "salvage_value": p["salvage"],
+        "operating_cost": p["op_cost"],
+        "debt_ratio": p["debt_ratio"],
+        "interest_rate": p["interest_rate"],
+        "debt_term": p["debt_term"],
+        "debt_schedule": p["debt_schedule"],
+        "balloon_fraction": p["balloon_pct"],
+        "interest_only_years": p["io_years"],
+        "depreciation_years": p["depr_years"],
+        "depreciation_method": p["depr_method"],
+        "tax_rate": p["tax_rate"],
+        "initial_lease_payment": p["lease_payment"],
+        "lease_escalation": p["lease_escalation"],
+        "lease_option": p["lease_option"],
+        "purchase_price": p["purchase_price"],
+        "renewal_rent": p["renewal_rent"],
+        "renewal_years": p["renewal_years"],
+        "asset_volatility": p["asset_vol"],
+        "op_cost_growth": p["op_growth"],
+        "analysis_years": p["analysis_years"],
+        "wacc": p["wacc"],
+        "periods_per_year": p["periods_per_year"],
+    }
+
+
+# ---------------------------
+# Financial Model Functions
+# ---------------------------
+def npv(cashflows, discount_rate):
+    """Calculate net present value (NPV) of cashflows at a flat rate or along an npv.YieldCurve."""
+    from .npv import npv_batch
+    return float(npv_batch([cashflows], discount_rate)[0])
+
+
+def ownership_cashflows(CAPEX, debt_ratio, interest_rate, debt_term, n_years,
+                        operating_cost, op_cost_growth, depreciation_years,
+                        tax_rate, salvage_value, periods_per_year=1, debt_schedule=0,
+                        balloon_fraction=0.0, interest_only_years=0, depreciation_method=0,
+                        custom_depreciation=None):
+    """
+    Calculate cash flows for owning a facility, per year or per
+    1 / periods_per_year of a year.
+
+    Assumptions:
+      - A portion of CAPEX is financed by debt, repaid over debt_term years on
+        one of the DEBT_SCHEDULES (evenly by default). balloon_fraction of the
+        debt is left for the last payment of a balloon schedule;
+        interest_only_years precede the level payments of an interest-only one.
+      - Interest on the financed portion is tax-deductible.
+      - Depreciation over depreciation_years creates a tax shield, by one of the
+        DEPRECIATION_METHODS (straight-line by default); custom_depreciation
+        holds the yearly fractions of CAPEX for the custom method.
+      - Operating cost grows annually at a constant rate.
+      - Salvage value is received in the final year.
+
+    Evaluates a single scenario through ownership_cashflows_batch.
+    """
+    from .batch import ownership_cashflows_batch
+    return ownership_cashflows_batch(CAPEX, debt_ratio, interest_rate, debt_term, n_years,
+                                     operating_cost, op_cost_growth, depreciation_years,
+                                     tax_rate, salvage_value, periods_per_year, debt_schedule,
+                                     balloon_fraction, interest_only_years, depreciation_method,
+                                     custom_depreciation)[0].tolist()
+
+
+def leasing_cashflows(initial_lease_payment, lease_escalation, n_years, tax_rate,
+                      periods_per_year=1):
+    """
+    Calculate cash flows for leasing a facility, per year or per
+    1 / periods_per_year of a year.
+
+    Assumptions:
+      - Lease payments escalate annually at a fixed rate.
+      - Lease payments are fully tax-deductible.
+
+    Evaluates a single scenario through leasing_cashflows_batch.
+    """
+    from .batch import leasing_cashflows_batch
+    return leasing_cashflows_batch(initial_lease_payment, lease_escalation,
+                                   n_years, tax_rate, periods_per_year)[0].tolist()
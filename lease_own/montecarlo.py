@@ -0,0 +1,384 @@
+"""
+Monte Carlo simulation of the lease-vs-own decision.
+
+Any input can be given a distribution; the rest stay at their base value.
+Draws are generated and evaluated in chunks through the batch kernels, so memory
+stays bounded by chunk_size rows of draws and cash flows regardless of the
+number of draws. The NPVs of each chunk are folded into a streaming
+sketch.NpvSketch and discarded, so the results (moments, percentiles,
+histogram) never need the draws themselves.
+
+Draws come from one of the samplers in sampling.SAMPLERS: uniform points are
+mapped through each distribution's inverse CDF. The draws are split into
+independently randomized replicates, and the spread of the replicate estimates
+gives the standard errors, which is valid for every sampler including the
+quasi-random ones. Inputs can be correlated through a Gaussian copula: the
+sampler's points become normal scores, which are mixed by the Cholesky factor
+of the correlation matrix and passed to each distribution's score_ppf.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .model import (DEBT_SCHEDULES, DEPRECIATION_METHODS, INTEGER_KEYS, LEASE_OPTIONS, PARAM_KEYS,
+                    PERIOD_OPTIONS, param_bounds)
+from .sampling import cholesky_factor, norm_cdf, norm_ppf, point_chunks, uniform_points
+from .scenarios import evaluate_npvs
+from .sketch import NpvSketch
+
+DEFAULT_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+# Independent replicates used for the standard errors
+DEFAULT_REPLICATES = 16
+# Fewest batches an adaptive run draws before it may stop
+MIN_BATCHES = 8
+
+# (min, max) a drawn whole-number input is clamped to: the widget bounds, or
+# the smallest and largest code of inputs chosen from a list
+_CODES = {"debt_schedule": DEBT_SCHEDULES, "depr_method": DEPRECIATION_METHODS,
+          "lease_option": LEASE_OPTIONS, "periods_per_year": PERIOD_OPTIONS}
+INTEGER_RANGES = {key: param_bounds[key] if key in param_bounds
+                  else (min(_CODES[key]), max(_CODES[key]))
+                  for key in INTEGER_KEYS}
+# Drawn periods_per_year snap to the nearest of these
+_PERIODS = np.array(sorted(PERIOD_OPTIONS), dtype=float)
+_PERIOD_MIDPOINTS = (_PERIODS[1:] + _PERIODS[:-1]) / 2
+
+
+@dataclass(frozen=True)
+class Normal:
+    """Normal distribution, optionally clipped to [low, high]."""
+    mean: float
+    std: float
+    low: float = None
+    high: float = None
+
+    def sample(self, rng, size):
+        draws = rng.normal(self.mean, self.std, size)
+        if self.low is not None or self.high is not None:
+            draws = np.clip(draws, self.low, self.high)
+        return draws
+
+    def ppf(self, u):
+        return self.score_ppf(norm_ppf(u))
+
+    def score_ppf(self, z):
+        """Draws for standard normal scores z (used for correlated inputs)."""
+        draws = self.mean + self.std * z
+        if self.low is not None or self.high is not None:
+            draws = np.clip(draws, self.low, self.high)
+        return draws
+
+
+@dataclass(frozen=True)
+class Uniform:
+    """Uniform distribution on [low, high]."""
+    low: float
+    high: float
+
+    def sample(self, rng, size):
+        return rng.uniform(self.low, self.high, size)
+
+    def ppf(self, u):
+        return self.low + (self.high - self.low) * np.asarray(u, dtype=float)
+
+    def score_ppf(self, z):
+        return self.ppf(norm_cdf(z))
+
+
+@dataclass(frozen=True)
+class Triangular:
+    """Triangular distribution on [low, high] with peak at mode."""
+    low: float
+    mode: float
+    high: float
+
+    def sample(self, rng, size):
+        return rng.triangular(self.low, self.mode, self.high, size)
+
+    def ppf(self, u):
+        u = np.asarray(u, dtype=float)
+        width = self.high - self.low
+        split = (self.mode - self.low) / width if width > 0 else 0.5
+        rising = self.low + np.sqrt(u * width * (self.mode - self.low))
+        falling = self.high - np.sqrt((1.0 - u) * width * (self.high - self.mode))
+        return np.where(u < split, rising, falling)
+
+    def score_ppf(self, z):
+        return self.ppf(norm_cdf(z))
+
+
+@dataclass
+class MonteCarloResult:
+    """
+    Distribution of own_npv - lease_npv over the simulated draws (positive means owning wins).
+
+    The *_se fields are standard errors of the corresponding estimates, taken
+    from the spread across n_replicates independent replicates. sketch holds
+    the merged streaming summary of all draws, including the histogram;
+    percentiles are read from it, to within its relative accuracy.
+    """
+    n_draws: int
+    sketch: NpvSketch = field(repr=False)
+    own_npv_mean: float
+    lease_npv_mean: float
+    delta_mean: float
+    delta_std: float
+    p_own_wins: float
+    percentiles: dict
+    sampler: str = "random"
+    n_replicates: int = 1
+    delta_mean_se: float = float("nan")
+    p_own_wins_se: float = float("nan")
+    percentile_se: dict = field(default_factory=dict)
+    # False when simulate_until hit max_draws before meeting its tolerances
+    converged: bool = True
+
+
+def _to_draws(base, distributions, columns):
+    """Scenario parameters with each distributed key set from its column of draws."""
+    params = {}
+    for key in PARAM_KEYS:
+        if key in distributions:
+            value = columns[key]
+            if key == "periods_per_year":
+                value = _PERIODS[np.searchsorted(_PERIOD_MIDPOINTS, value)]
+            elif key in INTEGER_KEYS:
+                value = np.clip(np.rint(value), *INTEGER_RANGES[key])
+        else:
+            value = base[key]
+        params[key] = value
+    return params
+
+
+def _support(dist):
+    """(low, high) of the values a distribution can draw."""
+    low = getattr(dist, "low", None)
+    high = getattr(dist, "high", None)
+    return (-np.inf if low is None else low), (np.inf if high is None else high)
+
+
+def _check_keys(distributions):
+    """
+    Raise KeyError for unknown parameters, and ValueError for a whole-number
+    input whose distribution cannot draw a single value inside INTEGER_RANGES.
+    """
+    unknown = set(distributions) - set(PARAM_KEYS)
+    if unknown:
+        raise KeyError(f"unknown parameters: {', '.join(sorted(unknown))}")
+    for key, dist in distributions.items():
+        if key not in INTEGER_KEYS:
+            continue
+        low, high = _support(dist)
+        valid_low, valid_high = INTEGER_RANGES[key]
+        if not low <= high or np.rint(high) < valid_low or np.rint(low) > valid_high:
+            raise ValueError(f"the distribution of {key} draws no values between "
+                             f"{valid_low} and {valid_high}")
+
+
+def _check_correlations(distributions, correlations):
+    """Raise ValueError early, before any draws, if the correlations cannot be used."""
+    if correlations:
+        cholesky_factor([key for key in PARAM_KEYS if key in distributions], correlations)
+
+
+def draw_params(base, distributions, rng, size):
+    """
+    Sample size scenarios. Keys without a distribution keep their base value;
+    whole-number inputs are rounded and clamped to INTEGER_RANGES, and
+    periods_per_year is snapped to the nearest of PERIOD_OPTIONS. Raises
+    ValueError for a whole-number input whose distribution lies wholly
+    outside its range.
+    """
+    _check_keys(distributions)
+    return _to_draws(base, distributions,
+                     {key: dist.sample(rng, size) for key, dist in distributions.items()})
+
+
+def sample_params(base, distributions, sampler, rng, size, correlations=None):
+    """
+    Like draw_params, but maps points from the named sampler through each ppf.
+    correlations maps pairs of distributed keys to the correlation of their
+    normal scores (see sampling.cholesky_factor).
+    """
+    _check_keys(distributions)
+    keys = [key for key in PARAM_KEYS if key in distributions]
+    points = uniform_points(sampler, size, max(len(keys), 1), rng)
+    return _points_to_params(base, distributions, keys, points, correlations)
+
+
+def _points_to_params(base, distributions, keys, points, correlations):
+    """Scenario parameters for uniform points whose columns follow keys."""
+    columns = {}
+    if correlations:
+        # Only inputs that appear in some pair go through the copula
+        paired = {key for pair in correlations for key in pair}
+        indices = [i for i, key in enumerate(keys) if key in paired]
+        factor = cholesky_factor([keys[i] for i in indices], correlations)
+        scores = norm_ppf(points[:, indices]) @ factor.T
+        for j, i in enumerate(indices):
+            columns[keys[i]] = distributions[keys[i]].score_ppf(scores[:, j])
+    for i, key in enumerate(keys):
+        if key not in columns:
+            columns[key] = distributions[key].ppf(points[:, i])
+    return _to_draws(base, distributions, columns)
+
+
+def _standard_error(estimates):
+    estimates = np.asarray(estimates, dtype=float)
+    if estimates.shape[0] < 2:
+        return np.full(estimates.shape[1:], np.nan)
+    return estimates.std(axis=0, ddof=1) / np.sqrt(estimates.shape[0])
+
+
+def _simulate_replicate(base, distributions, correlations, sampler, seed, size, chunk_size,
+                        curve=None, custom_depreciation=None):
+    """Draw and evaluate one independently randomized point set; returns its NpvSketch."""
+    _check_keys(distributions)
+    keys = [key for key in PARAM_KEYS if key in distributions]
+    sketch = NpvSketch()
+    # One point set per replicate, generated and evaluated a chunk at a time to bound memory
+    for points in point_chunks(sampler, size, max(len(keys), 1), chunk_size, seed):
+        chunk = _points_to_params(base, distributions, keys, points, correlations)
+        own_npv, lease_npv = evaluate_npvs(chunk, curve, custom_depreciation)
+        sketch.update(np.broadcast_to(own_npv, (len(points),)), lease_npv)
+    return sketch
+
+
+def _replicate_estimates(sketch, percentiles):
+    """(mean NPV difference, P(owning wins), percentiles) of one replicate, for the standard errors."""
+    return sketch.delta.mean, sketch.p_own_wins, sketch.quantiles.percentiles(percentiles)
+
+
+def _summarize(sketch, estimates, percentiles, sampler, converged=True):
+    """Build a MonteCarloResult from the merged sketch and the per-replicate estimates."""
+    means, wins, replicate_percentiles = zip(*estimates)
+    percentile_se = _standard_error(replicate_percentiles)
+    return MonteCarloResult(
+        n_draws=sketch.count,
+        sketch=sketch,
+        own_npv_mean=sketch.own_npv.mean,
+        lease_npv_mean=sketch.lease_npv.mean,
+        delta_mean=sketch.delta.mean,
+        delta_std=sketch.delta.std,
+        p_own_wins=sketch.p_own_wins,
+        percentiles=dict(zip(percentiles, sketch.quantiles.percentiles(percentiles).tolist())),
+        sampler=sampler,
+        n_replicates=len(estimates),
+        delta_mean_se=float(_standard_error(means)),
+        p_own_wins_se=float(_standard_error(wins)),
+        percentile_se=dict(zip(percentiles, np.atleast_1d(percentile_se).tolist())),
+        converged=converged,
+    )
+
+
+def simulate(base, distributions, n_draws=10_000, chunk_size=100_000, seed=None,
+             percentiles=DEFAULT_PERCENTILES, sampler="random", n_replicates=DEFAULT_REPLICATES,
+             workers=1, correlations=None, curve=None, custom_depreciation=None):
+    """
+    Run a Monte Carlo simulation of own_npv - lease_npv.
+
+    base maps every key in PARAM_KEYS to its app-unit value; distributions maps
+    a subset of those keys to Normal / Uniform / Triangular objects, and
+    correlations optionally maps pairs of those keys to a correlation. sampler is
+    one of sampling.SAMPLERS. The draws are split into n_replicates (at most
+    n_draws) independently randomized point sets; Sobol points are best
+    balanced when n_draws / n_replicates is a power of two. curve, an
+    npv.YieldCurve, replaces WACC as the discount rate of every draw, and
+    custom_depreciation is as for scenarios.evaluate_npvs.
+
+    With workers > 1 the replicates run in a pool of processes, which send
+    back only their sketches. Each replicate has its own seed spawned from
+    seed, so the result does not depend on workers.
+    """
+    if n_draws < 1:
+        raise ValueError("n_draws must be at least 1")
+    _check_keys(distributions)
+    _check_correlations(distributions, correlations)
+    n_replicates = max(1, min(n_replicates, n_draws))
+    sizes = np.diff(np.linspace(0, n_draws, n_replicates + 1).astype(int)).tolist()
+    seeds = np.random.SeedSequence(seed).spawn(n_replicates)
+    args = [(base, distributions, correlations, sampler, replicate_seed, size, chunk_size, curve,
+             custom_depreciation)
+            for replicate_seed, size in zip(seeds, sizes)]
+    workers = min(workers or os.cpu_count() or 1, n_replicates)
+    if workers == 1:
+        sketches = [_simulate_replicate(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            sketches = list(pool.map(_simulate_replicate, *zip(*args)))
+
+    sketch = NpvSketch()
+    for replicate in sketches:
+        sketch.merge(replicate)
+    return _summarize(sketch, [_replicate_estimates(r, percentiles) for r in sketches],
+                      percentiles, sampler)
+
+
+@dataclass
+class ConvergenceState:
+    """Running estimates of an adaptive simulation, reported after every batch."""
+    n_draws: int
+    n_batches: int
+    delta_mean: float
+    delta_mean_half_width: float
+    p_own_wins: float
+    p_own_wins_half_width: float
+    converged: bool
+
+
+def simulate_until(base, distributions, mean_tolerance=None, p_tolerance=None, confidence=0.95,
+                   batch_size=10_000, max_draws=1_000_000, chunk_size=100_000, seed=None,
+                   percentiles=DEFAULT_PERCENTILES, sampler="random", progress=None,
+                   correlations=None, curve=None, custom_depreciation=None):
+    """
+    Simulate in batches until the estimates are precise enough, then stop.
+
+    Each batch is an independently randomized replicate; the running mean,
+    variance and P(owning wins) are tracked over the batches, and the run
+    stops once the confidence-interval half-width of the mean NPV difference
+    is at most mean_tolerance ($) and that of P(owning wins) at most
+    p_tolerance (a probability), for whichever tolerances are given. At least
+    MIN_BATCHES batches are drawn so the intervals are meaningful, and at most
+    max_draws draws. progress, if given, is called with a ConvergenceState
+    after every batch. Returns a MonteCarloResult; its converged field tells
+    whether the tolerances were met. The other arguments are as for simulate.
+    """
+    if mean_tolerance is None and p_tolerance is None:
+        raise ValueError("give mean_tolerance, p_tolerance or both")
+    if batch_size < 1 or max_draws < 1:
+        raise ValueError("batch_size and max_draws must be at least 1")
+    _check_keys(distributions)
+    _check_correlations(distributions, correlations)
+    seeds = np.random.SeedSequence(seed)
+    z = float(norm_ppf(0.5 + confidence / 2))
+    # Merged summary of all draws, and per-batch estimates for the intervals
+    sketch = NpvSketch()
+    estimates = []
+    converged = False
+
+    while sketch.count < max_draws and not converged:
+        size = min(batch_size, max_draws - sketch.count)
+        batch = _simulate_replicate(base, distributions, correlations, sampler, seeds.spawn(1)[0],
+                                    size, chunk_size, curve, custom_depreciation)
+        sketch.merge(batch)
+        estimates.append(_replicate_estimates(batch, percentiles))
+
+        mean_half_width = z * float(_standard_error([e[0] for e in estimates]))
+        p_half_width = z * float(_standard_error([e[1] for e in estimates]))
+        converged = len(estimates) >= MIN_BATCHES and all((
+            mean_tolerance is None or mean_half_width <= mean_tolerance,
+            p_tolerance is None or p_half_width <= p_tolerance,
+        ))
+        if progress is not None:
+            progress(ConvergenceState(
+                n_draws=sketch.count,
+                n_batches=len(estimates),
+                delta_mean=sketch.delta.mean,
+                delta_mean_half_width=mean_half_width,
+                p_own_wins=sketch.p_own_wins,
+                p_own_wins_half_width=p_half_width,
+                converged=converged,
+            ))
+    return _summarize(sketch, estimates, percentiles, sampler, converged)
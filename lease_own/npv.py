@@ -0,0 +1,166 @@
+"""
+NPV engine built on precomputed discount-factor tables.
+
+Discount factors 1 / (1 + r) ** t are computed once per (rate vector, horizon)
+and kept in an LRU cache, so repeated evaluations reduce to a matrix-vector
+product (one rate for every row) or a row-wise dot product (one rate per row).
+
+Anywhere a discount rate is accepted, a YieldCurve may be given instead. Its
+factors are interpolated from the curve's points and cached per (curve,
+horizon) in the same way, and one curve is shared by every row, so curve
+discounting costs the same single matrix-vector product as a flat rate.
+"""
+from dataclasses import dataclass, replace
+from functools import lru_cache
+
+import numpy as np
+
+# Number of (rate vector, horizon) tables kept alive.
+DISCOUNT_TABLE_CACHE_SIZE = 128
+# Rate vectors with more distinct values than this (e.g. Monte Carlo draws) are
+# discounted without caching; their tables are too large and never reused.
+MAX_CACHED_RATES = 4096
+
+
+@lru_cache(maxsize=DISCOUNT_TABLE_CACHE_SIZE)
+def _discount_table(rate_bytes, horizon):
+    rates = np.frombuffer(rate_bytes, dtype=float)
+    table = _build_table(rates, horizon)
+    table.flags.writeable = False
+    return table
+
+
+def _build_table(rates, horizon):
+    return 1.0 / (1.0 + rates[:, None]) ** np.arange(horizon + 1, dtype=float)
+
+
+@dataclass(frozen=True)
+class YieldCurve:
+    """
+    Term structure of annual discount rates (fractions) given at a few tenors
+    (years), interpolated linearly in between and flat beyond both ends.
+
+    With forward=False the rates are spot (zero-coupon) rates and cash at time
+    t is discounted by (1 + s(t)) ** -t. With forward=True rates[i] is the
+    one-year forward rate of the year ending at tenors[i], and the factors
+    compound the forward rate of every year passed. Factor tables have one
+    entry per 1 / periods_per_year of a year; see per_period.
+    """
+    tenors: tuple
+    rates: tuple
+    forward: bool = False
+    periods_per_year: int = 1
+
+    def __post_init__(self):
+        tenors = tuple(float(t) for t in np.atleast_1d(self.tenors))
+        rates = tuple(float(r) for r in np.atleast_1d(self.rates))
+        if not tenors or len(tenors) != len(rates):
+            raise ValueError("a yield curve needs one rate per tenor and at least one point")
+        if any(b <= a for a, b in zip(tenors, tenors[1:])) or tenors[0] < 0:
+            raise ValueError("yield curve tenors must be non-negative and increasing")
+        if any(not -1.0 < r < np.inf for r in rates):
+            raise ValueError("yield curve rates must be finite and above -100%")
+        object.__setattr__(self, "tenors", tenors)
+        object.__setattr__(self, "rates", rates)
+        object.__setattr__(self, "periods_per_year", int(self.periods_per_year))
+
+    def per_period(self, periods_per_year):
+        """The same curve, with factor tables laid out per 1 / periods_per_year of a year."""
+        if periods_per_year == self.periods_per_year:
+            return self
+        return replace(self, periods_per_year=periods_per_year)
+
+
+@lru_cache(maxsize=DISCOUNT_TABLE_CACHE_SIZE)
+def _curve_table(curve, horizon):
+    m = curve.periods_per_year
+    times = np.arange(horizon + 1, dtype=float) / m
+    if curve.forward:
+        # Each period takes its share of the forward rate of the year it falls in
+        year_rates = np.interp(np.ceil(times[1:]), curve.tenors, curve.rates)
+        log_factors = np.concatenate([[0.0], np.cumsum(np.log1p(year_rates) / m)])
+    else:
+        log_factors = times * np.log1p(np.interp(times, curve.tenors, curve.rates))
+    table = np.exp(-log_factors).reshape(1, -1)
+    table.flags.writeable = False
+    return table
+
+
+def curve_discount_factors(curve, horizon):
+    """
+    Return the (1, horizon + 1) discount-factor table of a YieldCurve, entry t
+    discounting cash at t / curve.periods_per_year years. Tables are cached
+    per (curve, horizon) and returned read-only.
+    """
+    return _curve_table(curve, int(horizon))
+
+
+def discount_factors(discount_rate, horizon):
+    """
+    Return the discount-factor table for a rate (or vector of rates).
+
+    The result has shape (n_rates, horizon + 1) and entry [i, t] equals
+    1 / (1 + discount_rate[i]) ** t. Tables are cached by rate vector and
+    horizon and returned read-only.
+    """
+    rates = np.ascontiguousarray(np.atleast_1d(np.asarray(discount_rate, dtype=float)))
+    if rates.ndim != 1:
+        raise ValueError("discount_rate must be a scalar or a 1-D array")
+    if rates.size > MAX_CACHED_RATES:
+        return _build_table(rates, int(horizon))
+    return _discount_table(rates.tobytes(), int(horizon))
+
+
+def discount_cache_info():
+    """Hit/miss statistics of the discount-table cache."""
+    return _discount_table.cache_info()
+
+
+def curve_cache_info():
+    """Hit/miss statistics of the yield-curve factor cache."""
+    return _curve_table.cache_info()
+
+
+def row_discount_factors(discount_rate, horizon):
+    """
+    Return discount factors laid out per cash-flow row.
+
+    A scalar rate or a YieldCurve gives a (1, horizon + 1) table shared by
+    every row; a 1-D array gives one row of factors per rate. Computing this
+    once lets several cash-flow streams (own and lease) reuse the same factors.
+    """
+    if isinstance(discount_rate, YieldCurve):
+        return curve_discount_factors(discount_rate, horizon)
+    rates = np.asarray(discount_rate, dtype=float)
+    if rates.ndim == 0 or rates.size == 1:
+        return discount_factors(rates.reshape(1), horizon)
+    if rates.ndim != 1:
+        raise ValueError("discount_rate must be a scalar or a 1-D array")
+    # Build the table over the distinct rates only and gather it per row; grids
+    # and portfolios usually share a handful of discount rates.
+    unique_rates, row_index = np.unique(rates, return_inverse=True)
+    return discount_factors(unique_rates, horizon)[row_index]
+
+
+def discount_rows(cashflows, factors):
+    """Present value of each cash-flow row given factors from row_discount_factors."""
+    cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    if factors.shape[0] == 1:
+        return cashflows @ factors[0]
+    if factors.shape[0] != cashflows.shape[0]:
+        raise ValueError("discount_rate must be a scalar or have one rate per cash-flow row")
+    return np.einsum("ij,ij->i", cashflows, factors)
+
+
+def npv_batch(cashflows, discount_rate):
+    """
+    Calculate the NPV of every row of a cash-flow matrix.
+
+    cashflows has shape (n_scenarios, n_periods) with column t holding the cash
+    flow at the end of year t. discount_rate is either a scalar or a YieldCurve,
+    applied to all rows as a single matrix-vector product, or a 1-D array with
+    one rate per row.
+    Returns an array of shape (n_scenarios,).
+    """
+    cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    return discount_rows(cashflows, row_discount_factors(discount_rate, cashflows.shape[1] - 1))
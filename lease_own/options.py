@@ -0,0 +1,236 @@
+"""
+Real options attached to a lease, valued on a binomial lattice of the facility value.
+
+The facility is worth CAPEX today, and its value V follows a recombining
+binomial lattice with LATTICE_STEPS_PER_YEAR steps per year and annual
+volatility sigma. Whoever owns the facility earns its market rent, taken to be
+the initial lease payment as a yield on CAPEX, so under the risk-neutral measure
+V grows at the discount rate less that rent yield. Options (the lease_option
+codes; display names are model.LEASE_OPTIONS):
+
+  - PURCHASE: buy the facility for purchase_price at the end of any step from
+    the first to the end of the analysis period (American call on V). There
+    is no exercise at time 0, when the lease is being signed; buying then is
+    the ownership case itself.
+  - RENEWAL: at the end of the analysis period, renew the lease for
+    renewal_years at a fixed renewal_rent per year instead of the market
+    rent of that time (European call on the after-tax rent saving).
+
+Each step multiplies V by G * exp(+s) or G * exp(-s), where s = sigma /
+sqrt(steps per year) and G is the step's growth factor, so the up probability
+1 / (1 + exp(s)) depends on the volatility only. The terminal node spreads and
+binomial weights of the renewal option are therefore built once per distinct
+volatility and lattice length, kept in an LRU cache like the debt and
+depreciation tables, and shared by every row with that volatility; the
+discount rates (a WACC per row or a yield curve) enter through the cached
+discount-factor tables of npv. Backward induction for the purchase option
+rolls all analysis periods of a batch back together, one array operation per
+step: rows are sorted by analysis period and join the lattice at their own
+expiry, so each step only touches the options still alive.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from .batch import periodic_rate
+from .npv import YieldCurve, row_discount_factors
+
+NO_OPTION, PURCHASE, RENEWAL = 0, 1, 2
+OPTION_CODES = (NO_OPTION, PURCHASE, RENEWAL)
+
+# Lattice steps per year, independent of the cash-flow periods
+LATTICE_STEPS_PER_YEAR = 4
+# Number of (volatility set, steps) lattices kept alive.
+LATTICE_CACHE_SIZE = 64
+# Batches with more distinct volatilities than this (e.g. Monte Carlo draws of
+# the volatility) build their lattices without caching.
+MAX_CACHED_VOLATILITIES = 1024
+# Largest (rows x lattice nodes) array built at once; purchase-option blocks of
+# this size stay in the CPU cache during backward induction
+LATTICE_CELLS = 65536
+
+
+def _up_probability(volatility):
+    """Risk-neutral probability of an up move, for annual volatilities."""
+    return 1.0 / (1.0 + np.exp(volatility / np.sqrt(LATTICE_STEPS_PER_YEAR)))
+
+
+def _build_lattice(volatility, steps):
+    """
+    Terminal node spreads exp(s * (2j - steps)), binomial weights of the
+    terminal nodes, both shape (n, steps + 1), and up probabilities, shape
+    (n,), for a 1-D array of annual volatilities.
+    """
+    s = volatility[:, None] / np.sqrt(LATTICE_STEPS_PER_YEAR)
+    j = np.arange(steps + 1, dtype=float)
+    spread = np.exp(s * (2.0 * j - steps))
+    up = _up_probability(volatility[:, None])
+    # log C(steps, j) from cumulative sums of log k
+    log_factorial = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1.0, steps + 1.0)))])
+    log_choose = log_factorial[steps] - log_factorial - log_factorial[::-1]
+    weights = np.exp(log_choose + j * np.log(up) + (steps - j) * np.log1p(-up))
+    return spread, weights, up[:, 0]
+
+
+@lru_cache(maxsize=LATTICE_CACHE_SIZE)
+def _lattice_table(volatility_bytes, steps):
+    tables = _build_lattice(np.frombuffer(volatility_bytes, dtype=float), steps)
+    for table in tables:
+        table.flags.writeable = False
+    return tables
+
+
+def lattice_cache_info():
+    """Hit/miss statistics of the lattice cache."""
+    return _lattice_table.cache_info()
+
+
+def binomial_lattice(volatility, steps):
+    """
+    (spread, weights, up) of a lattice with steps steps per row of volatility
+    (annual, as a fraction): the terminal node values relative to their
+    drift-only value, the risk-neutral probability of reaching each terminal
+    node, both shape (n_rows, steps + 1), and the up probability per step.
+    """
+    volatility = np.atleast_1d(np.asarray(volatility, dtype=float))
+    if volatility.ndim != 1:
+        raise ValueError("volatility must be a scalar or a 1-D array")
+    if volatility.min() < 0.0:
+        raise ValueError("volatility must not be negative")
+    unique_volatilities, row_index = np.unique(volatility, return_inverse=True)
+    if unique_volatilities.size > MAX_CACHED_VOLATILITIES:
+        return _build_lattice(volatility, int(steps))
+    spread, weights, up = _lattice_table(unique_volatilities.tobytes(), int(steps))
+    return spread[row_index], weights[row_index], up[row_index]
+
+
+def _purchase_values(value, price, factors, carry, up, volatility, expiry):
+    """
+    American call on the facility value by backward induction, one step at a
+    time for all rows, over a lattice as long as the longest expiry (a step
+    count per row). Rows must be sorted by expiry, longest first: a row joins
+    the lattice at its own expiry, so each step only touches the rows whose
+    option is still alive, and rows can exercise at the end of steps 1 to
+    their expiry. factors has one row of discount factors per row, or a
+    single row shared by all; the other arguments are 1-D.
+    """
+    n_rows = expiry.size
+    steps = int(expiry[0]) if n_rows else 0
+    s = volatility / np.sqrt(LATTICE_STEPS_PER_YEAR)
+    # Arrays are laid out (node, row) so every operation runs along the rows.
+    # Discounting over each step is folded into the move probabilities. A
+    # shared row of factors is broadcast so every per-step array has a column
+    # per row.
+    factors = np.broadcast_to(factors.T, (factors.shape[1], n_rows))
+    step_discount = factors[1:steps + 1] / factors[:steps]
+    up_value = up * step_discount
+    down_value = (1.0 - up) * step_discount
+    down_move = np.exp(-s) * carry * step_discount
+    # Rows whose option is alive at each step
+    alive = np.searchsorted(-expiry, -np.arange(steps + 1), side="right")
+
+    # Node j of step t is kept at index steps - t + j. A down move from step
+    # t + 1 then lands on the same index, so nodes are updated in place.
+    nodes = np.empty((steps + 1, n_rows))
+    option = np.zeros((steps + 1, n_rows))
+    scratch = np.empty((steps + 1, n_rows))
+    active = 0
+    for step in range(steps, -1, -1):
+        low = steps - step
+        if active:
+            rows = slice(0, active)
+            previous = np.multiply(option[low - 1:steps, rows], down_value[step, rows],
+                                   out=scratch[low:, rows])
+            option[low:, rows] *= up_value[step, rows]
+            option[low:, rows] += previous
+            nodes[low:, rows] *= down_move[step, rows]
+        if step == 0:
+            break
+        if alive[step] > active:
+            # Options expiring at this step start from their terminal nodes
+            new = slice(active, alive[step])
+            spread = np.exp(s[new] * (2.0 * np.arange(step + 1.0)[:, None] - step))
+            nodes[low:, new] = value[new] * carry[new] ** -step / factors[step, new] * spread
+            active = alive[step]
+        rows = slice(0, active)
+        exercise = np.subtract(nodes[low:, rows], price[rows], out=scratch[low:, rows])
+        np.maximum(option[low:, rows], exercise, out=option[low:, rows])
+    return option[steps]
+
+
+def _renewal_values(value, rent_yield, rent, term, tax_rate, factors, carry, spread, weights,
+                    steps):
+    """European value of renewing at a fixed rent, from the terminal node weights."""
+    discount_at_end = factors[:, [steps]]
+    nodes = value * spread * carry ** -steps / discount_at_end
+    # Renewal rent is paid at the end of each renewal year
+    years = np.arange(1, (factors.shape[1] - 1 - steps) // LATTICE_STEPS_PER_YEAR + 1)
+    yearly = factors[:, steps + LATTICE_STEPS_PER_YEAR * years] / discount_at_end
+    annuity = np.where(years <= term, yearly, 0.0).sum(axis=1, keepdims=True)
+    saving = np.maximum(rent_yield * nodes - rent, 0.0) * (1.0 - tax_rate) * annuity
+    return discount_at_end[:, 0] * (weights * saving).sum(axis=1)
+
+
+def lease_option_values(option, facility_value, lease_payment, purchase_price, renewal_rent,
+                        renewal_years, volatility, tax_rate, years, rate):
+    """
+    Value ($) to the lessee of each row's lease option; zero for NO_OPTION rows.
+
+    Amounts are in dollars and rates and volatility are annual fractions.
+    rate is the annual discount rate (scalar or per row) or a YieldCurve; the
+    market rent yield is lease_payment / facility_value. All other arguments
+    are scalars or 1-D arrays broadcast against each other. Returns an array
+    of shape (n_rows,).
+    """
+    curve = rate if isinstance(rate, YieldCurve) else None
+    arguments = [option, facility_value, lease_payment, purchase_price, renewal_rent,
+                 renewal_years, volatility, tax_rate, years]
+    if curve is None:
+        arguments.append(rate)
+    columns = np.broadcast_arrays(*(np.atleast_1d(np.asarray(a, dtype=float)) for a in arguments))
+    if columns[0].ndim != 1:
+        raise ValueError("option arguments must be scalars or 1-D arrays")
+    option, value, payment, price, rent, term, volatility, tax_rate, years = columns[:9]
+    unknown = ~np.isin(option, OPTION_CODES)
+    if unknown.any():
+        raise ValueError(f"unknown lease option {option[unknown][0]:g}; "
+                         f"expected one of {', '.join(map(str, OPTION_CODES))}")
+    k = LATTICE_STEPS_PER_YEAR
+    values = np.zeros(option.size)
+    expiry = np.rint(years * k).astype(int)
+
+    def lattice_inputs(rows, horizon):
+        """Discount factors over horizon steps, rent yield and carry per step of rows."""
+        discount = curve.per_period(k) if curve is not None else periodic_rate(columns[9][rows], k)
+        rent_yield = (payment[rows] / value[rows])[:, None]
+        return row_discount_factors(discount, horizon), rent_yield, (1.0 + rent_yield) ** (1.0 / k)
+
+    # Purchase options: all analysis periods are rolled back together, longest
+    # first, in blocks of at most LATTICE_CELLS nodes
+    purchase = np.flatnonzero(option == PURCHASE)
+    purchase = purchase[np.argsort(-expiry[purchase], kind="stable")]
+    start = 0
+    while start < purchase.size:
+        steps = int(expiry[purchase[start]])
+        rows = purchase[start:start + max(1, LATTICE_CELLS // (steps + 1))]
+        factors, _, carry = lattice_inputs(rows, steps)
+        values[rows] = _purchase_values(value[rows], price[rows], factors, carry[:, 0],
+                                        _up_probability(volatility[rows]), volatility[rows],
+                                        expiry[rows])
+        start += rows.size
+
+    # Renewal options need no backward induction, only the terminal nodes of
+    # each analysis period
+    renewal = np.flatnonzero(option == RENEWAL)
+    for steps in np.unique(expiry[renewal]):
+        group = renewal[expiry[renewal] == steps]
+        extra_years = int(np.ceil(term[group].max()))
+        block_size = max(1, LATTICE_CELLS // (steps + 1))
+        for start in range(0, group.size, block_size):
+            rows = group[start:start + block_size]
+            factors, rent_yield, carry = lattice_inputs(rows, steps + k * extra_years)
+            spread, weights, _ = binomial_lattice(volatility[rows], steps)
+            values[rows] = _renewal_values(value[rows, None], rent_yield, rent[rows, None],
+                                           term[rows, None], tax_rate[rows, None], factors, carry,
+                                           spread, weights, steps)
+    return values
@@ -0,0 +1,105 @@
+"""
+Parallel evaluation of large scenario sweeps.
+
+The scenario table is copied once into a shared-memory block and split into
+row shards that a ProcessPoolExecutor evaluates independently. Workers attach
+to the input and output blocks by name and write their NPVs in place, so only
+block names and row ranges are pickled between processes.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .model import PARAM_KEYS
+from .scenarios import evaluate_npvs
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def _table_length(table):
+    lengths = {np.size(table[key]) for key in PARAM_KEYS if np.ndim(table[key]) > 0}
+    if len(lengths) > 1:
+        raise ValueError("scenario columns have different lengths")
+    return lengths.pop() if lengths else 1
+
+
+def _run_shard(input_name, output_name, n_rows, start, stop, curve=None, custom_depreciation=None):
+    """Worker entry point: evaluate rows [start, stop) of the shared scenario table."""
+    input_block = shared_memory.SharedMemory(name=input_name)
+    output_block = shared_memory.SharedMemory(name=output_name)
+    try:
+        inputs = np.ndarray((len(PARAM_KEYS), n_rows), dtype=float, buffer=input_block.buf)
+        outputs = np.ndarray((2, n_rows), dtype=float, buffer=output_block.buf)
+        params = {key: inputs[i, start:stop] for i, key in enumerate(PARAM_KEYS)}
+        outputs[0, start:stop], outputs[1, start:stop] = evaluate_npvs(params, curve, custom_depreciation)
+        # Drop the views before closing so the buffers can be released.
+        del inputs, outputs, params
+    finally:
+        input_block.close()
+        output_block.close()
+    return stop - start
+
+
+def run_sweep(table, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, executor=None, curve=None,
+              custom_depreciation=None):
+    """
+    Evaluate every row of a scenario table across a pool of processes.
+
+    table maps each key in PARAM_KEYS to a scalar or a 1-D column in app units
+    (a dict of arrays or a pandas DataFrame). workers defaults to the number of
+    CPUs; chunk_size is the number of rows per shard. Pass an existing
+    executor to reuse its processes across calls. curve, an npv.YieldCurve,
+    replaces each row's WACC as the discount rate, and custom_depreciation
+    gives the rates of the custom depreciation method. Returns (own_npv, lease_npv).
+    """
+    n_rows = _table_length(table)
+    workers = workers or os.cpu_count() or 1
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    if n_rows == 0:
+        return np.empty(0), np.empty(0)
+    if workers == 1 or n_rows <= chunk_size:
+        columns = {key: np.broadcast_to(np.asarray(table[key], dtype=float), (n_rows,))
+                   for key in PARAM_KEYS}
+        own_npv, lease_npv = np.empty(n_rows), np.empty(n_rows)
+        for start in range(0, n_rows, chunk_size):
+            stop = min(start + chunk_size, n_rows)
+            own_npv[start:stop], lease_npv[start:stop] = evaluate_npvs(
+                {key: column[start:stop] for key, column in columns.items()}, curve,
+                custom_depreciation)
+        return own_npv, lease_npv
+
+    # Columns are stored row-major by parameter so each shard reads contiguous slices.
+    input_block = shared_memory.SharedMemory(create=True, size=len(PARAM_KEYS) * n_rows * 8)
+    output_block = shared_memory.SharedMemory(create=True, size=2 * n_rows * 8)
+    try:
+        inputs = np.ndarray((len(PARAM_KEYS), n_rows), dtype=float, buffer=input_block.buf)
+        for i, key in enumerate(PARAM_KEYS):
+            inputs[i] = np.asarray(table[key], dtype=float)
+        del inputs
+
+        pool = executor or ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [
+                pool.submit(_run_shard, input_block.name, output_block.name, n_rows,
+                            start, min(start + chunk_size, n_rows), curve, custom_depreciation)
+                for start in range(0, n_rows, chunk_size)
+            ]
+            for future in futures:
+                future.result()
+        finally:
+            if executor is None:
+                pool.shutdown()
+
+        outputs = np.ndarray((2, n_rows), dtype=float, buffer=output_block.buf)
+        own_npv, lease_npv = outputs[0].copy(), outputs[1].copy()
+        del outputs
+        return own_npv, lease_npv
+    finally:
+        input_block.close()
+        input_block.unlink()
+        output_block.close()
+        output_block.unlink()
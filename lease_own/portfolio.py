@@ -0,0 +1,104 @@
+"""
+Evaluation of facility portfolios: one facility per row of an uploaded table.
+
+Parameter columns may be headed by key ("CAPEX") or by display label
+("CAPEX ($M)"), in any letter case, and use the app's input units. Parameter
+columns that are missing, and empty cells, take their default value. All other
+columns (site ids, names) are passed through to the results unchanged.
+"""
+import numpy as np
+import pandas as pd
+
+from .metrics import scenario_metrics
+from .model import PARAM_KEYS, default_values, param_labels
+from .parallel import run_sweep
+
+RESULT_COLUMNS = ("own_npv_m", "lease_npv_m", "npv_delta_m", "decision")
+# Added by with_metrics: IRR of owning over leasing (percent) and the two years
+METRIC_COLUMNS = ("irr_pct", "payback_year", "crossover_year")
+
+_HEADER_KEYS = {alias.lower(): key
+                for key in PARAM_KEYS for alias in (key, param_labels[key])}
+
+
+def rename_param_columns(frame):
+    """Return frame with parameter columns renamed to their keys."""
+    mapping = {}
+    for column in frame.columns:
+        key = _HEADER_KEYS.get(str(column).strip().lower())
+        if key is None:
+            continue
+        if key in mapping.values():
+            raise ValueError(f"more than one column gives {param_labels[key]!r}")
+        mapping[column] = key
+    return frame.rename(columns=mapping)
+
+
+def missing_param_columns(frame):
+    """Parameter keys that have no column in frame (after rename_param_columns)."""
+    return [key for key in PARAM_KEYS if key not in frame]
+
+
+def scenario_table(frame):
+    """Parameter columns of frame as float arrays, with defaults filled in."""
+    table = {}
+    for key in PARAM_KEYS:
+        if key not in frame:
+            table[key] = np.full(len(frame), float(default_values[key]))
+            continue
+        column = pd.to_numeric(frame[key], errors="coerce")
+        invalid = column.isna() & frame[key].notna()
+        if invalid.any():
+            raise ValueError(f"column {key!r} has a non-numeric value: {frame[key][invalid].iloc[0]!r}")
+        table[key] = column.fillna(default_values[key]).to_numpy(dtype=float)
+    return table
+
+
+def with_results(frame, own_npv, lease_npv):
+    """Copy of frame with NPVs ($M), their difference and the cheaper option appended."""
+    result = frame.copy()
+    result["own_npv_m"] = own_npv / 1e6
+    result["lease_npv_m"] = lease_npv / 1e6
+    result["npv_delta_m"] = result["own_npv_m"] - result["lease_npv_m"]
+    result["decision"] = np.where(result["npv_delta_m"] > 0, "own", "lease")
+    return result
+
+
+def with_metrics(result, table, curve=None, custom_depreciation=None):
+    """Append the METRIC_COLUMNS for the scenarios in table to result, in place."""
+    metrics = scenario_metrics(table, curve=curve, custom_depreciation=custom_depreciation)
+    result["irr_pct"] = metrics["irr"]
+    result["payback_year"] = metrics["payback_year"]
+    result["crossover_year"] = metrics["crossover_year"]
+    return result
+
+
+def evaluate_portfolio(frame, workers=1, chunk_size=None, metrics=False, curve=None,
+                       custom_depreciation=None):
+    """
+    Evaluate every facility in frame through the batch engine.
+
+    Returns frame with key-named parameter columns and the RESULT_COLUMNS
+    appended, followed by the METRIC_COLUMNS if metrics is true. workers,
+    chunk_size, curve and custom_depreciation are passed on to run_sweep.
+    """
+    frame = rename_param_columns(frame)
+    table = scenario_table(frame)
+    kwargs = {} if chunk_size is None else {"chunk_size": chunk_size}
+    own_npv, lease_npv = run_sweep(table, workers=workers, curve=curve,
+                                   custom_depreciation=custom_depreciation, **kwargs)
+    result = with_results(frame, own_npv, lease_npv)
+    return with_metrics(result, table, curve, custom_depreciation) if metrics else result
+
+
+def portfolio_totals(results):
+    """Aggregate NPVs ($M) of an evaluate_portfolio result."""
+    own_wins = results["decision"] == "own"
+    return {
+        "facilities": len(results),
+        "own_count": int(own_wins.sum()),
+        "own_npv_m": float(results["own_npv_m"].sum()),
+        "lease_npv_m": float(results["lease_npv_m"].sum()),
+        # Portfolio NPV if every facility takes its cheaper option
+        "best_npv_m": float(np.maximum(results["own_npv_m"], results["lease_npv_m"]).sum()),
+    }
@@ -0,0 +1,226 @@
+"""
+Batch evaluation of scenario parameters given in the app's input units.
+
+Parameters use the same keys and units as the Streamlit inputs (CAPEX in $M,
+rates in percent, terms in years). Values may be scalars or 1-D arrays; arrays
+are broadcast so that each position is one scenario. periods_per_year sets the
+width of the cash-flow matrices, so batches that mix annual, quarterly and
+monthly scenarios are evaluated one periods_per_year group at a time and the
+results are put back in row order (see grouped_by_periods).
+
+Every NPV function discounts at each scenario's WACC, or along curve (an
+npv.YieldCurve) when one is given, in which case the WACC inputs are ignored.
+custom_depreciation holds the yearly depreciation rates (fractions of CAPEX)
+of scenarios whose depr_method is the custom one.
+
+Leasing NPVs include the value of the scenario's lease option (purchase or
+renewal, see options), which the leasing cash flows cannot express.
+"""
+from functools import wraps
+
+import numpy as np
+
+from .batch import leasing_cashflows_batch, ownership_cashflows_batch, periodic_rate
+from .model import PARAM_KEYS, to_working_units
+from .npv import YieldCurve, discount_rows, row_discount_factors
+from .options import NO_OPTION, lease_option_values
+
+# Largest cash-flow matrix (rows x periods) built at once; monthly scenarios
+# are evaluated in correspondingly fewer rows per block
+BLOCK_CELLS = 4_000_000
+
+
+def _working_units(params):
+    return to_working_units({key: np.asarray(params[key], dtype=float) for key in PARAM_KEYS})
+
+
+def periods_per_year(params):
+    """The single periods_per_year value of a batch (or of one group of it), as an int."""
+    values = np.unique(np.asarray(params["periods_per_year"], dtype=float))
+    if values.size != 1:
+        raise ValueError("periods_per_year must be the same for every scenario in a batch")
+    value = values[0]
+    if value < 1 or value != np.round(value):
+        raise ValueError(f"periods_per_year must be a whole number of at least 1, got {value:g}")
+    return int(value)
+
+
+def _ownership_matrix(w, m, custom_depreciation=None):
+    return ownership_cashflows_batch(w["CAPEX"], w["debt_ratio"], w["interest_rate"],
+                                     w["debt_term"], w["analysis_years"],
+                                     w["operating_cost"], w["op_cost_growth"],
+                                     w["depreciation_years"], w["tax_rate"],
+                                     w["salvage_value"], m, w["debt_schedule"],
+                                     w["balloon_fraction"], w["interest_only_years"],
+                                     w["depreciation_method"], custom_depreciation)
+
+
+def _leasing_matrix(w, m):
+    return leasing_cashflows_batch(w["initial_lease_payment"], w["lease_escalation"],
+                                   w["analysis_years"], w["tax_rate"], m)
+
+
+def scenario_count(params):
+    """Number of scenarios the parameter values broadcast to."""
+    return int(np.prod(np.broadcast_shapes(*(np.shape(params[key]) for key in PARAM_KEYS))))
+
+
+def period_groups(params):
+    """
+    Split a batch by periods_per_year: a list of (rows, group params) with
+    rows the scenario indices of each group, or None if there is one value.
+    """
+    values = np.asarray(params["periods_per_year"], dtype=float)
+    distinct = np.unique(values)
+    if distinct.size <= 1:
+        return None
+    n = scenario_count(params)
+    values = np.broadcast_to(values, (n,))
+    columns = {key: np.asarray(params[key], dtype=float) for key in PARAM_KEYS}
+    groups = []
+    for value in distinct:
+        rows = np.flatnonzero(values == value)
+        groups.append((rows, {key: np.broadcast_to(column, (n,))[rows] if column.ndim else column
+                              for key, column in columns.items()}))
+    return groups
+
+
+def _scatter(results, n):
+    """Combine per-group results (arrays, or tuples or dicts of them) in row order."""
+    first = results[0][1]
+    if isinstance(first, tuple):
+        return tuple(_scatter([(rows, value[i]) for rows, value in results], n)
+                     for i in range(len(first)))
+    if isinstance(first, dict):
+        return {name: _scatter([(rows, value[name]) for rows, value in results], n)
+                for name in first}
+    combined = np.empty(n)
+    for rows, value in results:
+        combined[rows] = value
+    return combined
+
+
+def grouped_by_periods(function):
+    """
+    Let function(params, ...) take batches that mix periods_per_year values.
+    It is called once per value, and its per-scenario results (an array, or a
+    tuple or dict of arrays) are scattered back into row order.
+    """
+    @wraps(function)
+    def wrapper(params, *args, **kwargs):
+        groups = period_groups(params)
+        if groups is None:
+            return function(params, *args, **kwargs)
+        results = [(rows, function(group, *args, **kwargs)) for rows, group in groups]
+        return _scatter(results, scenario_count(params))
+    return wrapper
+
+
+def rows_per_block(params):
+    """Scenarios per block such that one block's cash-flow matrix has at most BLOCK_CELLS cells."""
+    n_periods = int(np.max(params["analysis_years"])) * periods_per_year(params) + 1
+    return max(1, BLOCK_CELLS // n_periods)
+
+
+def _blocks(params, n):
+    """Split params into row blocks of rows_per_block scenarios: yields (rows, block_params)."""
+    size = rows_per_block(params)
+    if n <= size:
+        yield slice(0, n), params
+        return
+    columns = {key: np.asarray(params[key], dtype=float) for key in PARAM_KEYS}
+    columns = {key: np.broadcast_to(value, (n,)) if value.size > 1 else value
+               for key, value in columns.items()}
+    for start in range(0, n, size):
+        rows = slice(start, min(start + size, n))
+        yield rows, {key: value[rows] if value.size > 1 else value
+                     for key, value in columns.items()}
+
+
+def discount_rate(params, curve=None):
+    """
+    What a batch is discounted at, per period: the curve laid out per period,
+    or else each scenario's WACC converted to a periodic rate.
+    """
+    m = periods_per_year(params)
+    if curve is not None:
+        return curve.per_period(m)
+    return periodic_rate(np.asarray(params["wacc"], dtype=float) / 100.0, m)
+
+
+def _rate_per_row(rate):
+    return not isinstance(rate, YieldCurve) and rate.size > 1
+
+
+def _discounted(matrix, params, curve):
+    """NPV per scenario of the cash flows matrix(w, m) builds."""
+    n = scenario_count(params)
+    m = periods_per_year(params)
+    npv = np.empty(n)
+    for rows, block in _blocks(params, n):
+        cashflows = matrix(_working_units(block), m)
+        size = rows.stop - rows.start
+        rate = discount_rate(block, curve)
+        if _rate_per_row(rate):
+            cashflows = np.broadcast_to(cashflows, (size, cashflows.shape[1]))
+        factors = row_discount_factors(rate, cashflows.shape[1] - 1)
+        npv[rows] = np.broadcast_to(discount_rows(cashflows, factors), (size,))
+    return npv
+
+
+def has_lease_options(params):
+    """Whether any scenario of a batch carries a lease option."""
+    return bool(np.any(np.asarray(params["lease_option"]) != NO_OPTION))
+
+
+def lease_option_npvs(params, curve=None):
+    """Value of each scenario's lease option ($), zero for scenarios without one."""
+    w = _working_units(params)
+    rate = curve if curve is not None else w["wacc"]
+    values = lease_option_values(w["lease_option"], w["CAPEX"], w["initial_lease_payment"],
+                                 w["purchase_price"], w["renewal_rent"], w["renewal_years"],
+                                 w["asset_volatility"], w["tax_rate"], w["analysis_years"], rate)
+    return np.broadcast_to(values, (scenario_count(params),))
+
+
+def scenario_cashflows(params, custom_depreciation=None):
+    """Return (own_cf, lease_cf) matrices, one column per period, for app-unit parameters."""
+    w = _working_units(params)
+    m = periods_per_year(params)
+    return _ownership_matrix(w, m, custom_depreciation), _leasing_matrix(w, m)
+
+
+@grouped_by_periods
+def evaluate_npvs(params, curve=None, custom_depreciation=None):
+    """Return (own_npv, lease_npv) arrays, one entry per scenario, discounted at its own WACC or along curve."""
+    n = scenario_count(params)
+    own_npv, lease_npv = np.empty(n), np.empty(n)
+    for rows, block in _blocks(params, n):
+        size = rows.stop - rows.start
+        own_cf, lease_cf = scenario_cashflows(block, custom_depreciation)
+        rate = discount_rate(block, curve)
+        if _rate_per_row(rate):
+            # Cash flows that do not vary across scenarios are shared by every discount rate.
+            own_cf = np.broadcast_to(own_cf, (size, own_cf.shape[1]))
+            lease_cf = np.broadcast_to(lease_cf, (size, lease_cf.shape[1]))
+        factors = row_discount_factors(rate, own_cf.shape[1] - 1)
+        own_npv[rows] = np.broadcast_to(discount_rows(own_cf, factors), (size,))
+        lease_npv[rows] = np.broadcast_to(discount_rows(lease_cf, factors), (size,))
+    if has_lease_options(params):
+        lease_npv += lease_option_npvs(params, curve)
+    return own_npv, lease_npv
+
+
+@grouped_by_periods
+def ownership_npvs(params, curve=None, custom_depreciation=None):
+    """Owning NPV per scenario, without building the leasing cash flows."""
+    return _discounted(lambda w, m: _ownership_matrix(w, m, custom_depreciation), params, curve)
+
+
+@grouped_by_periods
+def leasing_npvs(params, curve=None):
+    """Leasing NPV per scenario, without building the ownership cash flows."""
+    npv = _discounted(_leasing_matrix, params, curve)
+    if has_lease_options(params):
+        npv += lease_option_npvs(params, curve)
+    return npv
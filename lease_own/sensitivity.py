@@ -0,0 +1,100 @@
+"""
+Sensitivity of the owning vs. leasing decision to the model inputs.
+
+A grid varies two inputs over evenly spaced values while every other input
+stays at its base value; a tornado moves one input at a time to its low and
+high bound. Either way all scenarios are evaluated in one batched sweep.
+Parameters use the app's input units, an optional npv.YieldCurve replaces
+WACC as the discount rate, and custom_depreciation is as for
+scenarios.evaluate_npvs.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .model import INTEGER_KEYS, PARAM_KEYS, param_bounds
+from .parallel import run_sweep
+from .scenarios import evaluate_npvs
+
+# Largest number of values along one grid axis
+MAX_GRID_STEPS = 500
+# Grid cells evaluated per batch; bounds the size of the cash-flow matrices
+GRID_CHUNK_SIZE = 50_000
+
+
+def grid_axis(key, low, high, steps):
+    """Evenly spaced values from low to high; whole-year inputs are rounded and de-duplicated."""
+    if not 1 <= steps <= MAX_GRID_STEPS:
+        raise ValueError(f"steps must be between 1 and {MAX_GRID_STEPS}")
+    values = np.linspace(low, high, steps)
+    if key in INTEGER_KEYS:
+        values = np.unique(np.round(values))
+    return values
+
+
+def npv_delta_grid(base, x_key, x_values, y_key, y_values, curve=None, custom_depreciation=None):
+    """
+    Owning minus leasing NPV ($) over every (x, y) combination.
+
+    base holds the value of every input; x_key and y_key are replaced by
+    x_values and y_values. Returns an array of shape (len(y_values), len(x_values)).
+    """
+    if x_key == y_key:
+        raise ValueError("the two grid inputs must differ")
+    x_values = np.asarray(x_values, dtype=float)
+    y_values = np.asarray(y_values, dtype=float)
+    table = {key: base[key] for key in PARAM_KEYS}
+    table[x_key] = np.tile(x_values, len(y_values))
+    table[y_key] = np.repeat(y_values, len(x_values))
+    own_npv, lease_npv = run_sweep(table, workers=1, chunk_size=GRID_CHUNK_SIZE, curve=curve,
+                                   custom_depreciation=custom_depreciation)
+    return (own_npv - lease_npv).reshape(len(y_values), len(x_values))
+
+
+@dataclass
+class TornadoResult:
+    """NPVs ($) with each input at its low and high bound; arrays are indexed like keys."""
+    keys: tuple
+    low_values: np.ndarray = field(repr=False)
+    high_values: np.ndarray = field(repr=False)
+    base_own_npv: float
+    base_lease_npv: float
+    own_npv: np.ndarray = field(repr=False)  # (len(keys), 2): at low, at high
+    lease_npv: np.ndarray = field(repr=False)
+
+    @property
+    def delta(self):
+        """Owning minus leasing NPV, (len(keys), 2)."""
+        return self.own_npv - self.lease_npv
+
+    @property
+    def base_delta(self):
+        return self.base_own_npv - self.base_lease_npv
+
+
+def tornado(base, bounds=None, curve=None, custom_depreciation=None):
+    """
+    Move each input in bounds (default: the widget bounds) to its low and high
+    value, one at a time, and evaluate the base plus all 2 * len(bounds)
+    perturbed scenarios in a single batched call.
+    """
+    bounds = param_bounds if bounds is None else bounds
+    keys = tuple(bounds)
+    low_values = np.array([bounds[key][0] for key in keys], dtype=float)
+    high_values = np.array([bounds[key][1] for key in keys], dtype=float)
+    # Row 0 is the base; rows 1 + 2i and 2 + 2i move keys[i] to its low and high bound
+    n_rows = 1 + 2 * len(keys)
+    params = {key: np.full(n_rows, float(base[key])) for key in PARAM_KEYS}
+    for i, key in enumerate(keys):
+        params[key][1 + 2 * i] = low_values[i]
+        params[key][2 + 2 * i] = high_values[i]
+    own_npv, lease_npv = evaluate_npvs(params, curve, custom_depreciation)
+    return TornadoResult(
+        keys=keys,
+        low_values=low_values,
+        high_values=high_values,
+        base_own_npv=float(own_npv[0]),
+        base_lease_npv=float(lease_npv[0]),
+        own_npv=own_npv[1:].reshape(len(keys), 2),
+        lease_npv=lease_npv[1:].reshape(len(keys), 2),
+    )
@@ -0,0 +1,301 @@
+"""
+Streaming summaries of simulation outputs that never hold the draws themselves.
+
+Every summary consumes batches of values with update() and absorbs another
+summary of the same kind with merge(), so chunks, replicates and worker
+processes can be summarized separately and combined afterwards. All of them
+are small, picklable objects.
+
+  - RunningMoments: count, mean, variance, minimum and maximum.
+  - QuantileSketch: DDSketch-style logarithmic buckets; a quantile is within
+    relative_accuracy of the true sample quantile.
+  - StreamingHistogram: equal-width bins whose width is a power of two and
+    doubles whenever the data outgrow max_bins.
+  - NpvSketch: the three above for own_npv - lease_npv, plus running means of
+    both NPVs and the number of draws in which owning wins.
+"""
+import math
+
+import numpy as np
+
+# Quantile sketch defaults: 0.01% relative error, and at most 2**16 buckets
+# per sign (covering more than five orders of magnitude at that accuracy)
+DEFAULT_RELATIVE_ACCURACY = 1e-4
+DEFAULT_MAX_BUCKETS = 2 ** 16
+DEFAULT_HISTOGRAM_BINS = 64
+
+
+class RunningMoments:
+    """Count, mean, sum of squared deviations, minimum and maximum of a stream."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size:
+            mean = float(values.mean())
+            self._combine(values.size, mean, float(np.square(values - mean).sum()),
+                          float(values.min()), float(values.max()))
+
+    def merge(self, other):
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    def _combine(self, count, mean, m2, low, high):
+        # Chan, Golub and LeVeque's pairwise update
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1); 0 for fewer than two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class _BucketStore:
+    """Counts per integer bucket index, kept as one dense array starting at offset."""
+
+    def __init__(self, max_buckets):
+        self.max_buckets = max_buckets
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, indices):
+        if indices.size:
+            # Buckets this far below the batch's largest would be collapsed anyway
+            lowest = max(int(indices.min()), int(indices.max()) - self.max_buckets + 1)
+            indices = np.maximum(indices, lowest)
+            self._add_counts(lowest, np.bincount(indices - lowest))
+
+    def merge(self, other):
+        if other.counts.size:
+            self._add_counts(other.offset, other.counts)
+
+    def _add_counts(self, start, counts):
+        self.offset, self.counts = _add_dense(self.offset, self.counts, start, counts)
+        # Fold the lowest buckets (the values closest to zero) into one
+        excess = self.counts.size - self.max_buckets
+        if excess > 0:
+            self.counts[excess] += self.counts[:excess].sum()
+            self.counts = self.counts[excess:]
+            self.offset += excess
+
+    def nonzero(self):
+        """(bucket indices, counts) of the occupied buckets, in increasing index order."""
+        occupied = np.flatnonzero(self.counts)
+        return occupied + self.offset, self.counts[occupied]
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative error guarantees (DDSketch).
+
+    A value x != 0 goes to bucket ceil(log_gamma |x|), gamma = (1 + a) / (1 - a)
+    for relative accuracy a, with separate buckets for negative values. Each
+    sign keeps at most max_buckets buckets; beyond that the buckets closest to
+    zero are merged, which only coarsens values far smaller than the largest.
+    """
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY, max_buckets=DEFAULT_MAX_BUCKETS):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._positive = _BucketStore(max_buckets)
+        self._negative = _BucketStore(max_buckets)
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return
+        self.count += values.size
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.zero_count += int(np.count_nonzero(values == 0))
+        self._positive.add(self._index(values[values > 0]))
+        self._negative.add(self._index(-values[values < 0]))
+
+    def merge(self, other):
+        if (other.relative_accuracy, other.max_buckets) != (self.relative_accuracy, self.max_buckets):
+            raise ValueError("can only merge sketches with the same accuracy and bucket limit")
+        self._positive.merge(other._positive)
+        self._negative.merge(other._negative)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _index(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+
+    def _value(self, indices):
+        # Midpoint (in relative terms) of the bucket (gamma ** (i - 1), gamma ** i]
+        return 2.0 * np.exp(indices * self._log_gamma) / (self._gamma + 1.0)
+
+    def quantile(self, q):
+        """Value at quantile q (a fraction, scalar or array); NaN for an empty sketch."""
+        q = np.asarray(q, dtype=float)
+        if not self.count:
+            return np.full(q.shape, np.nan)[()]
+        negative_index, negative_count = self._negative.nonzero()
+        positive_index, positive_count = self._positive.nonzero()
+        # Buckets in increasing order of value: negatives from the largest magnitude down
+        values = np.concatenate([-self._value(negative_index[::-1]), [0.0],
+                                 self._value(positive_index)])
+        counts = np.concatenate([negative_count[::-1], [self.zero_count], positive_count])
+        rank = np.clip(q, 0.0, 1.0) * (self.count - 1)
+        bucket = np.searchsorted(np.cumsum(counts), rank, side="right")
+        return np.clip(values[bucket], self.min, self.max)[()]
+
+    def percentiles(self, percentiles):
+        """Values at the given percentiles (0-100), as an array."""
+        return np.atleast_1d(self.quantile(np.asarray(percentiles, dtype=float) / 100.0))
+
+
+class StreamingHistogram:
+    """
+    Histogram over equal-width bins [i * width, (i + 1) * width).
+
+    width is a power of two, chosen from the first batch and doubled (pairs of
+    bins merged) whenever the data would need more than max_bins bins, so any
+    two histograms can be brought to a common width and merged exactly.
+    """
+
+    def __init__(self, max_bins=DEFAULT_HISTOGRAM_BINS):
+        if max_bins < 2:
+            raise ValueError("max_bins must be at least 2")
+        self.max_bins = max_bins
+        self.width = None
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    @property
+    def edges(self):
+        if self.width is None:
+            return np.zeros(0)
+        return (self.offset + np.arange(self.counts.size + 1)) * self.width
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if not values.size:
+            return
+        low, high = float(values.min()), float(values.max())
+        if self.width is None:
+            span = max(high - low, abs(high), abs(low), 1.0) / self.max_bins
+            self.width = 2.0 ** math.floor(math.log2(span))
+        self._fit(low, high)
+        indices = np.floor(values / self.width).astype(np.int64)
+        first = int(indices.min())
+        self.offset, self.counts = _add_dense(self.offset, self.counts, first,
+                                              np.bincount(indices - first))
+
+    def merge(self, other):
+        if other.width is None:
+            return
+        if self.width is None:
+            self.width = other.width
+        elif other.width > self.width:
+            self._widen(int(other.width / self.width))
+        # Left edge of other's last bin: it lands in the same bin as the rest of that bin
+        self._fit(other.offset * other.width, (other.offset + other.counts.size - 1) * other.width)
+        counts, offset = _rebin(other.counts, other.offset, int(self.width / other.width))
+        self.offset, self.counts = _add_dense(self.offset, self.counts, offset, counts)
+
+    def _fit(self, low, high):
+        """Double the bin width until the current bins and [low, high] fit in max_bins."""
+        if self.counts.size:
+            low = min(low, self.offset * self.width)
+            high = max(high, (self.offset + self.counts.size - 1) * self.width)
+        factor = 1
+        while (math.floor(high / (self.width * factor))
+               - math.floor(low / (self.width * factor)) >= self.max_bins):
+            factor *= 2
+        self._widen(factor)
+
+    def _widen(self, factor):
+        if factor > 1:
+            self.width *= factor
+            if self.counts.size:
+                self.counts, self.offset = _rebin(self.counts, self.offset, factor)
+
+
+def _add_dense(offset, counts, start, new_counts):
+    """Add new_counts (starting at index start) to counts (starting at offset); returns both anew."""
+    if not counts.size:
+        return start, new_counts.astype(np.int64)
+    low = min(offset, start)
+    high = max(offset + counts.size, start + new_counts.size)
+    merged = np.zeros(high - low, dtype=np.int64)
+    merged[offset - low:offset - low + counts.size] += counts
+    merged[start - low:start - low + new_counts.size] += new_counts
+    return low, merged
+
+
+def _rebin(counts, offset, factor):
+    """Merge every factor consecutive bins (aligned to multiples of factor)."""
+    if factor == 1:
+        return counts, offset
+    indices = (offset + np.arange(counts.size)) // factor
+    first = int(indices[0])
+    return np.bincount(indices - first, weights=counts).astype(np.int64), first
+
+
+class NpvSketch:
+    """Streaming summary of simulated (own_npv, lease_npv) pairs."""
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY, histogram_bins=DEFAULT_HISTOGRAM_BINS):
+        self.own_npv = RunningMoments()
+        self.lease_npv = RunningMoments()
+        self.delta = RunningMoments()
+        self.quantiles = QuantileSketch(relative_accuracy)
+        self.histogram = StreamingHistogram(histogram_bins)
+        self.own_wins = 0
+
+    @property
+    def count(self):
+        return self.delta.count
+
+    @property
+    def p_own_wins(self):
+        return self.own_wins / self.count if self.count else math.nan
+
+    def update(self, own_npv, lease_npv):
+        own_npv, lease_npv = np.broadcast_arrays(np.asarray(own_npv, dtype=float),
+                                                 np.asarray(lease_npv, dtype=float))
+        delta = own_npv - lease_npv
+        self.own_npv.update(own_npv)
+        self.lease_npv.update(lease_npv)
+        self.delta.update(delta)
+        self.quantiles.update(delta)
+        self.histogram.update(delta)
+        self.own_wins += int(np.count_nonzero(delta > 0))
+
+    def merge(self, other):
+        self.own_npv.merge(other.own_npv)
+        self.lease_npv.merge(other.lease_npv)
+        self.delta.merge(other.delta)
+        self.quantiles.merge(other.quantiles)
+        self.histogram.merge(other.histogram)
+        self.own_wins += other.own_wins
@@ -0,0 +1,146 @@
+"""
+Parity of the batch kernels with the original per-year scalar loops.
+
+The reference functions below are the year-by-year implementations the app
+shipped with before the batch kernels replaced them.
+"""
+import numpy as np
+import pytest
+
+from lease_own.batch import leasing_cashflows_batch, ownership_cashflows_batch
+from lease_own.model import leasing_cashflows, ownership_cashflows
+from lease_own.npv import npv_batch
+
+N_SCENARIOS = 500
+
+
+def reference_npv(cashflows, discount_rate):
+    return sum(cf / ((1 + discount_rate) ** t) for t, cf in enumerate(cashflows))
+
+
+def reference_ownership_cashflows(CAPEX, debt_ratio, interest_rate, debt_term, n_years,
+                                  operating_cost, op_cost_growth, depreciation_years,
+                                  tax_rate, salvage_value):
+    annual_depreciation = CAPEX / depreciation_years
+    debt_amount = CAPEX * debt_ratio
+    annual_principal_payment = debt_amount / debt_term if debt_term > 0 else 0
+    outstanding_debt = debt_amount
+
+    cashflows = [-CAPEX * (1 - debt_ratio)]
+    op_cost = operating_cost
+
+    for t in range(1, n_years + 1):
+        interest_expense = outstanding_debt * interest_rate if outstanding_debt > 0 else 0
+        financing_cash = annual_principal_payment + interest_expense if t <= debt_term else interest_expense
+        depreciation = annual_depreciation if t <= depreciation_years else 0
+        tax_shield = (depreciation + interest_expense) * tax_rate
+
+        net_cash = -op_cost - financing_cash + tax_shield
+        if t == n_years:
+            net_cash += salvage_value
+
+        cashflows.append(net_cash)
+
+        if t <= debt_term:
+            outstanding_debt -= annual_principal_payment
+
+        op_cost *= (1 + op_cost_growth)
+
+    return cashflows
+
+
+def reference_leasing_cashflows(initial_lease_payment, lease_escalation, n_years, tax_rate):
+    cashflows = [0]
+    lease_payment = initial_lease_payment
+    for t in range(1, n_years + 1):
+        net_cash = -lease_payment + (lease_payment * tax_rate)
+        cashflows.append(net_cash)
+        lease_payment *= (1 + lease_escalation)
+    return cashflows
+
+
+@pytest.fixture
+def scenarios():
+    """Random scenarios in working units, spanning the app's input bounds."""
+    rng = np.random.default_rng(20240601)
+    n = N_SCENARIOS
+    return {
+        "CAPEX": rng.uniform(50e6, 3000e6, n),
+        "debt_ratio": rng.uniform(0.0, 1.0, n),
+        "interest_rate": rng.uniform(0.0, 0.2, n),
+        "debt_term": rng.integers(1, 31, n),
+        "n_years": rng.integers(5, 41, n),
+        "operating_cost": rng.uniform(1e6, 500e6, n),
+        "op_cost_growth": rng.uniform(0.0, 0.1, n),
+        "depreciation_years": rng.integers(1, 31, n),
+        "tax_rate": rng.uniform(0.0, 0.5, n),
+        "salvage_value": rng.uniform(0.0, 500e6, n),
+        "initial_lease_payment": rng.uniform(1e6, 500e6, n),
+        "lease_escalation": rng.uniform(0.0, 0.1, n),
+        "wacc": rng.uniform(0.0, 0.2, n),
+    }
+
+
+def _padded(rows, width):
+    return np.array([row + [0.0] * (width - len(row)) for row in rows])
+
+
+def _ownership_args(s, i):
+    return (s["CAPEX"][i], s["debt_ratio"][i], s["interest_rate"][i], int(s["debt_term"][i]),
+            int(s["n_years"][i]), s["operating_cost"][i], s["op_cost_growth"][i],
+            int(s["depreciation_years"][i]), s["tax_rate"][i], s["salvage_value"][i])
+
+
+def test_ownership_batch_matches_scalar_loop(scenarios):
+    s = scenarios
+    batch = ownership_cashflows_batch(s["CAPEX"], s["debt_ratio"], s["interest_rate"],
+                                      s["debt_term"], s["n_years"], s["operating_cost"],
+                                      s["op_cost_growth"], s["depreciation_years"],
+                                      s["tax_rate"], s["salvage_value"])
+    expected = _padded([reference_ownership_cashflows(*_ownership_args(s, i))
+                        for i in range(N_SCENARIOS)], batch.shape[1])
+    assert batch.shape == (N_SCENARIOS, s["n_years"].max() + 1)
+    np.testing.assert_allclose(batch, expected, rtol=1e-12, atol=1e-4)
+
+
+def test_leasing_batch_matches_scalar_loop(scenarios):
+    s = scenarios
+    batch = leasing_cashflows_batch(s["initial_lease_payment"], s["lease_escalation"],
+                                    s["n_years"], s["tax_rate"])
+    expected = _padded([reference_leasing_cashflows(s["initial_lease_payment"][i],
+                                                    s["lease_escalation"][i],
+                                                    int(s["n_years"][i]), s["tax_rate"][i])
+                        for i in range(N_SCENARIOS)], batch.shape[1])
+    np.testing.assert_allclose(batch, expected, rtol=1e-12, atol=1e-4)
+
+
+def test_npv_batch_matches_scalar_loop(scenarios):
+    s = scenarios
+    cashflows = ownership_cashflows_batch(s["CAPEX"], s["debt_ratio"], s["interest_rate"],
+                                          s["debt_term"], s["n_years"], s["operating_cost"],
+                                          s["op_cost_growth"], s["depreciation_years"],
+                                          s["tax_rate"], s["salvage_value"])
+    per_row = npv_batch(cashflows, s["wacc"])
+    shared = npv_batch(cashflows, 0.06)
+    for i in range(N_SCENARIOS):
+        flows = reference_ownership_cashflows(*_ownership_args(s, i))
+        assert per_row[i] == pytest.approx(reference_npv(flows, s["wacc"][i]), rel=1e-10)
+        assert shared[i] == pytest.approx(reference_npv(flows, 0.06), rel=1e-10)
+
+
+def test_scalar_wrappers_match_scalar_loop(scenarios):
+    s = scenarios
+    for i in range(20):
+        args = _ownership_args(s, i)
+        assert ownership_cashflows(*args) == pytest.approx(reference_ownership_cashflows(*args),
+                                                           rel=1e-12, abs=1e-4)
+        lease_args = (s["initial_lease_payment"][i], s["lease_escalation"][i],
+                      int(s["n_years"][i]), s["tax_rate"][i])
+        assert leasing_cashflows(*lease_args) == pytest.approx(
+            reference_leasing_cashflows(*lease_args), rel=1e-12, abs=1e-4)
+
+
+def test_zero_debt_term_repays_nothing():
+    expected = reference_ownership_cashflows(100e6, 0.5, 0.05, 0, 10, 5e6, 0.02, 10, 0.25, 10e6)
+    batch = ownership_cashflows_batch(100e6, 0.5, 0.05, 0, 10, 5e6, 0.02, 10, 0.25, 10e6)
+    np.testing.assert_allclose(batch[0], expected, rtol=1e-12)
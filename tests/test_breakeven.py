@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from lease_own.breakeven import BREAKEVEN_KEYS, break_even
+from lease_own.model import default_values
+from lease_own.npv import YieldCurve
+from lease_own.scenarios import evaluate_npvs
+
+
+def _batch():
+    params = dict(default_values)
+    params["CAPEX"] = np.array([200.0, 300.0, 450.0])
+    params["wacc"] = np.array([4.0, 6.0, 8.0])
+    return params
+
+
+def _assert_npvs_agree(params, key, values):
+    at_root = dict(params, **{key: values})
+    own_npv, lease_npv = evaluate_npvs(at_root)
+    np.testing.assert_allclose(own_npv, lease_npv, rtol=1e-6)
+
+
+@pytest.mark.parametrize("key", BREAKEVEN_KEYS)
+def test_npvs_agree_at_the_break_even_value(key):
+    params = _batch()
+    values = break_even(params, key)
+    found = ~np.isnan(values)
+    if key == "lease_payment":
+        assert found.all()
+    if not found.any():
+        return
+    for name in ("CAPEX", "wacc"):
+        params[name] = params[name][found]
+    _assert_npvs_agree(params, key, values[found])
+
+
+def test_break_even_along_a_yield_curve():
+    params = _batch()
+    curve = YieldCurve((1.0, 30.0), (0.04, 0.07))
+    values = break_even(params, "lease_payment", curve=curve)
+    own_npv, lease_npv = evaluate_npvs(dict(params, lease_payment=values), curve)
+    np.testing.assert_allclose(own_npv, lease_npv, rtol=1e-6)
+
+
+def test_no_sign_change_gives_nan():
+    params = _batch()
+    values = break_even(params, "lease_payment")
+    # Leasing only gets dearer above the break-even payment
+    beyond = break_even(params, "lease_payment", low=values + 10.0, high=values + 20.0)
+    assert np.isnan(beyond).all()
+
+
+@pytest.mark.parametrize("key", ["analysis_years", "debt_term", "periods_per_year"])
+def test_whole_number_inputs_are_rejected(key):
+    with pytest.raises(ValueError):
+        break_even(dict(default_values), key)
+
+
+def test_length_one_columns_broadcast_against_the_batch():
+    params = dict(default_values)
+    params["CAPEX"] = np.array([300.0])
+    params["wacc"] = np.array([4.0, 6.0, 8.0])
+    values = break_even(params, "lease_payment")
+    single = [break_even(dict(default_values, CAPEX=300.0, wacc=wacc), "lease_payment")[0]
+              for wacc in params["wacc"]]
+    np.testing.assert_allclose(values, single, rtol=1e-9)
@@ -0,0 +1,35 @@
+import pytest
+
+from lease_own.cache import LRUCache
+
+
+def test_evicts_the_least_recently_used_entry():
+    cache = LRUCache(maxsize=2)
+    calls = []
+
+    def compute(key):
+        return lambda: calls.append(key) or key * 10
+
+    assert cache.get_or_compute(1, compute(1)) == 10
+    assert cache.get_or_compute(2, compute(2)) == 20
+    # Using 1 again makes 2 the least recently used
+    assert cache.get_or_compute(1, compute(1)) == 10
+    assert cache.get_or_compute(3, compute(3)) == 30
+    assert cache.get_or_compute(1, compute(1)) == 10
+    assert cache.get_or_compute(2, compute(2)) == 20
+    assert calls == [1, 2, 3, 2]
+    assert cache.stats() == {"hits": 2, "misses": 4, "evictions": 2, "size": 2, "maxsize": 2}
+
+
+def test_clear_empties_the_cache_and_resets_the_counters():
+    cache = LRUCache(maxsize=4)
+    for key in range(6):
+        cache.get_or_compute(key, lambda: key)
+    assert cache.stats()["size"] == 4
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "evictions": 0, "size": 0, "maxsize": 4}
+
+
+def test_maxsize_must_be_positive():
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
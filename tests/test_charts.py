@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from lease_own.charts import (cumulative_cashflow_spec, heatmap_spec, histogram_spec,
+                              tornado_spec, yearly_cashflow_spec)
+
+YEARS = [0, 1, 2, 3]
+OWN = [-300e6, 10e6, 12e6, 14e6]
+LEASE = [0.0, -20e6, -21e6, -22e6]
+
+
+def test_yearly_spec_has_one_record_per_year_and_option():
+    spec = yearly_cashflow_spec(YEARS, OWN, LEASE)
+    records = spec["data"]["values"]
+    assert len(records) == 2 * len(YEARS)
+    value_name = spec["encoding"]["y"]["field"]
+    assert set(records[0]) == {"Year", "Option", value_name}
+    assert [r[value_name] for r in records if r["Option"] == "Owning"] == pytest.approx(
+        [-300.0, 10.0, 12.0, 14.0])
+    assert spec["encoding"]["x"]["field"] == "Year"
+
+
+def test_cumulative_spec_has_one_record_per_year_and_option():
+    spec = cumulative_cashflow_spec(YEARS, np.cumsum(OWN), np.cumsum(LEASE))
+    records = spec["data"]["values"]
+    assert len(records) == 2 * len(YEARS)
+    value_name = spec["encoding"]["y"]["field"]
+    assert set(records[0]) == {"Year", "Option", value_name}
+    assert records[-1] == {"Year": 3, "Option": "Leasing", value_name: pytest.approx(-63.0)}
+
+
+def test_histogram_spec_has_one_record_per_bin():
+    edges = np.linspace(-50.0, 50.0, 11)
+    counts = np.arange(10)
+    spec = histogram_spec(edges, counts, "NPV Difference (Millions $)", "Histogram")
+    bars = spec["layer"][0]
+    assert len(bars["data"]["values"]) == 10
+    assert set(bars["data"]["values"][0]) == {"bin_start", "bin_end", "count"}
+    assert bars["data"]["values"][-1] == {"bin_start": 40.0, "bin_end": 50.0, "count": 9}
+    assert bars["encoding"]["x2"]["field"] == "bin_end"
+
+
+def test_heatmap_spec_ships_the_grid_as_one_flat_array():
+    x_values, y_values = [1.0, 2.0, 3.0], [10.0, 20.0]
+    grid = np.arange(6.0).reshape(2, 3) * 1e6
+    spec = heatmap_spec(x_values, y_values, grid, "WACC (%)", "Analysis Period (years)", "Grid")
+    data = spec["data"]["values"][0]
+    assert data["delta"] == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    assert data["xe"] == [0.5, 1.5, 2.5, 3.5]
+    assert data["ye"] == [5.0, 15.0, 25.0]
+    computed = {step["as"] for step in spec["transform"] if "calculate" in step}
+    assert {"x", "x2", "y", "y2", "WACC (%)", "Analysis Period (years)"} <= computed
+    assert spec["encoding"]["color"]["field"] in computed
+
+
+def test_tornado_spec_puts_the_widest_swing_on_top():
+    labels = ["CAPEX", "WACC", "Tax"]
+    spec = tornado_spec(labels, 0.0, [-5e6, -50e6, -1e6], [5e6, 40e6, 2e6], "Delta", "Tornado")
+    bars = spec["layer"][0]
+    assert bars["encoding"]["y"]["sort"] == ["WACC", "CAPEX", "Tax"]
+    records = bars["data"]["values"]
+    assert len(records) == 2 * len(labels)
+    assert set(records[0]) == {"Parameter", "Bound", "start", "Delta"}
+    assert [r["Parameter"] for r in records[::2]] == ["WACC", "CAPEX", "Tax"]
+    assert records[0]["Delta"] == pytest.approx(-50.0)
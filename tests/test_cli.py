@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from lease_own.cli import main
+
+
+def _run(tmp_path, frame, *options):
+    source = tmp_path / "scenarios.csv"
+    frame.to_csv(source, index=False)
+    target = tmp_path / "results.csv"
+    main([str(source), str(target), *options])
+    return pd.read_csv(target)
+
+
+def test_evaluates_every_row(tmp_path):
+    result = _run(tmp_path, pd.DataFrame({"site": ["a", "b"], "CAPEX": [200.0, 400.0]}), "--metrics")
+    assert list(result["site"]) == ["a", "b"]
+    assert result["own_npv_m"].iloc[1] < result["own_npv_m"].iloc[0]
+    assert "irr_pct" in result
+
+
+@pytest.mark.parametrize("frame, options, message", [
+    (pd.DataFrame({"CAPEX": [300.0, "lots"]}), (), "non-numeric"),
+    (pd.DataFrame({"depr_method": [3]}), (), "custom depreciation"),
+    (pd.DataFrame({"lease_option": [7]}), (), "unknown lease option"),
+])
+def test_bad_input_exits_with_one_line(tmp_path, frame, options, message):
+    with pytest.raises(SystemExit) as exit_info:
+        _run(tmp_path, frame, *options)
+    text = str(exit_info.value.code)
+    assert text.startswith("error: ") and message in text and "\n" not in text
+
+
+def test_simulate_bad_setting_exits_with_one_line():
+    with pytest.raises(SystemExit) as exit_info:
+        main(["simulate", "--vary", "wacc=normal:6,1", "--set", "depr_method=3",
+              "--mean-tolerance", "1", "--max-draws", "100", "--batch-size", "10"])
+    assert "custom depreciation" in str(exit_info.value.code)
+
+
+def test_mixed_periods_per_year_in_one_file(tmp_path):
+    frame = pd.DataFrame({"site": ["a", "q", "m"], "periods_per_year": [1, 4, 12]})
+    result = _run(tmp_path, frame, "--metrics", "--break-even", "lease_payment")
+    assert list(result["site"]) == ["a", "q", "m"]
+    assert result["own_npv_m"].nunique() == 3
+    assert result["breakeven_lease_payment"].notna().all()
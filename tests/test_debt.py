@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from lease_own.batch import ownership_cashflows_batch
+from lease_own.debt import (BALLOON, EVEN_PRINCIPAL, INTEREST_ONLY, LEVEL_PAYMENT,
+                            debt_schedule_batch, outstanding_fractions)
+
+DEBT = 100e6
+
+
+def _annuity_payment(debt, rate, n):
+    return debt * rate / (1 - (1 + rate) ** -n)
+
+
+def test_even_principal_repays_the_same_amount_every_period():
+    interest, principal = debt_schedule_batch(DEBT, 0.05, 10, EVEN_PRINCIPAL, horizon=12)
+    np.testing.assert_allclose(principal[0, :10], DEBT / 10)
+    np.testing.assert_array_equal(principal[0, 10:], 0.0)
+    np.testing.assert_allclose(interest[0, :10], 0.05 * DEBT * (1 - np.arange(10) / 10))
+
+
+def test_level_payment_is_an_annuity():
+    interest, principal = debt_schedule_batch(DEBT, 0.06, 15, LEVEL_PAYMENT, horizon=20)
+    payments = (interest + principal)[0]
+    np.testing.assert_allclose(payments[:15], _annuity_payment(DEBT, 0.06, 15), rtol=1e-12)
+    np.testing.assert_allclose(payments[15:], 0.0, atol=1e-6)
+    assert principal.sum() == pytest.approx(DEBT, rel=1e-12)
+
+
+def test_level_payment_at_a_zero_rate_repays_evenly():
+    interest, principal = debt_schedule_batch(DEBT, 0.0, 8, LEVEL_PAYMENT)
+    np.testing.assert_allclose(principal, DEBT / 8)
+    np.testing.assert_array_equal(interest, 0.0)
+
+
+def test_balloon_is_repaid_with_the_last_payment():
+    interest, principal = debt_schedule_batch(DEBT, 0.05, 10, BALLOON, balloon_fraction=0.4)
+    payments = (interest + principal)[0]
+    level = _annuity_payment(0.6 * DEBT, 0.05, 10) + 0.05 * 0.4 * DEBT
+    np.testing.assert_allclose(payments[:9], level, rtol=1e-12)
+    assert payments[9] == pytest.approx(level + 0.4 * DEBT, rel=1e-12)
+    assert principal.sum() == pytest.approx(DEBT, rel=1e-12)
+
+
+def test_interest_only_then_level_payments():
+    interest, principal = debt_schedule_batch(DEBT, 0.05, 10, INTEREST_ONLY, interest_only=3)
+    np.testing.assert_allclose(interest[0, :3], 0.05 * DEBT)
+    np.testing.assert_array_equal(principal[0, :3], 0.0)
+    np.testing.assert_allclose((interest + principal)[0, 3:], _annuity_payment(DEBT, 0.05, 7),
+                               rtol=1e-12)
+
+
+def test_interest_only_for_the_whole_term_repays_at_maturity():
+    interest, principal = debt_schedule_batch(DEBT, 0.05, 5, INTEREST_ONLY, interest_only=30)
+    np.testing.assert_allclose(interest, 0.05 * DEBT)
+    np.testing.assert_array_equal(principal[0, :4], 0.0)
+    assert principal[0, 4] == pytest.approx(DEBT)
+
+
+def test_rows_mix_schedules_and_share_cached_tables():
+    schedules = np.array([EVEN_PRINCIPAL, LEVEL_PAYMENT, BALLOON, INTEREST_ONLY] * 3)
+    fractions = outstanding_fractions(schedules, 0.05, 10, 0.3, 2, 12)
+    assert fractions.shape == (12, 13)
+    np.testing.assert_array_equal(fractions[:4], fractions[4:8])
+    np.testing.assert_array_equal(fractions[:, 0], 1.0)
+    np.testing.assert_array_equal(fractions[:, 10:], 0.0)
+
+
+def test_zero_term_repays_nothing():
+    np.testing.assert_array_equal(outstanding_fractions(LEVEL_PAYMENT, 0.05, 0, 0.0, 0, 5), 1.0)
+
+
+@pytest.mark.parametrize("kwargs", [{"schedule": 7}, {"balloon_fraction": 1.5}])
+def test_invalid_schedules(kwargs):
+    arguments = dict(schedule=BALLOON, rate=0.05, term=10, balloon_fraction=0.2, interest_only=0,
+                     horizon=10)
+    arguments.update(kwargs)
+    with pytest.raises(ValueError):
+        outstanding_fractions(**arguments)
+
+
+def test_even_principal_schedule_matches_the_closed_form_kernel():
+    args = (300e6, 0.6, 0.05, 10, 20, 12e6, 0.02, 10, 0.25, 40e6)
+    closed_form = ownership_cashflows_batch(*args)
+    # The level-payment row sends the batch through the schedule tables; its
+    # even-principal row must still equal the closed form
+    through_tables = ownership_cashflows_batch(*args, debt_schedule=np.array([0, 1]))[0]
+    np.testing.assert_allclose(through_tables, closed_form[0], rtol=1e-12)
+
+
+def test_quarterly_level_payments_use_the_periodic_rate():
+    args = (300e6, 1.0, 0.08, 10, 10, 0.0, 0.0, 10, 0.0, 0.0)
+    cashflows = ownership_cashflows_batch(*args, periods_per_year=4, debt_schedule=LEVEL_PAYMENT)
+    rate = 1.08 ** 0.25 - 1
+    np.testing.assert_allclose(-cashflows[0, 1:], _annuity_payment(300e6, rate, 40), rtol=1e-12)
+
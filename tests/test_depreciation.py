@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from lease_own.batch import ownership_cashflows_batch
+from lease_own.depreciation import (CUSTOM, DOUBLE_DECLINING, MACRS, MACRS_PERCENTAGES,
+                                    STRAIGHT_LINE, depreciation_rates, rate_cache_info)
+
+
+def test_straight_line():
+    rates = depreciation_rates(STRAIGHT_LINE, 4, 6)
+    np.testing.assert_allclose(rates, [[0.25, 0.25, 0.25, 0.25, 0.0, 0.0]])
+
+
+@pytest.mark.parametrize("recovery_class", sorted(MACRS_PERCENTAGES))
+def test_macrs_tables_deduct_the_whole_cost(recovery_class):
+    rates = depreciation_rates(MACRS, recovery_class, 25)
+    assert rates.sum() == pytest.approx(1.0, abs=2e-4)
+    # Half-year convention: one year longer than the recovery class
+    assert np.count_nonzero(rates) == recovery_class + 1
+
+
+@pytest.mark.parametrize("life, recovery_class", [(1, 3), (3, 3), (4, 5), (8, 10), (12, 15), (30, 20)])
+def test_macrs_uses_the_shortest_class_of_at_least_the_life(life, recovery_class):
+    expected = np.zeros(25)
+    expected[:recovery_class + 1] = np.array(MACRS_PERCENTAGES[recovery_class]) / 100
+    np.testing.assert_allclose(depreciation_rates(MACRS, life, 25)[0], expected)
+
+
+def test_double_declining_switches_to_straight_line():
+    rates = depreciation_rates(DOUBLE_DECLINING, 5, 7)[0]
+    # 40% of the book value while that beats straight line, then 10.8% twice
+    np.testing.assert_allclose(rates, [0.4, 0.24, 0.144, 0.108, 0.108, 0.0, 0.0], rtol=1e-12)
+    for life in range(1, 31):
+        assert depreciation_rates(DOUBLE_DECLINING, life, 40).sum() == pytest.approx(1.0, rel=1e-12)
+
+
+def test_custom_schedule_is_padded_and_truncated():
+    np.testing.assert_allclose(depreciation_rates(CUSTOM, 10, 4, (0.5, 0.3, 0.2)),
+                               [[0.5, 0.3, 0.2, 0.0]])
+    np.testing.assert_allclose(depreciation_rates(CUSTOM, 10, 2, (0.5, 0.3, 0.2)), [[0.5, 0.3]])
+
+
+def test_custom_method_needs_a_schedule():
+    with pytest.raises(ValueError):
+        depreciation_rates(CUSTOM, 10, 5)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        depreciation_rates(9, 10, 5)
+
+
+def test_rows_mix_methods():
+    methods = np.array([STRAIGHT_LINE, MACRS, DOUBLE_DECLINING, CUSTOM])
+    rates = depreciation_rates(methods, 5, 8, (1.0,))
+    np.testing.assert_allclose(rates[0], depreciation_rates(STRAIGHT_LINE, 5, 8)[0])
+    np.testing.assert_allclose(rates[1], depreciation_rates(MACRS, 5, 8)[0])
+    np.testing.assert_allclose(rates[2], depreciation_rates(DOUBLE_DECLINING, 5, 8)[0])
+    np.testing.assert_allclose(rates[3], [1.0] + [0.0] * 7)
+
+
+def test_tables_are_cached_per_method_and_life():
+    first = depreciation_rates(np.array([MACRS, MACRS]), np.array([7, 7]), 10)
+    hits = rate_cache_info().hits
+    second = depreciation_rates(np.array([MACRS, MACRS]), np.array([7, 7]), 10)
+    assert rate_cache_info().hits == hits + 1
+    np.testing.assert_array_equal(first, second)
+
+
+def _tax_shield(cashflows, without_depreciation):
+    return cashflows[0, 1:] - without_depreciation[0, 1:]
+
+
+def test_ownership_tax_shield_follows_the_method():
+    args = (300e6, 0.0, 0.0, 10, 12, 0.0, 0.0, 5, 0.25, 0.0)
+    no_tax = ownership_cashflows_batch(*args[:8], 0.0, 0.0)
+    macrs = ownership_cashflows_batch(*args, depreciation_method=MACRS)
+    shield = _tax_shield(macrs, no_tax)
+    np.testing.assert_allclose(shield, 300e6 * 0.25 * depreciation_rates(MACRS, 5, 12)[0])
+
+
+def test_quarterly_cash_flows_spread_each_years_deduction():
+    args = (300e6, 0.0, 0.0, 10, 8, 0.0, 0.0, 5, 0.25, 0.0)
+    annual = ownership_cashflows_batch(*args, depreciation_method=DOUBLE_DECLINING)
+    quarterly = ownership_cashflows_batch(*args, periods_per_year=4, depreciation_method=DOUBLE_DECLINING)
+    np.testing.assert_allclose(quarterly[0, 1:5], annual[0, 1] / 4)
+    np.testing.assert_allclose(quarterly[0, 1:].reshape(8, 4).sum(axis=1), annual[0, 1:])
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from lease_own.metrics import (crossover_year_batch, discounted_payback_batch, irr_batch,
+                               scenario_metrics)
+from lease_own.model import default_values
+from lease_own.scenarios import evaluate_npvs, scenario_cashflows
+
+
+def _polynomial_irr(cashflows):
+    """IRR from the real roots of the NPV polynomial in v = 1 / (1 + r)."""
+    roots = np.roots(cashflows[::-1])
+    v = roots[np.isreal(roots) & (roots.real > 0)].real
+    return 1.0 / v - 1.0
+
+
+def test_irr_of_simple_streams():
+    cashflows = np.array([
+        [-100.0, 110.0, 0.0],
+        [-100.0, 0.0, 121.0],
+        [-100.0, 60.0, 60.0],
+    ])
+    irr = irr_batch(cashflows)
+    assert irr[0] == pytest.approx(0.10, abs=1e-10)
+    assert irr[1] == pytest.approx(0.10, abs=1e-10)
+    assert irr[2] == pytest.approx(_polynomial_irr(cashflows[2])[0], abs=1e-10)
+
+
+def test_irr_matches_polynomial_roots_on_random_streams():
+    rng = np.random.default_rng(7)
+    cashflows = np.column_stack([-rng.uniform(50, 150, 200), rng.uniform(5, 30, (200, 15))])
+    irr = irr_batch(cashflows)
+    for row, rate in zip(cashflows, irr):
+        # One sign change, so exactly one positive root
+        assert rate == pytest.approx(_polynomial_irr(row)[0], abs=1e-8)
+
+
+def test_irr_is_nan_without_sign_change():
+    assert np.isnan(irr_batch([[100.0, 10.0, 10.0]])[0])
+    assert np.isnan(irr_batch([[-100.0, -10.0, -10.0]])[0])
+
+
+def test_payback_is_first_year_the_cumulative_stream_stays_non_negative():
+    cashflows = np.array([
+        [-100.0, 50.0, 60.0, 10.0],    # recovers in year 2
+        [0.0, -50.0, 30.0, 30.0],      # starts at zero, dips, recovers in year 3
+        [-100.0, 150.0, -80.0, 40.0],  # non-negative in year 1, negative again in year 2
+        [-100.0, 10.0, 10.0, 10.0],    # never recovers
+        [0.0, 10.0, 10.0, 10.0],       # never negative
+    ])
+    payback = discounted_payback_batch(cashflows, 0.0)
+    np.testing.assert_array_equal(payback[:3], [2.0, 3.0, 3.0])
+    assert np.isnan(payback[3])
+    assert payback[4] == 0.0
+
+
+def test_payback_discounts_the_stream():
+    # Undiscounted payback in year 2; at 10% the year-2 inflow is only worth 90.9
+    assert discounted_payback_batch([[-100.0, 0.0, 110.0, 100.0]], 0.0)[0] == 2.0
+    assert discounted_payback_batch([[-100.0, 0.0, 110.0, 100.0]], 0.10)[0] == 3.0
+
+
+def test_crossover_uses_the_last_time_owning_falls_behind():
+    own = np.array([[0.0, -30.0, 0.0, 0.0]])
+    lease = np.array([[0.0, -10.0, -10.0, -10.0]])
+    # Owning is level at year 0, behind in years 1 and 2, level again from year 3
+    assert crossover_year_batch(own, lease)[0] == 3.0
+
+
+def test_fully_debt_financed_purchase_does_not_pay_back_at_year_zero():
+    params = dict(default_values, debt_ratio=1.0)
+    own_npv, lease_npv = evaluate_npvs(params)
+    assert own_npv[0] < lease_npv[0]
+    metrics = scenario_metrics(params)
+    own_cf, lease_cf = scenario_cashflows(params)
+    assert own_cf[0, 0] == 0.0
+    assert metrics["payback_year"][0] != 0.0
+    assert metrics["crossover_year"][0] != 0.0
+
+
+def test_scenario_metrics_in_chunks_match_one_batch():
+    rng = np.random.default_rng(3)
+    params = dict(default_values)
+    params["CAPEX"] = rng.uniform(100.0, 600.0, 50)
+    params["lease_payment"] = rng.uniform(10.0, 40.0, 50)
+    whole = scenario_metrics(params)
+    chunked = scenario_metrics(params, chunk_size=7)
+    for name in whole:
+        np.testing.assert_array_equal(whole[name], chunked[name])
+
+
+def test_quarterly_metrics_are_in_years():
+    annual = scenario_metrics(dict(default_values, lease_payment=40.0))
+    quarterly = scenario_metrics(dict(default_values, lease_payment=40.0, periods_per_year=4))
+    assert quarterly["irr"][0] == pytest.approx(annual["irr"][0], abs=1.0)
+    payback = quarterly["payback_year"][0]
+    assert payback == pytest.approx(annual["payback_year"][0], abs=1.0)
+    # The end of a quarter
+    assert payback * 4 == pytest.approx(round(payback * 4))
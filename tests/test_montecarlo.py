@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from lease_own.model import DEBT_SCHEDULES, LEASE_OPTIONS, PERIOD_OPTIONS, default_values, param_bounds
+from lease_own.montecarlo import (MIN_BATCHES, Normal, Uniform, draw_params, sample_params, simulate,
+                                  simulate_until)
+from lease_own.sampling import norm_ppf
+
+DISTRIBUTIONS = {"wacc": Normal(6.0, 1.0), "salvage": Uniform(20.0, 60.0)}
+
+
+def _tolerance():
+    """A mean tolerance that a few thousand draws meet."""
+    spread = simulate(default_values, DISTRIBUTIONS, n_draws=4096, seed=0).delta_std
+    return spread / 16
+
+
+def test_stops_once_the_mean_is_within_tolerance():
+    tolerance = _tolerance()
+    states = []
+    result = simulate_until(default_values, DISTRIBUTIONS, mean_tolerance=tolerance,
+                            batch_size=512, max_draws=1_000_000, seed=1, progress=states.append)
+    assert result.converged
+    assert result.n_draws < 1_000_000
+    assert states[-1].converged and states[-1].delta_mean_half_width <= tolerance
+    # It stops at the first batch that meets the tolerance, not later
+    assert len(states) >= MIN_BATCHES
+    assert not any(state.converged for state in states[:-1])
+    z = float(norm_ppf(0.975))
+    assert z * result.delta_mean_se == pytest.approx(states[-1].delta_mean_half_width)
+
+
+def test_reports_not_converged_at_max_draws():
+    result = simulate_until(default_values, DISTRIBUTIONS, mean_tolerance=1.0, p_tolerance=1e-6,
+                            batch_size=500, max_draws=3000, seed=2)
+    assert not result.converged
+    assert result.n_draws == 3000
+
+
+def test_progress_draw_counts_never_decrease():
+    states = []
+    result = simulate_until(default_values, DISTRIBUTIONS, p_tolerance=1e-6, batch_size=300,
+                            max_draws=4000, seed=3, progress=states.append)
+    draws = [state.n_draws for state in states]
+    assert np.all(np.diff(draws) >= 0)
+    assert draws[-1] == result.n_draws == 4000
+    assert [state.n_batches for state in states] == list(range(1, len(states) + 1))
+
+
+def test_needs_a_tolerance():
+    with pytest.raises(ValueError):
+        simulate_until(default_values, DISTRIBUTIONS)
+
+
+def test_drawn_interest_only_years_can_be_zero():
+    distributions = {"io_years": Uniform(0.0, 0.4), "debt_term": Uniform(0.0, 2.0)}
+    for params in (draw_params(default_values, distributions, np.random.default_rng(0), 200),
+                   sample_params(default_values, distributions, "lhs", np.random.default_rng(0), 200)):
+        np.testing.assert_array_equal(params["io_years"], 0.0)
+        # Terms still start at their one-year bound
+        assert params["debt_term"].min() == 1.0
+
+
+def test_drawn_codes_stay_inside_their_range():
+    distributions = {"debt_schedule": Normal(2.0, 5.0), "lease_option": Normal(1.0, 5.0),
+                     "periods_per_year": Uniform(0.0, 30.0), "analysis_years": Uniform(30.0, 60.0)}
+    params = draw_params(default_values, distributions, np.random.default_rng(1), 2000)
+    assert set(np.unique(params["debt_schedule"])) == set(DEBT_SCHEDULES)
+    assert set(np.unique(params["lease_option"])) == set(LEASE_OPTIONS)
+    assert set(np.unique(params["periods_per_year"])) == set(PERIOD_OPTIONS)
+    assert params["analysis_years"].max() == param_bounds["analysis_years"][1]
+
+
+@pytest.mark.parametrize("distributions", [
+    {"depr_method": Uniform(4.0, 6.0)},
+    {"lease_option": Normal(-5.0, 1.0, high=-1.0)},
+    {"periods_per_year": Uniform(20.0, 30.0)},
+    {"debt_term": Uniform(2.0, 1.0)},
+])
+def test_unusable_code_distributions_are_rejected(distributions):
+    with pytest.raises(ValueError):
+        sample_params(default_values, distributions, "random", np.random.default_rng(2), 10)
+    with pytest.raises(ValueError):
+        simulate(default_values, distributions, n_draws=10)
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from lease_own import options
+from lease_own.batch import periodic_rate
+from lease_own.npv import YieldCurve
+from lease_own.options import (LATTICE_STEPS_PER_YEAR, NO_OPTION, PURCHASE, RENEWAL,
+                               lease_option_values)
+
+
+def reference_purchase_value(value, payment, price, volatility, years, rate):
+    """Node-by-node American call with exercise from the first step on."""
+    k = LATTICE_STEPS_PER_YEAR
+    steps = int(round(years * k))
+    s = volatility / np.sqrt(k)
+    up = 1.0 / (1.0 + np.exp(s))
+    discount = 1.0 / (1.0 + periodic_rate(rate, k))
+    growth = (1.0 + periodic_rate(rate, k)) / (1.0 + payment / value) ** (1.0 / k)
+    option = [max(value * growth ** steps * np.exp(s * (2 * j - steps)) - price, 0.0)
+              for j in range(steps + 1)]
+    for t in range(steps - 1, -1, -1):
+        option = [discount * (up * option[j + 1] + (1.0 - up) * option[j]) for j in range(t + 1)]
+        if t > 0:
+            option = [max(o, value * growth ** t * np.exp(s * (2 * j - t)) - price)
+                      for j, o in enumerate(option)]
+    return option[0]
+
+
+def _purchase(value, payment, price, volatility, years, rate):
+    return lease_option_values(PURCHASE, value, payment, price, 0.0, 0.0, volatility, 0.25,
+                               years, rate)
+
+
+def test_purchase_matches_node_by_node_lattice():
+    rng = np.random.default_rng(7)
+    n = 40
+    value = rng.uniform(100e6, 1000e6, n)
+    payment = value * rng.uniform(0.02, 0.12, n)
+    price = value * rng.uniform(0.5, 1.5, n)
+    volatility = rng.uniform(0.05, 0.4, n)
+    years = rng.integers(1, 16, n)
+    rate = rng.uniform(0.02, 0.12, n)
+    values = _purchase(value, payment, price, volatility, years, rate)
+    expected = [reference_purchase_value(*args)
+                for args in zip(value, payment, price, volatility, years, rate)]
+    np.testing.assert_allclose(values, expected, rtol=1e-10)
+
+
+def test_purchase_is_not_exercised_at_time_zero():
+    # Deep in the money with no volatility: exercising at the end of the first
+    # step beats waiting, but not exercising today at CAPEX - price
+    value = _purchase(100e6, 8e6, 50e6, 0.0, 10, 0.06)[0]
+    assert 0 < value < 50e6
+    assert value == pytest.approx(reference_purchase_value(100e6, 8e6, 50e6, 0.0, 10, 0.06))
+
+
+def test_purchase_value_grows_with_volatility():
+    values = _purchase(500e6, 30e6, 500e6, np.array([0.05, 0.15, 0.3, 0.5]), 15, 0.06)
+    assert np.all(np.diff(values) > 0)
+
+
+def test_mixed_periods_and_blocks_match_single_rows(monkeypatch):
+    years = np.array([3, 20, 7, 20, 1, 12, 7])
+    volatility = np.linspace(0.1, 0.4, years.size)
+    rate = np.linspace(0.03, 0.09, years.size)
+    batch = _purchase(400e6, 24e6, 380e6, volatility, years, rate)
+    single = [_purchase(400e6, 24e6, 380e6, v, y, r)[0]
+              for v, y, r in zip(volatility, years, rate)]
+    np.testing.assert_allclose(batch, single, rtol=1e-12)
+    monkeypatch.setattr(options, "LATTICE_CELLS", 100)
+    np.testing.assert_allclose(_purchase(400e6, 24e6, 380e6, volatility, years, rate), batch,
+                               rtol=1e-12)
+
+
+def test_flat_yield_curve_matches_the_flat_rate():
+    curve = YieldCurve((1.0, 30.0), (0.05, 0.05))
+    volatility = np.array([0.1, 0.25])
+    np.testing.assert_allclose(_purchase(300e6, 20e6, 280e6, volatility, 10, curve),
+                               _purchase(300e6, 20e6, 280e6, volatility, 10, 0.05), rtol=1e-12)
+
+
+def test_renewal_above_market_rent_is_worthless_without_volatility():
+    values = lease_option_values(RENEWAL, 100e6, 8e6, 0.0, np.array([10e6, 5e6]), 5, 0.0, 0.25,
+                                 10, 0.06)
+    assert values[0] == 0.0
+    assert values[1] > 0.0
+
+
+def test_no_option_rows_are_zero_and_unknown_codes_raise():
+    values = lease_option_values(np.array([NO_OPTION, PURCHASE, NO_OPTION]), 100e6, 8e6, 90e6,
+                                 6e6, 5, 0.2, 0.25, 10, 0.06)
+    assert values[0] == values[2] == 0.0
+    assert values[1] > 0.0
+    with pytest.raises(ValueError, match="unknown lease option"):
+        lease_option_values(3, 100e6, 8e6, 90e6, 6e6, 5, 0.2, 0.25, 10, 0.06)
+
+
+def test_yield_curve_with_mixed_periods_matches_single_rows():
+    curve = YieldCurve((1.0, 10.0), (0.04, 0.06))
+    years = np.array([20, 10, 3, 10])
+    volatility = np.array([0.15, 0.25, 0.2, 0.1])
+    batch = _purchase(300e6, 18e6, 250e6, volatility, years, curve)
+    single = [_purchase(300e6, 18e6, 250e6, v, y, curve)[0] for v, y in zip(volatility, years)]
+    np.testing.assert_allclose(batch, single, rtol=1e-12)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lease_own.model import PARAM_KEYS, default_values
+from lease_own.parallel import run_sweep
+from lease_own.scenarios import evaluate_npvs
+
+
+def _table():
+    """Scenario columns with a few varied inputs; the rest stay scalars."""
+    rng = np.random.default_rng(5)
+    n = 50
+    params = dict(default_values)
+    params["CAPEX"] = rng.uniform(150.0, 450.0, n)
+    params["wacc"] = rng.uniform(3.0, 9.0, n)
+    params["analysis_years"] = rng.integers(10, 30, n).astype(float)
+    params["lease_payment"] = rng.uniform(10.0, 40.0, n)
+    return params
+
+
+def _assert_matches(table, params):
+    own_npv, lease_npv = evaluate_npvs(params)
+    sweep_own, sweep_lease = run_sweep(table, workers=2, chunk_size=7)
+    np.testing.assert_allclose(sweep_own, own_npv, rtol=1e-12)
+    np.testing.assert_allclose(sweep_lease, lease_npv, rtol=1e-12)
+
+
+def test_shared_memory_sweep_of_mixed_scalar_and_array_columns():
+    params = _table()
+    _assert_matches(params, params)
+
+
+def test_shared_memory_sweep_of_array_columns():
+    params = _table()
+    n = len(params["CAPEX"])
+    columns = {key: np.broadcast_to(np.asarray(value, dtype=float), (n,)).copy()
+               for key, value in params.items()}
+    _assert_matches(columns, params)
+
+
+def test_shared_memory_sweep_of_a_data_frame():
+    params = _table()
+    frame = pd.DataFrame({key: np.broadcast_to(params[key], (len(params["CAPEX"]),))
+                          for key in PARAM_KEYS})
+    _assert_matches(frame, params)
+
+
+def test_columns_of_different_lengths_are_rejected():
+    params = _table()
+    params["wacc"] = params["wacc"][:10]
+    with pytest.raises(ValueError):
+        run_sweep(params, workers=2, chunk_size=7)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lease_own.batch import (leasing_cashflows_batch, ownership_cashflows_batch, periodic_rate,
+                             yearly_totals)
+from lease_own.metrics import scenario_metrics
+from lease_own.model import default_values
+from lease_own.parallel import run_sweep
+from lease_own.portfolio import evaluate_portfolio
+from lease_own.scenarios import evaluate_npvs, leasing_npvs, ownership_npvs, periods_per_year
+
+
+@pytest.mark.parametrize("m", [4, 12])
+def test_periodic_rate_compounds_to_the_annual_rate(m):
+    annual = np.array([0.0, 0.03, 0.25])
+    np.testing.assert_allclose((1 + periodic_rate(annual, m)) ** m, 1 + annual)
+
+
+@pytest.mark.parametrize("m", [4, 12])
+def test_lease_payments_keep_their_yearly_totals(m):
+    annual = leasing_cashflows_batch(18e6, 0.03, 20, 0.25)
+    periodic = leasing_cashflows_batch(18e6, 0.03, 20, 0.25, m)
+    assert periodic.shape == (1, 20 * m + 1)
+    totals = yearly_totals(periodic, m)
+    assert totals[0, 1] == pytest.approx(annual[0, 1], rel=1e-12)
+    # Escalation compounds every period, so later years equal the annual model too
+    np.testing.assert_allclose(totals, annual, rtol=1e-12)
+
+
+@pytest.mark.parametrize("m", [4, 12])
+def test_ownership_without_interest_or_growth_keeps_its_yearly_totals(m):
+    args = (300e6, 0.6, 0.0, 10, 20, 12e6, 0.0, 10, 0.25, 40e6)
+    annual = ownership_cashflows_batch(*args)
+    totals = yearly_totals(ownership_cashflows_batch(*args, periods_per_year=m), m)
+    np.testing.assert_allclose(totals, annual, rtol=1e-12)
+
+
+def test_quarterly_interest_accrues_on_the_declining_balance():
+    args = (300e6, 1.0, 0.08, 10, 10, 0.0, 0.0, 10, 0.0, 0.0)
+    annual = ownership_cashflows_batch(*args)
+    totals = yearly_totals(ownership_cashflows_batch(*args, periods_per_year=4), 4)
+    # Principal is repaid during the year, so less interest is paid in total
+    assert totals[0, 1:].sum() > annual[0, 1:].sum()
+    # 40 even quarterly instalments: the balance averages 20.5 / 40 of the debt
+    quarterly_interest = 300e6 * periodic_rate(0.08, 4) * 20.5
+    assert totals[0, 1:].sum() == pytest.approx(-300e6 - quarterly_interest, rel=1e-12)
+
+
+def test_periods_per_year_must_be_whole():
+    with pytest.raises(ValueError):
+        periods_per_year({"periods_per_year": 2.5})
+
+
+def _mixed_batch():
+    rng = np.random.default_rng(21)
+    n = 30
+    params = dict(default_values)
+    params["CAPEX"] = rng.uniform(150.0, 450.0, n)
+    params["lease_payment"] = rng.uniform(10.0, 40.0, n)
+    params["analysis_years"] = rng.integers(10, 30, n).astype(float)
+    params["periods_per_year"] = rng.choice([1, 4, 12], n).astype(float)
+    return params
+
+
+def _row(params, i):
+    return {key: value[i] if np.ndim(value) else value for key, value in params.items()}
+
+
+def test_mixed_periods_are_evaluated_per_row():
+    params = _mixed_batch()
+    own_npv, lease_npv = evaluate_npvs(params)
+    np.testing.assert_array_equal(ownership_npvs(params), own_npv)
+    np.testing.assert_allclose(leasing_npvs(params), lease_npv, rtol=1e-12)
+    metrics = scenario_metrics(params)
+    for i in range(len(own_npv)):
+        row_own, row_lease = evaluate_npvs(_row(params, i))
+        assert own_npv[i] == pytest.approx(row_own[0], rel=1e-12)
+        assert lease_npv[i] == pytest.approx(row_lease[0], rel=1e-12)
+        row_metrics = scenario_metrics(_row(params, i))
+        for name in metrics:
+            np.testing.assert_allclose(metrics[name][i], row_metrics[name][0], rtol=1e-9)
+
+
+def test_mixed_periods_in_a_sweep_and_a_portfolio():
+    params = _mixed_batch()
+    own_npv, lease_npv = evaluate_npvs(params)
+    sweep_own, sweep_lease = run_sweep(params, workers=1, chunk_size=8)
+    np.testing.assert_allclose(sweep_own, own_npv, rtol=1e-12)
+    np.testing.assert_allclose(sweep_lease, lease_npv, rtol=1e-12)
+    frame = pd.DataFrame({key: params[key] for key in
+                          ("CAPEX", "lease_payment", "analysis_years", "periods_per_year")})
+    result = evaluate_portfolio(frame, workers=1, metrics=True)
+    np.testing.assert_allclose(result["own_npv_m"], own_npv / 1e6, rtol=1e-12)
+    assert result["irr_pct"].notna().all()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lease_own.model import default_values
+from lease_own.portfolio import evaluate_portfolio, portfolio_totals
+from lease_own.scenarios import evaluate_npvs
+
+
+def _frame():
+    return pd.DataFrame({
+        "site": ["a", "b", "c", "d", "e"],
+        "CAPEX ($M)": [200.0, 300.0, 450.0, 250.0, 600.0],
+        "lease_payment": [12.0, 30.0, 25.0, None, 20.0],
+        "periods_per_year": [1, 4, 12, 4, 1],
+    })
+
+
+def _row_npvs(frame):
+    npvs = []
+    for _, row in frame.iterrows():
+        params = dict(default_values, CAPEX=row["CAPEX ($M)"],
+                      periods_per_year=row["periods_per_year"])
+        if pd.notna(row["lease_payment"]):
+            params["lease_payment"] = row["lease_payment"]
+        own_npv, lease_npv = evaluate_npvs(params)
+        npvs.append((own_npv[0] / 1e6, lease_npv[0] / 1e6))
+    return np.array(npvs)
+
+
+def test_totals_are_sums_of_the_row_npvs():
+    frame = _frame()
+    totals = portfolio_totals(evaluate_portfolio(frame))
+    rows = _row_npvs(frame)
+    assert totals["facilities"] == 5
+    assert totals["own_npv_m"] == pytest.approx(rows[:, 0].sum(), rel=1e-12)
+    assert totals["lease_npv_m"] == pytest.approx(rows[:, 1].sum(), rel=1e-12)
+    assert totals["best_npv_m"] == pytest.approx(rows.max(axis=1).sum(), rel=1e-12)
+    assert totals["own_count"] == int((rows[:, 0] > rows[:, 1]).sum())
+
+
+def test_mixed_periods_per_year_rows_are_summed_per_granularity():
+    frame = _frame()
+    results = evaluate_portfolio(frame, chunk_size=2)
+    totals = portfolio_totals(results)
+    by_periods = [portfolio_totals(evaluate_portfolio(frame[frame["periods_per_year"] == m]))
+                  for m in (1, 4, 12)]
+    assert totals["own_npv_m"] == pytest.approx(sum(t["own_npv_m"] for t in by_periods), rel=1e-12)
+    assert totals["lease_npv_m"] == pytest.approx(sum(t["lease_npv_m"] for t in by_periods),
+                                                  rel=1e-12)
+    assert list(results["site"]) == list(frame["site"])
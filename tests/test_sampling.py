@@ -0,0 +1,138 @@
+import numpy as np
+import pytest
+
+from lease_own.model import default_values, param_bounds
+from lease_own.montecarlo import Normal, Uniform, sample_params, simulate
+from lease_own.sampling import (SOBOL_MAX_DIMS, cholesky_factor, norm_cdf, norm_ppf,
+                                point_chunks, sobol_points, uniform_points)
+
+
+def test_sobol_first_dimension_is_van_der_corput_in_gray_code_order():
+    cells = np.floor(sobol_points(4, 1)[:, 0] * 4) / 4
+    np.testing.assert_array_equal(cells, [0.0, 0.5, 0.75, 0.25])
+
+
+@pytest.mark.parametrize("start", [1, 3, 4, 5, 64, 1000])
+def test_sobol_points_from_an_offset_continue_the_sequence(start):
+    whole = sobol_points(start + 40, 6)
+    np.testing.assert_array_equal(sobol_points(40, 6, start=start), whole[start:])
+
+
+def test_sobol_points_are_stratified_in_every_dimension():
+    n = 256
+    points = sobol_points(n, SOBOL_MAX_DIMS)
+    for column in points.T:
+        np.testing.assert_array_equal(np.sort(np.floor(column * n)), np.arange(n))
+
+
+def test_sobol_points_are_stratified_in_pairs_of_dimensions():
+    # (0, 2)-sequence property of the first two dimensions: 4 x 4 cells of 16 points
+    cells = np.floor(sobol_points(16, 2) * 4).astype(int)
+    assert len({tuple(cell) for cell in cells}) == 16
+
+
+def test_sobol_covers_every_input_the_app_offers():
+    assert SOBOL_MAX_DIMS >= len(param_bounds)
+    distributions = {key: Uniform(*param_bounds[key]) for key in param_bounds}
+    params = sample_params(default_values, distributions, "sobol", np.random.default_rng(0), 64)
+    for key, (low, high) in param_bounds.items():
+        assert low <= params[key].min() and params[key].max() <= high
+
+
+def test_sobol_rejects_too_many_dimensions():
+    with pytest.raises(ValueError):
+        sobol_points(4, SOBOL_MAX_DIMS + 1)
+
+
+def test_sobol_shift_keeps_points_inside_the_unit_cube():
+    rng = np.random.default_rng(1)
+    points = uniform_points("sobol", 128, 5, rng)
+    assert points.min() > 0.0 and points.max() < 1.0
+
+
+def test_latin_hypercube_has_one_point_per_stratum():
+    n = 50
+    points = uniform_points("lhs", n, 4, np.random.default_rng(2))
+    for column in points.T:
+        np.testing.assert_array_equal(np.sort(np.floor(column * n)), np.arange(n))
+
+
+def test_antithetic_points_are_mirrored():
+    points = uniform_points("antithetic", 10, 3, np.random.default_rng(3))
+    np.testing.assert_allclose(points[5:], 1.0 - points[:5])
+
+
+def test_unknown_sampler():
+    with pytest.raises(ValueError):
+        uniform_points("halton", 4, 2, np.random.default_rng())
+
+
+def test_norm_ppf_known_values_and_inverse():
+    assert norm_ppf(0.5) == pytest.approx(0.0, abs=1e-9)
+    assert norm_ppf(0.975) == pytest.approx(1.959963984540054, rel=1e-8)
+    assert norm_ppf(0.001) == pytest.approx(-3.090232306167813, rel=1e-8)
+    p = np.linspace(1e-6, 1 - 1e-6, 1001)
+    np.testing.assert_allclose(norm_cdf(norm_ppf(p)), p, rtol=2e-7, atol=1e-12)
+    assert norm_ppf(0.0) == -np.inf and norm_ppf(1.0) == np.inf
+
+
+def test_cholesky_factor_reproduces_the_correlations():
+    factor = cholesky_factor(["a", "b", "c"], {("a", "b"): 0.6, ("c", "b"): -0.3})
+    matrix = factor @ factor.T
+    assert matrix[0, 1] == pytest.approx(0.6) and matrix[1, 2] == pytest.approx(-0.3)
+    assert matrix[0, 2] == pytest.approx(0.0)
+
+
+@pytest.mark.parametrize("correlations", [
+    {("a", "z"): 0.5},
+    {("a", "a"): 0.5},
+    {("a", "b"): 1.5},
+    {("a", "b"): 0.9, ("b", "c"): 0.9, ("a", "c"): -0.9},
+])
+def test_cholesky_factor_rejects_bad_correlations(correlations):
+    with pytest.raises(ValueError):
+        cholesky_factor(["a", "b", "c"], correlations)
+
+
+def test_correlated_draws_keep_their_marginals():
+    distributions = {"interest_rate": Uniform(2.0, 6.0), "wacc": Normal(6.0, 1.0)}
+    params = sample_params(default_values, distributions, "sobol", np.random.default_rng(4),
+                           4096, {("interest_rate", "wacc"): 0.8})
+    assert params["interest_rate"].min() >= 2.0 and params["interest_rate"].max() <= 6.0
+    assert params["wacc"].mean() == pytest.approx(6.0, abs=0.02)
+    assert params["wacc"].std() == pytest.approx(1.0, abs=0.02)
+    assert np.corrcoef(params["interest_rate"], params["wacc"])[0, 1] == pytest.approx(0.78, abs=0.03)
+
+
+@pytest.mark.parametrize("sampler", ["random", "antithetic", "lhs", "sobol"])
+def test_samplers_agree_within_their_standard_errors(sampler):
+    distributions = {"wacc": Normal(6.0, 1.0), "salvage": Uniform(20.0, 60.0)}
+    reference = simulate(default_values, distributions, n_draws=2 ** 15, seed=0, sampler="sobol")
+    result = simulate(default_values, distributions, n_draws=4096, seed=5, sampler=sampler)
+    assert result.n_replicates == 16
+    assert np.isfinite(result.delta_mean_se) and result.delta_mean_se > 0
+    assert abs(result.delta_mean - reference.delta_mean) < 5 * result.delta_mean_se
+
+
+@pytest.mark.parametrize("sampler", ["random", "antithetic", "lhs", "sobol"])
+def test_point_chunks_hold_at_most_chunk_size_rows(sampler):
+    chunks = list(point_chunks(sampler, 1000, 3, 128, seed=6))
+    assert max(len(chunk) for chunk in chunks) <= 128
+    assert sum(len(chunk) for chunk in chunks) == 1000
+    points = np.concatenate(chunks)
+    assert points.min() > 0.0 and points.max() < 1.0
+
+
+def test_sobol_chunks_continue_one_sequence():
+    whole = uniform_points("sobol", 300, 4, np.random.default_rng(7))
+    np.testing.assert_array_equal(np.concatenate(list(point_chunks("sobol", 300, 4, 64, seed=7))),
+                                  whole)
+
+
+def test_simulation_does_not_depend_on_the_chunk_size_for_sobol():
+    distributions = {"wacc": Normal(6.0, 1.0), "salvage": Uniform(20.0, 60.0)}
+    small = simulate(default_values, distributions, n_draws=4096, chunk_size=100, seed=8,
+                     sampler="sobol")
+    large = simulate(default_values, distributions, n_draws=4096, seed=8, sampler="sobol")
+    assert small.delta_mean == pytest.approx(large.delta_mean, rel=1e-12)
+    assert small.p_own_wins == large.p_own_wins
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from lease_own.model import default_values, param_bounds
+from lease_own.npv import YieldCurve
+from lease_own.options import PURCHASE
+from lease_own.scenarios import evaluate_npvs
+from lease_own.sensitivity import MAX_GRID_STEPS, grid_axis, npv_delta_grid, tornado
+
+
+def _assert_tornado_matches_single_scenarios(base, curve=None):
+    result = tornado(base, curve=curve)
+    assert result.keys == tuple(param_bounds)
+    base_own, base_lease = evaluate_npvs(base, curve)
+    assert result.base_delta == pytest.approx(base_own[0] - base_lease[0], rel=1e-12)
+    for i, key in enumerate(result.keys):
+        for j, bound in enumerate(param_bounds[key]):
+            own_npv, lease_npv = evaluate_npvs(dict(base, **{key: bound}), curve)
+            assert result.own_npv[i, j] == pytest.approx(own_npv[0], rel=1e-12), key
+            assert result.delta[i, j] == pytest.approx(own_npv[0] - lease_npv[0], rel=1e-9,
+                                                       abs=1e-3), key
+
+
+def test_tornado_bars_match_single_scenarios_at_the_bounds():
+    _assert_tornado_matches_single_scenarios(dict(default_values))
+
+
+def test_tornado_with_a_purchase_option_along_a_yield_curve():
+    # Moving analysis_years gives the option rows different expiries
+    base = dict(default_values, lease_option=PURCHASE)
+    _assert_tornado_matches_single_scenarios(base, YieldCurve((1.0, 10.0), (0.04, 0.06)))
+
+
+def test_tornado_uses_the_given_bounds_in_order():
+    bounds = {"wacc": (2.0, 10.0), "CAPEX": (100.0, 900.0)}
+    result = tornado(dict(default_values), bounds)
+    assert result.keys == ("wacc", "CAPEX")
+    np.testing.assert_array_equal(result.low_values, [2.0, 100.0])
+    np.testing.assert_array_equal(result.high_values, [10.0, 900.0])
+    # Owning gets dearer with CAPEX
+    assert result.own_npv[1, 1] < result.own_npv[1, 0]
+
+
+def test_grid_cells_match_single_scenarios():
+    x_values, y_values = [4.0, 6.0, 8.0], [10.0, 25.0]
+    base = dict(default_values)
+    grid = npv_delta_grid(base, "wacc", x_values, "analysis_years", y_values)
+    assert grid.shape == (2, 3)
+    for i, years in enumerate(y_values):
+        for j, wacc in enumerate(x_values):
+            own_npv, lease_npv = evaluate_npvs(dict(base, wacc=wacc, analysis_years=years))
+            assert grid[i, j] == pytest.approx(own_npv[0] - lease_npv[0], rel=1e-12)
+
+
+def test_grid_along_a_yield_curve_with_a_purchase_option():
+    curve = YieldCurve((1.0, 10.0), (0.04, 0.06))
+    base = dict(default_values, lease_option=PURCHASE)
+    grid = npv_delta_grid(base, "CAPEX", [200.0, 400.0], "analysis_years", [10.0, 20.0], curve)
+    own_npv, lease_npv = evaluate_npvs(dict(base, CAPEX=400.0, analysis_years=10.0), curve)
+    assert grid[0, 1] == pytest.approx(own_npv[0] - lease_npv[0], rel=1e-9)
+
+
+def test_grid_needs_two_different_inputs():
+    with pytest.raises(ValueError):
+        npv_delta_grid(dict(default_values), "wacc", [5.0], "wacc", [6.0])
+
+
+def test_whole_year_axes_are_rounded_and_deduplicated():
+    np.testing.assert_array_equal(grid_axis("analysis_years", 5, 8, 10), [5.0, 6.0, 7.0, 8.0])
+    np.testing.assert_array_equal(grid_axis("analysis_years", 10, 11, 3), [10.0, 11.0])
+    np.testing.assert_allclose(grid_axis("wacc", 2.0, 4.0, 5), [2.0, 2.5, 3.0, 3.5, 4.0])
+
+
+@pytest.mark.parametrize("steps", [0, MAX_GRID_STEPS + 1])
+def test_grid_axis_steps_are_bounded(steps):
+    with pytest.raises(ValueError):
+        grid_axis("wacc", 2.0, 4.0, steps)
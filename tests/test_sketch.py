@@ -0,0 +1,123 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from lease_own.sketch import NpvSketch, QuantileSketch, RunningMoments, StreamingHistogram
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(11)
+    return np.concatenate([rng.normal(-50e6, 30e6, 20_000), rng.lognormal(16, 1, 5_000), [0.0] * 10])
+
+
+def _batches(values, n):
+    return np.array_split(values, n)
+
+
+def test_running_moments_match_numpy(values):
+    moments = RunningMoments()
+    for batch in _batches(values, 7):
+        moments.update(batch)
+    assert moments.count == values.size
+    assert moments.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert moments.variance == pytest.approx(values.var(ddof=1), rel=1e-10)
+    assert (moments.min, moments.max) == (values.min(), values.max())
+
+
+def test_running_moments_merge_equals_single_pass(values):
+    parts = []
+    for batch in _batches(values, 5):
+        part = RunningMoments()
+        part.update(batch)
+        parts.append(part)
+    merged = RunningMoments()
+    for part in parts:
+        merged.merge(part)
+    assert merged.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert merged.std == pytest.approx(values.std(ddof=1), rel=1e-10)
+
+
+def test_quantiles_are_within_the_relative_accuracy(values):
+    sketch = QuantileSketch(relative_accuracy=1e-3)
+    for batch in _batches(values, 9):
+        sketch.update(batch)
+    q = np.array([0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99])
+    exact = np.quantile(values, q, method="lower")
+    estimate = sketch.quantile(q)
+    np.testing.assert_allclose(estimate, exact, rtol=2e-3)
+    assert sketch.quantile(0.0) == values.min() and sketch.quantile(1.0) == values.max()
+
+
+def test_quantile_sketch_merge_is_exact(values):
+    whole = QuantileSketch()
+    whole.update(values)
+    merged = QuantileSketch()
+    for batch in _batches(values, 4):
+        part = QuantileSketch()
+        part.update(batch)
+        merged.merge(pickle.loads(pickle.dumps(part)))
+    q = np.linspace(0, 1, 21)
+    np.testing.assert_array_equal(merged.quantile(q), whole.quantile(q))
+
+
+def test_quantile_sketch_ignores_nan_and_handles_empty():
+    sketch = QuantileSketch()
+    assert np.isnan(sketch.quantile(0.5))
+    sketch.update([np.nan, 1.0, 2.0, 3.0])
+    assert sketch.count == 3
+    assert sketch.quantile(0.5) == pytest.approx(2.0, rel=1e-4)
+
+
+def test_quantile_sketch_rejects_mismatched_merge():
+    with pytest.raises(ValueError):
+        QuantileSketch(1e-3).merge(QuantileSketch(1e-4))
+
+
+def test_quantile_sketch_bucket_limit_keeps_large_values_accurate():
+    sketch = QuantileSketch(relative_accuracy=1e-2, max_buckets=64)
+    values = np.geomspace(1e-6, 1e6, 10_000)
+    sketch.update(values)
+    assert sketch.quantile(0.99) == pytest.approx(np.quantile(values, 0.99, method="lower"), rel=2e-2)
+
+
+def test_histogram_counts_every_value(values):
+    histogram = StreamingHistogram(max_bins=32)
+    for batch in _batches(values, 6):
+        histogram.update(batch)
+    assert histogram.counts.sum() == values.size
+    assert histogram.counts.size <= 32
+    edges = histogram.edges
+    assert edges[0] <= values.min() and values.max() < edges[-1]
+    expected, _ = np.histogram(values, bins=edges)
+    np.testing.assert_array_equal(histogram.counts, expected)
+
+
+def test_histogram_merge_matches_single_pass(values):
+    small, large = values[:1000] / 100, values
+    whole = StreamingHistogram(max_bins=40)
+    whole.update(np.concatenate([small, large]))
+    first, second = StreamingHistogram(max_bins=40), StreamingHistogram(max_bins=40)
+    first.update(small)
+    second.update(large)
+    first.merge(second)
+    assert first.counts.sum() == small.size + large.size
+    expected, _ = np.histogram(np.concatenate([small, large]), bins=first.edges)
+    np.testing.assert_array_equal(first.counts, expected)
+    assert first.width == whole.width
+
+
+def test_npv_sketch_tracks_wins_and_means():
+    own = np.array([10.0, -5.0, 3.0, 8.0])
+    lease = np.array([5.0, 0.0, 3.0, 9.0])
+    sketch = NpvSketch()
+    sketch.update(own[:2], lease[:2])
+    other = NpvSketch()
+    other.update(own[2:], lease[2:])
+    sketch.merge(other)
+    assert sketch.count == 4
+    assert sketch.own_wins == 1
+    assert sketch.p_own_wins == 0.25
+    assert sketch.own_npv.mean == pytest.approx(own.mean())
+    assert sketch.delta.mean == pytest.approx((own - lease).mean())
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from lease_own.model import default_values
+from lease_own.npv import (YieldCurve, curve_discount_factors, discount_factors, npv_batch,
+                           row_discount_factors)
+from lease_own.scenarios import evaluate_npvs
+
+
+def test_flat_spot_curve_matches_the_flat_rate():
+    curve = YieldCurve((1.0, 30.0), (0.06, 0.06))
+    np.testing.assert_allclose(curve_discount_factors(curve, 40), discount_factors(0.06, 40),
+                               rtol=1e-14)
+
+
+def test_spot_curve_interpolates_linearly_and_stays_flat_beyond_its_ends():
+    curve = YieldCurve((2.0, 4.0), (0.04, 0.06))
+    factors = curve_discount_factors(curve, 6)[0]
+    expected_rates = [0.04, 0.04, 0.04, 0.05, 0.06, 0.06, 0.06]
+    np.testing.assert_allclose(factors, [(1 + r) ** -t for t, r in enumerate(expected_rates)],
+                               rtol=1e-14)
+
+
+def test_forward_curve_compounds_each_years_forward_rate():
+    curve = YieldCurve((1.0, 2.0, 3.0), (0.03, 0.05, 0.07), forward=True)
+    factors = curve_discount_factors(curve, 4)[0]
+    growth = np.cumprod([1.0, 1.03, 1.05, 1.07, 1.07])
+    np.testing.assert_allclose(factors, 1 / growth, rtol=1e-14)
+
+
+def test_quarterly_factors_agree_with_annual_ones_at_year_ends():
+    curve = YieldCurve((1.0, 10.0), (0.03, 0.06))
+    annual = curve_discount_factors(curve, 10)[0]
+    quarterly = curve_discount_factors(curve.per_period(4), 40)[0]
+    np.testing.assert_allclose(quarterly[::4], annual, rtol=1e-14)
+    forward = YieldCurve((1.0, 10.0), (0.03, 0.06), forward=True)
+    np.testing.assert_allclose(curve_discount_factors(forward.per_period(12), 120)[0][::12],
+                               curve_discount_factors(forward, 10)[0], rtol=1e-12)
+
+
+def test_factor_tables_are_cached_and_read_only():
+    curve = YieldCurve((1.0, 5.0), (0.04, 0.05))
+    table = curve_discount_factors(curve, 20)
+    assert curve_discount_factors(YieldCurve([1.0, 5.0], [0.04, 0.05]), 20) is table
+    assert not table.flags.writeable
+    assert row_discount_factors(curve, 20) is table
+
+
+def test_npv_along_a_curve():
+    curve = YieldCurve((1.0, 3.0), (0.02, 0.04))
+    cashflows = np.array([[-100.0, 10.0, 10.0, 110.0], [0.0, 0.0, 0.0, 1.0]])
+    expected = [-100 + 10 / 1.02 + 10 / 1.03 ** 2 + 110 / 1.04 ** 3, 1 / 1.04 ** 3]
+    np.testing.assert_allclose(npv_batch(cashflows, curve), expected, rtol=1e-14)
+
+
+def test_scenarios_discounted_along_a_flat_curve_match_wacc():
+    params = dict(default_values, wacc=5.0)
+    own_npv, lease_npv = evaluate_npvs(params)
+    curve_own, curve_lease = evaluate_npvs(params, YieldCurve((1.0,), (0.05,)))
+    assert curve_own[0] == pytest.approx(own_npv[0], rel=1e-12)
+    assert curve_lease[0] == pytest.approx(lease_npv[0], rel=1e-12)
+
+
+@pytest.mark.parametrize("tenors, rates", [
+    ((), ()),
+    ((1.0, 2.0), (0.05,)),
+    ((2.0, 1.0), (0.05, 0.05)),
+    ((-1.0, 1.0), (0.05, 0.05)),
+    ((1.0,), (-1.0,)),
+])
+def test_invalid_curves(tenors, rates):
+    with pytest.raises(ValueError):
+        YieldCurve(tenors, rates)